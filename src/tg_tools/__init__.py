@@ -1,19 +1,46 @@
 import asyncio
-from argparse import ArgumentParser, ArgumentTypeError
+import multiprocessing
+import socket
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
 
 import pyfiglet
 
+from tg_tools.archives import is_archive
+from tg_tools.autotune import AutoTuner
+from tg_tools.bandwidth import BandwidthLimiter, parse_schedule
 from tg_tools.bot import Bot
+from tg_tools.catalog import CATALOG_FORMATS, open_catalog
 from tg_tools.config import console
 from tg_tools.db import DBManager
 from tg_tools.exceptions import TGToolsError
+from tg_tools.logs import LEVELS, LOG_FORMATS, log
+from tg_tools.prefilters import MediaFilter, parse_datetime, parse_resolution
+from tg_tools.profiling import Profiler
+from tg_tools.scheduling import SCHEDULE_POLICIES, TransferScheduler
+from tg_tools.server import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    SERVE_SOCKET,
+    SERVE_TOKEN,
+    JobArgumentParser,
+    serve,
+)
 from tg_tools.user_bot import Userbot
 from tg_tools.utils import (
-    file_thumbnail_base64_to_bytes,
-    file_thumbnail_to_base64,
-    thumbnail_base64_show,
+    THUMBNAIL_FILE_NAME,
+    get_link_info,
+    group_links_by_chat,
+    load_thumbnail,
+    mark_key,
+    read_links,
+    save_thumbnail,
+    thumbnail_show,
 )
 from tg_tools.version import __version__
+from tg_tools.writer import ARCHIVE_FORMATS, FSYNC_POLICIES, ArchiveSpec
 
 
 # -----------------------------
@@ -26,6 +53,8 @@ class CLI:
         "api-hash",
         "bot-token",
         "thumbnail",
+        "limit-up",
+        "limit-down",
     ]
 
     def __init__(self) -> None:
@@ -38,11 +67,17 @@ class CLI:
         if key == "session-string":
             userbot = Userbot(value)
             await userbot.verify_session()
+        if key in (BandwidthLimiter.KEY_UP, BandwidthLimiter.KEY_DOWN):
+            parse_schedule(value)
         if key == "thumbnail":
-            value = file_thumbnail_to_base64(value)
+            # normaliza uma única vez e guarda só o caminho do arquivo gerado
+            target = Path(self.db.data_dir, THUMBNAIL_FILE_NAME)
+            value = save_thumbnail(value, target).as_posix()
         self.db.set_config(key, value)
 
     def remove(self, key: str) -> None:
+        if key == "thumbnail":
+            Path(self.db.data_dir, THUMBNAIL_FILE_NAME).unlink(missing_ok=True)
         self.db.remove_config(key)
 
     def reset(self) -> None:
@@ -50,43 +85,303 @@ class CLI:
 
 
 # -----------------------------
-# CLI init
+# CLI helpers
 # -----------------------------
-async def init() -> None:
-    cli = CLI()
+def print_test_mode(test_mode: bool):
+    if test_mode:
+        log.warning("Modo de teste ativado!")
 
-    # --- ASCII Art --- #
-    ascii_art = pyfiglet.figlet_format("TG-TOOLS")
-    console.print(ascii_art)
-
-    # --- Funções auxiliares --- #
-    def print_test_mode(test_mode: bool):
-        if test_mode:
-            console.log("[yellow]Modo de teste ativado![/yellow]")
-
-    # ---- Tipos personalizados --- #
-    def chat_id(value: str) -> int | str:
-        if value.isdigit():
-            return int(value)
-        elif len(value) > 1 and value[0] == "-" and value[1:].isdigit():
-            return int(value)
-        return value
-
-    def number_files(value: str, limit: int) -> int:
-        if value.isdigit() and int(value) > 0 and int(value) <= limit:
-            return int(value)
-        raise ArgumentTypeError(
-            f"O number_files deve ser um inteiro entre 1 e {limit}."
+
+def verify_link_args(args) -> bool:
+    if args.sync:
+        if args.links_file or args.number_files or not args.link:
+            console.print(
+                "A flag --sync usa só o link, que indica onde começar na primeira execução."
+            )
+            return False
+        if args.verify_messages or args.plan:
+            console.print(
+                "A flag --sync não pode ser usada em conjunto com --verify-messages ou --plan."
+            )
+            return False
+    elif args.links_file:
+        if args.link or args.number_files:
+            console.print(
+                "A flag --links-file não pode ser usada em conjunto com link e number_files."
+            )
+            return False
+        if args.verify_messages:
+            console.print(
+                "A flag --verify-messages não pode ser usada em conjunto com --links-file."
+            )
+            return False
+    elif not args.link or not args.number_files:
+        console.print("Informe o link e o number_files ou use --links-file.")
+        return False
+    return True
+
+
+def job_groups(args) -> tuple[dict[int | str, list[int]], int | None]:
+    # mensagens da tarefa agrupadas por chat, a partir dos links ou do range
+    if args.links_file:
+        return group_links_by_chat(read_links(args.links_file)), None
+    chat_id, msg_thread_id, start_msg_id = get_link_info(args.link)
+    message_ids = list(range(start_msg_id, start_msg_id + args.number_files))
+    return {chat_id: message_ids}, msg_thread_id
+
+
+def sync_key(args, target: int | str) -> str:
+    # progresso do --sync por origem, destino e filtros
+    chat_id, msg_thread_id, _ = get_link_info(args.link)
+    return mark_key(
+        "sync",
+        chat_id,
+        msg_thread_id,
+        target,
+        args.media_type,
+        sorted(args.filter_caption_includes or []),
+        *filter_key(args),
+    )
+
+
+def media_filter(args) -> MediaFilter | None:
+    # filtros por metadados, só nos comandos que têm as opções de add_prefilter_args
+    filters = MediaFilter(
+        min_size=mb_to_bytes(getattr(args, "min_size", None)),
+        max_size=mb_to_bytes(getattr(args, "max_size", None)),
+        since=getattr(args, "since", None),
+        until=getattr(args, "until", None),
+        min_duration=getattr(args, "min_duration", None),
+        max_duration=getattr(args, "max_duration", None),
+        min_resolution=getattr(args, "min_resolution", None),
+        max_resolution=getattr(args, "max_resolution", None),
+        mime_globs=getattr(args, "mime_glob", None),
+        name_globs=getattr(args, "name_glob", None),
+    )
+    return filters if filters.key() else None
+
+
+def filter_key(args) -> list[dict]:
+    # os filtros só entram na chave quando usados, mantendo válido o progresso já salvo
+    filters = media_filter(args)
+    return [filters.key()] if filters else []
+
+
+def mb_to_bytes(value: float | None) -> int | None:
+    return None if value is None else int(value * 1024 * 1024)
+
+
+def add_prefilter_args(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--min-size",
+        type=float,
+        default=None,
+        help="Ignora as mídias menores que este tamanho em MB.",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=float,
+        default=None,
+        help="Ignora as mídias maiores que este tamanho em MB.",
+    )
+    parser.add_argument(
+        "--since",
+        type=since_date,
+        default=None,
+        help="Ignora as mensagens anteriores a esta data (AAAA-MM-DD ou AAAA-MM-DDTHH:MM).",
+    )
+    parser.add_argument(
+        "--until",
+        type=until_date,
+        default=None,
+        help="Ignora as mensagens posteriores a esta data (uma data sem hora vale o dia todo).",
+    )
+    parser.add_argument(
+        "--min-duration",
+        type=int,
+        default=None,
+        help="Ignora as mídias com menos segundos que este (e as sem duração, como fotos).",
+    )
+    parser.add_argument(
+        "--max-duration",
+        type=int,
+        default=None,
+        help="Ignora as mídias com mais segundos que este (e as sem duração, como fotos).",
+    )
+    parser.add_argument(
+        "--min-resolution",
+        type=resolution,
+        default=None,
+        help="Ignora as mídias com largura ou altura menor que LARGURAxALTURA (ex.: 1280x720).",
+    )
+    parser.add_argument(
+        "--max-resolution",
+        type=resolution,
+        default=None,
+        help="Ignora as mídias com largura ou altura maior que LARGURAxALTURA (ex.: 1920x1080).",
+    )
+    parser.add_argument(
+        "--mime-glob",
+        nargs="+",
+        type=str,
+        help="Só aceita os MIME que casam com algum dos padrões (ex.: 'video/*' 'image/png').",
+    )
+    parser.add_argument(
+        "--name-glob",
+        nargs="+",
+        type=str,
+        help="Só aceita os arquivos cujo nome casa com algum dos padrões (ex.: '*.mkv' '*.mp4'). (Não diferencia maiusculas e minusculas).",
+    )
+
+
+def transfer_scheduler(args) -> TransferScheduler:
+    # uma instância por tarefa: as vagas são contadas por execução
+    scheduler = TransferScheduler(
+        workers=args.workers,
+        policy=args.schedule,
+        small_slots=args.small_slots,
+        small_size=max(args.small_size, 1) * 1024 * 1024,
+    )
+    # com --max-workers, as vagas são ajustadas durante a tarefa
+    if args.max_workers:
+        scheduler.tuner = AutoTuner(
+            scheduler.resize,
+            minimum=args.min_workers,
+            maximum=args.max_workers,
+            start=args.workers,
+            interval=args.autotune_interval,
         )
+    return scheduler
+
+
+def add_autotune_args(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-workers",
+        type=positive_int,
+        default=None,
+        help="Ajusta os downloads simultâneos durante a tarefa (começando em --workers) pela vazão medida e pelos FloodWait, até este máximo.",
+    )
+    parser.add_argument(
+        "--min-workers",
+        type=positive_int,
+        default=1,
+        help="Mínimo de downloads simultâneos no ajuste de --max-workers.",
+    )
+    parser.add_argument(
+        "--autotune-interval",
+        type=float,
+        default=10,
+        help="Segundos entre as medições do ajuste de --max-workers.",
+    )
+
+
+def archive_spec(args) -> ArchiveSpec | None:
+    # downloads em pacotes tar/zip, quando pedidos com --output-archive
+    if not args.output_archive:
+        return None
+    return ArchiveSpec(
+        prefix=args.output_archive,
+        format=args.archive_format,
+        max_size=max(args.archive_size, 1) * 1024 * 1024,
+    )
+
+
+def add_archive_args(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "-oa",
+        "--output-archive",
+        type=str,
+        default=None,
+        metavar="PREFIXO",
+        help="Grava os arquivos em pacotes <prefixo>-0001.tar, <prefixo>-0002.tar... na pasta, com o índice <prefixo>.index.jsonl (id da mensagem -> pacote, deslocamento e tamanho).",
+    )
+    parser.add_argument(
+        "--archive-format",
+        type=str,
+        choices=ARCHIVE_FORMATS,
+        default="tar",
+        help="Formato dos pacotes de --output-archive (sem compressão).",
+    )
+    parser.add_argument(
+        "--archive-size",
+        type=int,
+        default=1024,
+        help="Tamanho em MB a partir do qual um novo pacote é aberto.",
+    )
+
+
+def mark_saver(cli: CLI, key: str, test_mode: bool) -> Callable[[int], None]:
+    # no modo de teste nada é processado de fato, então o progresso não é salvo
+    def on_mark(msg_id: int) -> None:
+        if not test_mode:
+            cli.db.set_mark(key, msg_id)
+
+    return on_mark
+
+
+# --- Tipos personalizados --- #
+def chat_id(value: str) -> int | str:
+    if value.isdigit():
+        return int(value)
+    elif len(value) > 1 and value[0] == "-" and value[1:].isdigit():
+        return int(value)
+    return value
+
 
-    def number_files_userbot(value: str) -> int:
-        return number_files(value, limit=Userbot.LIMIT_GET_MESSAGES)
+def number_files(value: str, limit: int) -> int:
+    if value.isdigit() and int(value) > 0 and int(value) <= limit:
+        return int(value)
+    raise ArgumentTypeError(
+        f"O number_files deve ser um inteiro entre 1 e {limit}."
+    )
+
+
+def positive_int(value: str) -> int:
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise ArgumentTypeError("O valor deve ser um inteiro maior que 0.")
+
+
+def non_negative_int(value: str) -> int:
+    if value.isdigit():
+        return int(value)
+    raise ArgumentTypeError("O valor deve ser um inteiro maior ou igual a 0.")
+
+
+def since_date(value: str) -> datetime:
+    try:
+        return parse_datetime(value)
+    except TGToolsError as e:
+        raise ArgumentTypeError(e.message)
+
+
+def until_date(value: str) -> datetime:
+    try:
+        return parse_datetime(value, end=True)
+    except TGToolsError as e:
+        raise ArgumentTypeError(e.message)
 
-    def number_files_bot(value: str) -> int:
-        return number_files(value, limit=Bot.LIMIT_GET_MESSAGES)
 
-    # --- Parsers config --- #
-    parser = ArgumentParser()
+def resolution(value: str) -> tuple[int, int]:
+    try:
+        return parse_resolution(value)
+    except TGToolsError as e:
+        raise ArgumentTypeError(e.message)
+
+
+def number_files_userbot(value: str) -> int:
+    return number_files(value, limit=Userbot.LIMIT_GET_MESSAGES)
+
+
+def number_files_bot(value: str) -> int:
+    return number_files(value, limit=Bot.LIMIT_GET_MESSAGES)
+
+
+def build_parser(
+    cli: CLI, parser_class: type[ArgumentParser] = ArgumentParser
+) -> ArgumentParser:
+    """Monta o parser da CLI (o `serve` usa o mesmo parser para as tarefas recebidas)."""
+    parser = parser_class()
     parser.add_argument("-V", "--version", action="version", version=f"v{__version__}")
     parser.add_argument(
         "-r", "--reset", action="store_true", help="Limpa todas as configurações."
@@ -107,6 +402,50 @@ async def init() -> None:
         action="store_true",
         help="Obtém o caminho do arquivo do banco de dados.",
     )
+    parser.add_argument(
+        "--limit-up",
+        type=str,
+        help="Limite de banda para envios nesta execução (ex.: 2MB ou 08:00-18:00=1MB,*=0). Sem a flag, usa a configuração limit-up, que pode ser alterada com a tarefa rodando.",
+    )
+    parser.add_argument(
+        "--limit-down",
+        type=str,
+        help="Limite de banda para downloads nesta execução (mesmo formato de --limit-up). Sem a flag, usa a configuração limit-down.",
+    )
+    parser.add_argument(
+        "--media-connections",
+        type=positive_int,
+        default=1,
+        help="Conexões de mídia por data center, abertas sob demanda e mantidas durante toda a tarefa. Padrão: 1.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        nargs="?",
+        const="tg-tools-profile",
+        default=None,
+        help="Gera o perfil da execução: <prefixo>.folded (flamegraph) e <prefixo>.pstats, além de um resumo das funções mais pesadas. Padrão: tg-tools-profile.",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        choices=LEVELS,
+        default="info",
+        help="Nível mínimo das mensagens: debug mostra cada etapa, summary só os resumos das tarefas, avisos e erros. Padrão: info.",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Mostra só os resumos das tarefas, avisos e erros, sem linhas de progresso (o mesmo que --log-level summary).",
+    )
+    parser.add_argument(
+        "--log-format",
+        type=str,
+        choices=LOG_FORMATS,
+        default="auto",
+        help="Formato das mensagens: rich (colorido), plain (texto simples) ou json (um objeto por linha). Padrão: rich no terminal e plain nos demais casos.",
+    )
     subparsers = parser.add_subparsers(dest="command")
 
     get_parser = subparsers.add_parser("get", help="Obtém o valor de uma configuração.")
@@ -130,7 +469,9 @@ async def init() -> None:
         "upload-media", help="Envia os arquivos para um chat."
     )
     upload_media_parser.add_argument(
-        "path_or_file", type=str, help="O arquivo ou pasta com arquivos."
+        "path_or_file",
+        type=str,
+        help="O arquivo ou pasta com arquivos, um pacote .tar/.zip ou - para ler um pacote da entrada padrão.",
     )
     upload_media_parser.add_argument(
         "chat_id", type=chat_id, help="O id do chat para enviar os arquivos."
@@ -155,6 +496,41 @@ async def init() -> None:
         default=False,
         help="Escuta novos arquivos na pasta e envia automaticamente.",
     )
+    upload_media_parser.add_argument(
+        "-tf",
+        "--thumbnail-per-file",
+        action="store_true",
+        default=False,
+        help="Gera a thumbnail de cada arquivo a partir dele mesmo (imagens) ou de uma imagem com o mesmo nome.",
+    )
+    upload_media_parser.add_argument(
+        "-pa",
+        "--prepare-ahead",
+        type=positive_int,
+        default=2,
+        help="Quantidade de arquivos preparados (thumbnail, recompressão) em paralelo aos envios.",
+    )
+    upload_media_parser.add_argument(
+        "-al",
+        "--album",
+        action="store_true",
+        default=False,
+        help="Envia os arquivos em álbuns de até 10 itens (photo, video, audio ou document).",
+    )
+    upload_media_parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=SCHEDULE_POLICIES,
+        default="order",
+        help="Ordem dos envios: original, menores primeiro, maiores primeiro ou alternando pequenos e grandes.",
+    )
+    upload_media_parser.add_argument(
+        "-bs",
+        "--buffer-size",
+        type=int,
+        default=64,
+        help="Tamanho em MB do buffer em memória por arquivo de um pacote (acima disso usa um arquivo temporário).",
+    )
     upload_media_parser.add_argument(
         "--test-mode",
         action="store_true",
@@ -166,12 +542,16 @@ async def init() -> None:
         "download-media", help="Baixa os arquivos de um chat."
     )
     download_media_parser.add_argument(
-        "link", type=str, help="O link para baixar os arquivos."
+        "link",
+        type=str,
+        nargs="?",
+        help="O link para baixar os arquivos. (Dispensado com --links-file).",
     )
     download_media_parser.add_argument(
         "number_files",
         type=number_files_userbot,
-        help="O número de arquivos a serem baixados.",
+        nargs="?",
+        help="O número de arquivos a serem baixados. (Dispensado com --links-file).",
     )
     download_media_parser.add_argument(
         "path", type=str, help="O caminho para salvar os arquivos."
@@ -206,6 +586,74 @@ async def init() -> None:
         type=str,
         help="Filtra as mensagens pelo conteúdo do caption. (Não diferencia maiusculas e minusculas).",
     )
+    download_media_parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Quantidade de downloads simultâneos.",
+    )
+    download_media_parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=SCHEDULE_POLICIES,
+        default="order",
+        help="Ordem dos downloads: original, menores primeiro, maiores primeiro ou alternando pequenos e grandes.",
+    )
+    download_media_parser.add_argument(
+        "--small-slots",
+        type=non_negative_int,
+        default=0,
+        help="Downloads simultâneos (de --workers) reservados para arquivos pequenos.",
+    )
+    download_media_parser.add_argument(
+        "--small-size",
+        type=int,
+        default=20,
+        help="Tamanho em MB abaixo do qual um arquivo é considerado pequeno.",
+    )
+    download_media_parser.add_argument(
+        "--fsync",
+        type=str,
+        choices=FSYNC_POLICIES,
+        default="none",
+        help="Quando forçar a gravação no disco: nunca, a cada arquivo ou ao final da tarefa.",
+    )
+    download_media_parser.add_argument(
+        "-wb",
+        "--write-buffer",
+        type=int,
+        default=8,
+        help="Tamanho em MB do buffer de escrita por arquivo.",
+    )
+    add_autotune_args(download_media_parser)
+    add_archive_args(download_media_parser)
+    add_prefilter_args(download_media_parser)
+    download_media_parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=False,
+        help="Apenas dimensiona a tarefa pelos metadados (sem transferir, gravar ou aguardar).",
+    )
+    download_media_parser.add_argument(
+        "--plan-format",
+        type=str,
+        choices=["table", "json"],
+        default="table",
+        help="Formato do resumo do --plan.",
+    )
+    download_media_parser.add_argument(
+        "--sync",
+        action="store_true",
+        default=False,
+        help="Continua do último id processado até a última mensagem do chat (o link indica só o início da primeira execução).",
+    )
+    download_media_parser.add_argument(
+        "-lf",
+        "--links-file",
+        type=str,
+        help="Arquivo com um link de mensagem por linha ('-' para ler da entrada padrão).",
+    )
     download_media_parser.add_argument(
         "--test-mode",
         action="store_true",
@@ -213,17 +661,73 @@ async def init() -> None:
         help="Modo de teste, baixa o arquivo vázio.",
     )
 
+    relay_media_parser = subparsers.add_parser(
+        "relay-media",
+        help="Retransmite as mídias de um chat para outro sem gravar em disco.",
+    )
+    relay_media_parser.add_argument(
+        "link", type=str, help="O link da mensagem inicial."
+    )
+    relay_media_parser.add_argument(
+        "number_files",
+        type=number_files_userbot,
+        help="O número de arquivos a serem retransmitidos.",
+    )
+    relay_media_parser.add_argument(
+        "to_chat_id", type=chat_id, help="O id do chat de destino."
+    )
+    relay_media_parser.add_argument(
+        "-mt",
+        "--media-type",
+        type=str,
+        choices=Userbot.MESSAGE_TYPES,
+        default="all",
+        help="O tipo de arquivo a ser retransmitido.",
+    )
+    relay_media_parser.add_argument(
+        "-fc",
+        "--filter-caption-includes",
+        nargs="+",
+        type=str,
+        help="Filtra as mensagens pelo conteúdo do caption. (Não diferencia maiusculas e minusculas).",
+    )
+    relay_media_parser.add_argument(
+        "-bs",
+        "--buffer-size",
+        type=int,
+        default=64,
+        help="Tamanho em MB do buffer em memória por arquivo (acima disso usa um arquivo temporário).",
+    )
+    relay_media_parser.add_argument(
+        "-p",
+        "--pipeline",
+        type=positive_int,
+        default=2,
+        help="Quantidade de arquivos baixados aguardando envio.",
+    )
+    add_prefilter_args(relay_media_parser)
+    relay_media_parser.add_argument(
+        "--test-mode",
+        action="store_true",
+        default=False,
+        help="Modo de teste, não baixa nem envia os arquivos.",
+    )
+
     # --- Parsers bot --- #
     copy_messages_parser = subparsers.add_parser(
         "copy-messages", help="Copia mensagens de um chat para outro chat."
     )
     copy_messages_parser.add_argument(
-        "link", type=str, help="O link da mensagem inicial."
+        "link",
+        type=str,
+        nargs="?",
+        help="O link da mensagem inicial. (Dispensado com --links-file).",
     )
     copy_messages_parser.add_argument(
         "number_files",
         type=number_files_bot,
-        help="O número de mensagens a serem copiadas.",
+        nargs="?",
+        help="O número de mensagens a serem copiadas. (Dispensado com --links-file).",
     )
     copy_messages_parser.add_argument(
         "to_chat_id", type=chat_id, help="O id do chat de destino."
@@ -257,6 +761,31 @@ async def init() -> None:
         type=str,
         help="Filtra as mensagens pelo conteúdo do caption. (Não diferencia maiusculas e minusculas).",
     )
+    copy_messages_parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=False,
+        help="Apenas dimensiona a tarefa pelos metadados (sem transferir, gravar ou aguardar).",
+    )
+    copy_messages_parser.add_argument(
+        "--plan-format",
+        type=str,
+        choices=["table", "json"],
+        default="table",
+        help="Formato do resumo do --plan.",
+    )
+    copy_messages_parser.add_argument(
+        "--sync",
+        action="store_true",
+        default=False,
+        help="Continua do último id processado até a última mensagem do chat (o link indica só o início da primeira execução).",
+    )
+    copy_messages_parser.add_argument(
+        "-lf",
+        "--links-file",
+        type=str,
+        help="Arquivo com um link de mensagem por linha ('-' para ler da entrada padrão).",
+    )
     copy_messages_parser.add_argument(
         "--test-mode",
         action="store_true",
@@ -264,10 +793,219 @@ async def init() -> None:
         help="Modo de teste, imprime a mensagem.",
     )
 
-    args = parser.parse_args()
+    export_catalog_parser = subparsers.add_parser(
+        "export-catalog",
+        help="Exporta os metadados das mensagens (tamanho, tipo, caption, data) para JSONL ou Parquet.",
+    )
+    export_catalog_parser.add_argument(
+        "link", type=str, help="O link da mensagem inicial (links de tópico filtram o tópico)."
+    )
+    export_catalog_parser.add_argument(
+        "output", type=str, help="O arquivo de saída."
+    )
+    export_catalog_parser.add_argument(
+        "-c",
+        "--count",
+        type=positive_int,
+        help="Quantidade de ids a partir do link. Sem a flag, vai até a última mensagem do chat.",
+    )
+    export_catalog_parser.add_argument(
+        "-f",
+        "--format",
+        type=str,
+        choices=CATALOG_FORMATS,
+        default="jsonl",
+        help="Formato do arquivo (parquet requer o pyarrow).",
+    )
+
+    # --- Parser espelhamento --- #
+    mirror_parser = subparsers.add_parser(
+        "mirror",
+        help="Copia (bot) ou baixa (userbot) as mensagens novas de um chat assim que são postadas.",
+    )
+    mirror_parser.add_argument(
+        "chat_id", type=chat_id, help="O id do chat de origem."
+    )
+    mirror_target = mirror_parser.add_mutually_exclusive_group(required=True)
+    mirror_target.add_argument(
+        "-to",
+        "--to-chat-id",
+        type=chat_id,
+        help="Copia as mensagens para este chat (usa o bot).",
+    )
+    mirror_target.add_argument(
+        "-p",
+        "--path",
+        type=str,
+        help="Baixa as mídias para esta pasta (usa o userbot).",
+    )
+    mirror_parser.add_argument(
+        "-mt",
+        "--media-type",
+        type=str,
+        choices=Bot.MESSAGE_TYPES,
+        default="all",
+        help="O tipo de mensagem a ser espelhada.",
+    )
+    mirror_parser.add_argument(
+        "-fc",
+        "--filter-caption-includes",
+        nargs="+",
+        type=str,
+        help="Filtra as mensagens pelo conteúdo do caption. (Não diferencia maiusculas e minusculas).",
+    )
+    mirror_parser.add_argument(
+        "-n",
+        "--name",
+        type=str,
+        choices=["file_name", "caption"],
+        default="file_name",
+        help="O tipo de nome a ser definido para os arquivos baixados.",
+    )
+    mirror_parser.add_argument(
+        "-d",
+        "--delay",
+        type=float,
+        default=1,
+        help="Tempo de espera em segundos entre envio das mensagens copiadas.",
+    )
+    mirror_parser.add_argument(
+        "-bw",
+        "--batch-window",
+        type=float,
+        default=2,
+        help="Segundos aguardando mais mensagens de uma rajada antes de processar o lote.",
+    )
+    mirror_parser.add_argument(
+        "--from-id",
+        type=int,
+        help="Recupera a partir deste id em vez do último id processado salvo.",
+    )
+    mirror_parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Quantidade de downloads simultâneos.",
+    )
+    mirror_parser.add_argument(
+        "--schedule",
+        type=str,
+        choices=SCHEDULE_POLICIES,
+        default="order",
+        help="Ordem dos downloads: original, menores primeiro, maiores primeiro ou alternando pequenos e grandes.",
+    )
+    mirror_parser.add_argument(
+        "--small-slots",
+        type=non_negative_int,
+        default=0,
+        help="Downloads simultâneos (de --workers) reservados para arquivos pequenos.",
+    )
+    mirror_parser.add_argument(
+        "--small-size",
+        type=int,
+        default=20,
+        help="Tamanho em MB abaixo do qual um arquivo é considerado pequeno.",
+    )
+    mirror_parser.add_argument(
+        "--fsync",
+        type=str,
+        choices=FSYNC_POLICIES,
+        default="none",
+        help="Quando forçar a gravação no disco: nunca, a cada arquivo ou ao final da tarefa.",
+    )
+    mirror_parser.add_argument(
+        "-wb",
+        "--write-buffer",
+        type=int,
+        default=8,
+        help="Tamanho em MB do buffer de escrita por arquivo.",
+    )
+    add_autotune_args(mirror_parser)
+    add_archive_args(mirror_parser)
+    add_prefilter_args(mirror_parser)
+    mirror_parser.add_argument(
+        "--test-mode",
+        action="store_true",
+        default=False,
+        help="Modo de teste, não salva o último id processado (e não envia/baixa de fato).",
+    )
+
+    # --- Parser daemon --- #
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Mantém os clientes conectados e recebe tarefas por socket Unix (ou HTTP local com --http).",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        type=str,
+        help=f"Caminho do socket Unix. Padrão: {SERVE_SOCKET} na pasta de dados.",
+    )
+    serve_parser.add_argument(
+        "--http",
+        action="store_true",
+        default=False,
+        help="Escuta em host/porta em vez do socket Unix (padrão em sistemas sem socket Unix).",
+    )
+    serve_parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_HOST,
+        help="Endereço para escutar com --http (apenas local por padrão).",
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="Porta para escutar com --http."
+    )
+
+    return parser
+
+
+def bandwidth_limiter(args: Namespace, cli: CLI) -> BandwidthLimiter:
+    overrides = {
+        BandwidthLimiter.KEY_UP: args.limit_up,
+        BandwidthLimiter.KEY_DOWN: args.limit_down,
+    }
+    for value in filter(None, overrides.values()):
+        parse_schedule(value)
+    return BandwidthLimiter(lambda key: overrides[key] or cli.get(key))
+
 
-    # --- Execução --- #
+class ClientProvider:
+    """
+    Cria os clientes a partir das configurações. Na execução direta cada comando recebe um
+    cliente novo; o `serve` reaproveita os mesmos clientes já conectados.
+    """
 
+    def __init__(
+        self, cli: CLI, bandwidth: BandwidthLimiter, media_connections: int = 1
+    ) -> None:
+        self.cli = cli
+        self.bandwidth = bandwidth
+        self.media_connections = media_connections
+
+    async def userbot(self) -> Userbot | None:
+        if not (session_string := self.cli.get("session-string")):
+            return None
+        userbot = Userbot(session_string)
+        userbot.peer_cache = self.cli.db
+        userbot.media_connections = self.media_connections
+        await userbot.verify_session()
+        userbot.bandwidth = self.bandwidth
+        return userbot
+
+    async def bot(self) -> Bot | None:
+        api_id = self.cli.get("api-id")
+        api_hash = self.cli.get("api-hash")
+        bot_token = self.cli.get("bot-token")
+        if not (api_id and api_hash and bot_token):
+            return None
+        bot = Bot(api_id, api_hash=api_hash, bot_token=bot_token)
+        await bot.verify_token()
+        return bot
+
+
+async def run_command(args: Namespace, cli: CLI, clients: ClientProvider) -> None:
+    """Executa o comando já interpretado pelo parser."""
     # Configuração
     if args.reset:
         cli.reset()
@@ -304,14 +1042,14 @@ async def init() -> None:
             await cli.set(args.key, args.value)
             console.print(f"{args.key} -> Configurado com sucesso.")
         except Exception as e:
-            console.log(f"[red]Erro ao configurar {args.key}: {e}[/red]")
+            log.error(f"Erro ao configurar {args.key}: {e}")
 
     elif args.command == "get":
         value = cli.get(args.key)
         match (args.key):
             case "thumbnail" if value:
                 console.print(f"{args.key} -> Abrindo...")
-                thumbnail_base64_show(value)
+                thumbnail_show(value)
             case _:
                 if args.key == "session-string" and value:
                     userbot = Userbot(value)
@@ -342,14 +1080,30 @@ async def init() -> None:
             "document": ["*"],
         }
 
-        if session_string := cli.get("session-string"):
+        if userbot := await clients.userbot():
             print_test_mode(args.test_mode)
-            userbot = Userbot(session_string)
-            await userbot.verify_session()
 
             thumbnail = cli.get("thumbnail")
             if thumbnail:
-                thumbnail = file_thumbnail_base64_to_bytes(thumbnail)
+                thumbnail = load_thumbnail(thumbnail)
+
+            if is_archive(args.path_or_file):
+                if args.delete or args.listen_new_files or args.thumbnail_per_file:
+                    console.print(
+                        "As flags --delete, --listen-new-files e --thumbnail-per-file não podem ser usadas com pacotes."
+                    )
+                    return
+                await userbot.upload_archive(
+                    args.path_or_file,
+                    chat_id=args.chat_id,
+                    formats=media_type_formats[args.media_type],
+                    media_type=args.media_type,
+                    thumbnail=thumbnail,  # type: ignore
+                    album=args.album,
+                    buffer_size=max(args.buffer_size, 1) * 1024 * 1024,
+                    test_mode=args.test_mode,
+                )
+                return
 
             await userbot.upload_media(
                 args.path_or_file,
@@ -359,76 +1113,324 @@ async def init() -> None:
                 delete=args.delete,
                 listen_new_files=args.listen_new_files,
                 thumbnail=thumbnail,  # type: ignore
+                thumbnail_per_file=args.thumbnail_per_file,
+                prepare_ahead=args.prepare_ahead,
+                album=args.album,
+                schedule_policy=args.schedule,
                 test_mode=args.test_mode,
             )
         else:
             console.print("Sessão do userbot não encontrada!")
 
     elif args.command == "download-media":
+        if not verify_link_args(args):
+            return
+
         if args.verify_messages and not args.filter_caption_includes:
             console.print(
                 "A flag --verify-messages só pode ser usada em conjunto com --filter-caption-includes."
             )
             return
 
-        if session_string := cli.get("session-string"):
+        if userbot := await clients.userbot():
             print_test_mode(args.test_mode)
-            userbot = Userbot(session_string)
-            await userbot.verify_session()
 
-            await userbot.download_media(
+            if args.plan:
+                groups, msg_thread_id = job_groups(args)
+                plan = await userbot.plan_download(
+                    groups,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    msg_thread_id=msg_thread_id,
+                    media_filter=media_filter(args),
+                )
+                plan.print(
+                    console, args.plan_format, cli.db.get_throughput("download")
+                )
+                return
+
+            if args.sync:
+                key = sync_key(args, Path(args.path).absolute().as_posix())
+                await userbot.download_sync(
+                    args.link,
+                    path=args.path,
+                    name=args.name,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    last_id=cli.db.get_mark(key),
+                    on_mark=mark_saver(cli, key, args.test_mode),
+                    test_mode=args.test_mode,
+                    fsync=args.fsync,
+                    write_buffer=max(args.write_buffer, 1) * 1024 * 1024,
+                    scheduler=transfer_scheduler(args),
+                    archive=archive_spec(args),
+                    media_filter=media_filter(args),
+                )
+            elif args.links_file:
+                await userbot.download_links(
+                    read_links(args.links_file),
+                    path=args.path,
+                    name=args.name,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    test_mode=args.test_mode,
+                    fsync=args.fsync,
+                    write_buffer=max(args.write_buffer, 1) * 1024 * 1024,
+                    scheduler=transfer_scheduler(args),
+                    archive=archive_spec(args),
+                    media_filter=media_filter(args),
+                )
+            else:
+                await userbot.download_media(
+                    args.link,
+                    number_files=args.number_files,
+                    path=args.path,
+                    name=args.name,
+                    media_type=args.media_type,
+                    verify_messages=args.verify_messages,
+                    filter_caption_includes=args.filter_caption_includes,
+                    test_mode=args.test_mode,
+                    fsync=args.fsync,
+                    write_buffer=max(args.write_buffer, 1) * 1024 * 1024,
+                    scheduler=transfer_scheduler(args),
+                    archive=archive_spec(args),
+                    media_filter=media_filter(args),
+                )
+
+            if not args.test_mode:
+                cli.db.record_throughput(
+                    "download", userbot.stats.bytes, userbot.stats.active
+                )
+        else:
+            console.print("Sessão do userbot não encontrada!")
+
+    elif args.command == "export-catalog":
+        if userbot := await clients.userbot():
+            chat_id, msg_thread_id, start_msg_id = get_link_info(args.link)
+            await userbot.verify_chat_id(chat_id)
+
+            async with userbot.session():
+                if args.count:
+                    last_msg_id = start_msg_id + args.count - 1
+                else:
+                    last_msg_id = await userbot.latest_message_id(
+                        chat_id, start_msg_id - 1
+                    )
+                with open_catalog(args.output, args.format) as writer:
+                    await userbot.export_catalog(
+                        chat_id,
+                        range(start_msg_id, last_msg_id + 1),
+                        writer=writer,
+                        msg_thread_id=msg_thread_id,
+                    )
+        else:
+            console.print("Sessão do userbot não encontrada!")
+
+    elif args.command == "mirror":
+        key = mark_key(
+            "mirror",
+            args.chat_id,
+            args.to_chat_id or Path(args.path).absolute().as_posix(),
+            args.media_type,
+            sorted(args.filter_caption_includes or []),
+            *filter_key(args),
+        )
+        if args.from_id is not None:
+            last_id = args.from_id - 1
+        else:
+            last_id = cli.db.get_mark(key)
+        on_mark = mark_saver(cli, key, args.test_mode)
+
+        if args.path:
+            if args.media_type not in Userbot.MESSAGE_TYPES:
+                console.print(
+                    f"O tipo {args.media_type} só pode ser usado com --to-chat-id."
+                )
+            elif userbot := await clients.userbot():
+                print_test_mode(args.test_mode)
+                await userbot.mirror_download(
+                    args.chat_id,
+                    path=args.path,
+                    name=args.name,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    last_id=last_id,
+                    on_mark=on_mark,
+                    window=max(args.batch_window, 0),
+                    test_mode=args.test_mode,
+                    fsync=args.fsync,
+                    write_buffer=max(args.write_buffer, 1) * 1024 * 1024,
+                    scheduler=transfer_scheduler(args),
+                    archive=archive_spec(args),
+                    media_filter=media_filter(args),
+                )
+            else:
+                console.print("Sessão do userbot não encontrada!")
+        elif media_filter(args):
+            console.print(
+                "Os filtros de metadados (--min-size, --since, --mime-glob...) só podem ser usados com --path."
+            )
+        elif bot := await clients.bot():
+            print_test_mode(args.test_mode)
+            await bot.mirror_copy(
+                args.chat_id,
+                to_chat_id=args.to_chat_id,
+                delay=args.delay,
+                media_type=args.media_type,
+                filter_caption_includes=args.filter_caption_includes,
+                last_id=last_id,
+                on_mark=on_mark,
+                window=max(args.batch_window, 0),
+                test_mode=args.test_mode,
+            )
+        else:
+            console.print(
+                "Configurações do bot incorretas! Configure: api_id, api_hash e bot_token."
+            )
+
+    elif args.command == "relay-media":
+        if userbot := await clients.userbot():
+            print_test_mode(args.test_mode)
+
+            await userbot.relay_media(
                 args.link,
                 number_files=args.number_files,
-                path=args.path,
-                name=args.name,
+                to_chat_id=args.to_chat_id,
                 media_type=args.media_type,
-                verify_messages=args.verify_messages,
                 filter_caption_includes=args.filter_caption_includes,
+                buffer_size=max(args.buffer_size, 1) * 1024 * 1024,
+                pipeline=args.pipeline,
                 test_mode=args.test_mode,
+                media_filter=media_filter(args),
             )
         else:
             console.print("Sessão do userbot não encontrada!")
 
     # Bot
     elif args.command == "copy-messages":
+        if not verify_link_args(args):
+            return
+
         if args.verify_messages and not args.filter_caption_includes:
             console.print(
                 "A flag --verify-messages só pode ser usada em conjunto com --filter-caption-includes."
             )
             return
 
-        if (
-            (api_id := cli.get("api-id"))
-            and (api_hash := cli.get("api-hash"))
-            and (bot_token := cli.get("bot-token"))
-        ):
+        if bot := await clients.bot():
             print_test_mode(args.test_mode)
-            bot = Bot(api_id, api_hash=api_hash, bot_token=bot_token)
-            await bot.verify_token()
 
-            await bot.copy_messages(
-                args.link,
-                number_files=args.number_files,
-                to_chat_id=args.to_chat_id,
-                delay=args.delay,
-                media_type=args.media_type,
-                verify_messages=args.verify_messages,
-                filter_caption_includes=args.filter_caption_includes,
-                test_mode=args.test_mode,
-            )
+            if args.plan:
+                groups, msg_thread_id = job_groups(args)
+                plan = await bot.plan_copy(
+                    groups,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    msg_thread_id=msg_thread_id,
+                )
+                plan.print(
+                    console,
+                    args.plan_format,
+                    cli.db.get_throughput("copy"),
+                    delay=args.delay,
+                )
+                return
+
+            if args.sync:
+                key = sync_key(args, args.to_chat_id)
+                await bot.copy_sync(
+                    args.link,
+                    to_chat_id=args.to_chat_id,
+                    delay=args.delay,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    last_id=cli.db.get_mark(key),
+                    on_mark=mark_saver(cli, key, args.test_mode),
+                    test_mode=args.test_mode,
+                )
+            elif args.links_file:
+                await bot.copy_links(
+                    read_links(args.links_file),
+                    to_chat_id=args.to_chat_id,
+                    delay=args.delay,
+                    media_type=args.media_type,
+                    filter_caption_includes=args.filter_caption_includes,
+                    test_mode=args.test_mode,
+                )
+            else:
+                await bot.copy_messages(
+                    args.link,
+                    number_files=args.number_files,
+                    to_chat_id=args.to_chat_id,
+                    delay=args.delay,
+                    media_type=args.media_type,
+                    verify_messages=args.verify_messages,
+                    filter_caption_includes=args.filter_caption_includes,
+                    test_mode=args.test_mode,
+                )
+
+            if not args.test_mode:
+                cli.db.record_throughput("copy", bot.stats.messages, bot.stats.active)
         else:
             console.print(
                 "Configurações do bot incorretas! Configure: api_id, api_hash e bot_token."
             )
 
 
+async def run_init(args: Namespace, cli: CLI, clients: ClientProvider) -> None:
+    if args.command == "serve":
+        # socket Unix por padrão: só o usuário acessa, sem exposição a páginas web
+        socket_path = None
+        if not args.http and hasattr(socket, "AF_UNIX"):
+            socket_path = args.socket or Path(cli.db.data_dir, SERVE_SOCKET).as_posix()
+        await serve(
+            parse=build_parser(cli, JobArgumentParser).parse_args,
+            run=lambda job_args, job_clients: run_command(job_args, cli, job_clients),
+            clients=clients,
+            token_file=Path(cli.db.data_dir, SERVE_TOKEN),
+            host=args.host,
+            port=args.port,
+            socket_path=socket_path,
+        )
+    else:
+        await run_command(args, cli, clients)
+
+
+async def init() -> None:
+    cli = CLI()
+
+    args = build_parser(cli).parse_args()
+    log.configure("summary" if args.quiet else args.log_level, args.log_format)
+
+    # --- ASCII Art --- #
+    if log.rich and not args.quiet:
+        console.print(pyfiglet.figlet_format("TG-TOOLS"))
+    clients = ClientProvider(
+        cli, bandwidth_limiter(args, cli), args.media_connections
+    )
+
+    if args.profile is None:
+        await run_init(args, cli, clients)
+        return
+
+    profiler = Profiler(args.profile)
+    profiler.start()
+    try:
+        await run_init(args, cli, clients)
+    finally:
+        profiler.stop()
+        profiler.report(console)
+
+
 # -----------------------------
 # Main
 # -----------------------------
 def main() -> None:
+    # necessário para o pool de processos no binário gerado pelo PyInstaller
+    multiprocessing.freeze_support()
     try:
         asyncio.run(init())
     except TGToolsError as ex:
-        console.print(f"[red]Não foi possível continuar -> {ex.message}[/red]")
+        log.error("Não foi possível continuar -> %s", ex.message)
     except KeyboardInterrupt:
-        console.print("Finalizando...")
+        log.warning("Finalizando...")
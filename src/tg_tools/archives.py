@@ -0,0 +1,112 @@
+import asyncio
+import shutil
+import sys
+import tarfile
+import zipfile
+from fnmatch import fnmatch
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import AsyncGenerator, BinaryIO, Iterator, cast
+
+from tg_tools.preparation import PreparedFile
+
+# fonte que lê o pacote da entrada padrão
+STDIN_SOURCE = "-"
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+ZIP_MAGIC = b"PK\x03\x04"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class MemberBuffer(SpooledTemporaryFile):
+    """
+    Buffer de um membro do pacote: fica em memória até `max_size` bytes e o excedente vai
+    para um arquivo temporário. O `name` é o do membro, usado pelo hydrogram no envio.
+    """
+
+    def __init__(self, name: str, max_size: int) -> None:
+        super().__init__(max_size=max_size)
+        self._member_name = name
+
+    @property
+    def name(self) -> str:  # type: ignore
+        return self._member_name
+
+
+def is_archive(source: str | Path) -> bool:
+    """Indica se a origem do upload é um pacote .tar/.zip (ou a entrada padrão)."""
+    return str(source) == STDIN_SOURCE or str(source).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def member_matches(name: str, formats: list[str]) -> bool:
+    """Filtra pelo nome do membro, como o `search_files` faz com os arquivos da pasta."""
+    return any(fnmatch(Path(name).name, f"*.{format}") for format in formats)
+
+
+def _spool(source: BinaryIO, name: str, buffer_size: int) -> MemberBuffer:
+    buffer = MemberBuffer(Path(name).name, buffer_size)
+    shutil.copyfileobj(source, buffer, COPY_CHUNK_SIZE)
+    buffer.seek(0)
+    return buffer
+
+
+def iter_archive(
+    source: str | Path, formats: list[str], buffer_size: int
+) -> Iterator[tuple[str, int, MemberBuffer]]:
+    """
+    Lê os membros do pacote em sequência, sem extrair para o disco, e retorna
+    (nome, tamanho, buffer) dos que passam no filtro de formatos. Pacotes tar são lidos como
+    stream; um zip vindo da entrada padrão precisa ser bufferizado inteiro antes (o índice
+    dele fica no fim do arquivo).
+    """
+    stdin = str(source) == STDIN_SOURCE
+    stream = cast(BinaryIO, sys.stdin.buffer if stdin else open(source, "rb"))
+    try:
+        if stream.peek(len(ZIP_MAGIC))[: len(ZIP_MAGIC)] == ZIP_MAGIC:  # type: ignore
+            if not stream.seekable():
+                stream = _spool(stream, "pacote.zip", buffer_size)
+            with zipfile.ZipFile(stream) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not member_matches(info.filename, formats):
+                        continue
+                    with archive.open(info) as member:
+                        buffer = _spool(member, info.filename, buffer_size)
+                    yield info.filename, info.file_size, buffer
+        else:
+            with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                for member in archive:
+                    if not member.isfile() or not member_matches(member.name, formats):
+                        continue
+                    buffer = _spool(
+                        cast(BinaryIO, archive.extractfile(member)),
+                        member.name,
+                        buffer_size,
+                    )
+                    yield member.name, member.size, buffer
+    finally:
+        if not stdin:
+            stream.close()
+
+
+async def archive_files(
+    source: str | Path, formats: list[str], buffer_size: int
+) -> AsyncGenerator[PreparedFile, None]:
+    """
+    Entrega os membros do pacote como PreparedFile com o buffer em `stream`. A leitura roda
+    em uma thread, um membro por vez, para não travar o event loop.
+    """
+    members = iter_archive(source, formats, buffer_size)
+    try:
+        while item := await asyncio.to_thread(next, members, None):
+            name, size, buffer = item
+            yield PreparedFile(Path(name), size=size, stream=buffer)
+    finally:
+        await asyncio.to_thread(members.close)
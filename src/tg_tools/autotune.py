@@ -0,0 +1,78 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from tg_tools.logs import log
+from tg_tools.planning import JobStats
+from tg_tools.utils import format_size
+
+# queda de vazão tolerada depois de um aumento antes de desfazê-lo
+DEFAULT_TOLERANCE = 0.05
+
+
+class AutoTuner:
+    """
+    Ajusta as transferências simultâneas de uma tarefa com um controle AIMD: a cada
+    `interval` segundos, sem FloodWait, soma 1 enquanto a vazão (bytes/s, ou mensagens/s
+    quando não há bytes) não cair; um FloodWait no intervalo corta o limite pela metade e
+    um aumento que piorou a vazão é desfeito. O limite fica sempre entre `minimum` e
+    `maximum` e cada mudança é aplicada com `apply`.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[int], Awaitable[None]],
+        minimum: int,
+        maximum: int,
+        start: int | None = None,
+        interval: float = 10.0,
+        tolerance: float = DEFAULT_TOLERANCE,
+    ) -> None:
+        self.apply = apply
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(start or self.minimum, self.minimum), self.maximum)
+        self.interval = interval
+        self.tolerance = tolerance
+        self.floodwaits = 0
+        self._last_rate: float | None = None
+        self._grew = False
+
+    def floodwait(self, seconds: float) -> None:
+        """Registra um FloodWait (ligado ao `floodwait_listener` durante a tarefa)."""
+        self.floodwaits += 1
+
+    def decide(self, rate: float, floodwaits: int) -> tuple[int, str]:
+        """Próximo limite e o motivo, a partir da vazão e dos FloodWait do intervalo."""
+        last_rate, grew = self._last_rate, self._grew
+        self._last_rate, self._grew = rate, False
+
+        if floodwaits:
+            return max(self.minimum, self.limit // 2), f"{floodwaits} FloodWait"
+        if not rate:
+            return self.limit, "sem transferências"
+        if grew and last_rate and rate < last_rate * (1 - self.tolerance):
+            return max(self.minimum, self.limit - 1), "vazão caiu após o aumento"
+        if self.limit < self.maximum:
+            self._grew = True
+            return self.limit + 1, "vazão estável"
+        return self.limit, "no máximo"
+
+    async def run(self, stats: JobStats) -> None:
+        """Mede a tarefa e ajusta o limite até ser cancelado."""
+        await self.apply(self.limit)
+        last_bytes, last_messages = stats.bytes, stats.messages
+        while True:
+            await asyncio.sleep(self.interval)
+            bytes_rate = (stats.bytes - last_bytes) / self.interval
+            messages_rate = (stats.messages - last_messages) / self.interval
+            last_bytes, last_messages = stats.bytes, stats.messages
+            floodwaits, self.floodwaits = self.floodwaits, 0
+
+            limit, reason = self.decide(bytes_rate or messages_rate, floodwaits)
+            if limit == self.limit:
+                continue
+            log.info(
+                f"Autotune: {self.limit} -> {limit} simultâneos ({reason}), Vazão: {format_size(int(bytes_rate))}/s, {messages_rate:.2f} msg/s"
+            )
+            self.limit = limit
+            await self.apply(limit)
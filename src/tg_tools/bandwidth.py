@@ -0,0 +1,200 @@
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from tg_tools.exceptions import TGToolsError
+
+RATE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024**2, "MB": 1024**2, "G": 1024**3, "GB": 1024**3}
+REGEX_RATE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*(?:/S)?\s*$", re.IGNORECASE)
+REGEX_WINDOW = re.compile(r"^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$")
+
+# Janela de horário em minutos do dia (início, fim) e a taxa em bytes/s
+Schedule = list[tuple[tuple[int, int] | None, int]]
+
+
+def parse_rate(value: str) -> int:
+    """
+    Converte uma taxa ("500KB", "2MB", "1.5M/s") em bytes por segundo.
+    "0" ou "off" significa sem limite.
+    """
+    if value.strip().lower() in ("off", "none", "ilimitado"):
+        return 0
+    match = REGEX_RATE.match(value)
+    if not match:
+        raise TGToolsError(f"Taxa inválida! Valor: {value}")
+    number, unit = match.groups()
+    return int(float(number) * RATE_UNITS[unit.upper()])
+
+
+def parse_schedule(value: str) -> Schedule:
+    """
+    Interpreta um limite simples ("2MB") ou uma agenda por horário, separada por vírgulas:
+    "08:00-18:00=1MB,*=0" (1 MB/s em horário comercial e sem limite no resto do dia).
+    Janelas que passam da meia-noite ("22:00-06:00=5MB") são aceitas.
+    """
+    schedule: Schedule = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        if "=" not in part:
+            schedule.append((None, parse_rate(part)))
+            continue
+
+        window, rate = (p.strip() for p in part.split("=", 1))
+        if window == "*":
+            schedule.append((None, parse_rate(rate)))
+            continue
+
+        match = REGEX_WINDOW.match(window)
+        if not match:
+            raise TGToolsError(f"Janela de horário inválida! Valor: {window}")
+        h1, m1, h2, m2 = (int(g) for g in match.groups())
+        if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59:
+            raise TGToolsError(f"Janela de horário inválida! Valor: {window}")
+        schedule.append(((h1 * 60 + m1, h2 * 60 + m2), parse_rate(rate)))
+    return schedule
+
+
+def rate_at(schedule: Schedule, now: datetime) -> int:
+    """Retorna a taxa vigente no horário `now` (a primeira janela que casar vence)."""
+    minute = now.hour * 60 + now.minute
+    for window, rate in schedule:
+        if window is None:
+            return rate
+        start, end = window
+        if start <= end and start <= minute < end:
+            return rate
+        if start > end and (minute >= start or minute < end):
+            return rate
+    return 0
+
+
+# -----------------------------
+# Token bucket em bytes
+# -----------------------------
+class TokenBucket:
+    """
+    Balde de tokens em bytes compartilhado por todas as transferências de um sentido.
+    Os pedidos são atendidos em ordem de chegada; taxa 0 desativa o limite.
+    """
+
+    def __init__(self, rate: int = 0, burst: int | None = None) -> None:
+        self.rate = rate
+        self._burst = burst
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def burst(self) -> int:
+        # por padrão permite rajadas de até 1 segundo de tráfego (mínimo de 64 KB)
+        return self._burst or max(self.rate, 64 * 1024)
+
+    def set_rate(self, rate: int) -> None:
+        if rate == self.rate:
+            return
+        self._refill()
+        self.rate = rate
+        self.tokens = min(self.tokens, float(self.burst))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(
+                float(self.burst), self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+
+    async def consume(self, amount: int) -> None:
+        """Aguarda até que `amount` bytes possam ser transferidos."""
+        if self.rate <= 0 or amount <= 0:
+            return
+
+        async with self._lock:
+            remaining = amount
+            while remaining > 0 and self.rate > 0:
+                self._refill()
+                # pedidos maiores que o balde são atendidos em partes
+                needed = min(remaining, self.burst)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    remaining -= needed
+                    continue
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+
+# -----------------------------
+# Limitador global de banda
+# -----------------------------
+class BandwidthLimiter:
+    """
+    Limite global de banda com orçamentos separados para envio e download.
+
+    As agendas são lidas por `reader` (normalmente a configuração "limit-up"/"limit-down") e
+    relidas a cada `refresh_interval` segundos, permitindo alterar o limite com a tarefa rodando.
+    """
+
+    KEY_UP = "limit-up"
+    KEY_DOWN = "limit-down"
+
+    def __init__(
+        self,
+        reader: Callable[[str], str | None] | None = None,
+        refresh_interval: float = 5.0,
+    ) -> None:
+        self.reader = reader
+        self.refresh_interval = refresh_interval
+        self.up = TokenBucket()
+        self.down = TokenBucket()
+        self._schedules: dict[str, tuple[str | None, Schedule]] = {}
+        self._last_refresh = 0.0
+
+    def _schedule_for(self, key: str) -> Schedule:
+        value = self.reader(key) if self.reader else None
+        cached = self._schedules.get(key)
+        if cached and cached[0] == value:
+            return cached[1]
+        try:
+            schedule = parse_schedule(value) if value else []
+        except TGToolsError:
+            # valor inválido editado durante a tarefa: mantém a agenda anterior
+            schedule = cached[1] if cached else []
+        self._schedules[key] = (value, schedule)
+        return schedule
+
+    def refresh(self, now: datetime | None = None) -> None:
+        """Relê as agendas e aplica a taxa do horário atual."""
+        now = now or datetime.now()
+        self.up.set_rate(rate_at(self._schedule_for(self.KEY_UP), now))
+        self.down.set_rate(rate_at(self._schedule_for(self.KEY_DOWN), now))
+        self._last_refresh = time.monotonic()
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    async def consume_up(self, amount: int) -> None:
+        self._maybe_refresh()
+        await self.up.consume(amount)
+
+    async def consume_down(self, amount: int) -> None:
+        self._maybe_refresh()
+        await self.down.consume(amount)
+
+    def throttled_progress(
+        self, progress: Callable[[int, int], None] | None = None
+    ) -> Callable[[int, int], Awaitable[None]]:
+        """
+        Cria um callback de progresso assíncrono para os envios do hydrogram, que aguarda o
+        callback antes de enviar a próxima parte do arquivo. Cada envio precisa do seu.
+        """
+        last = 0
+
+        async def callback(current: int, total: int) -> None:
+            nonlocal last
+            delta, last = current - last, current
+            await self.consume_up(delta)
+            if progress:
+                progress(current, total)
+
+        return callback
@@ -1,7 +1,77 @@
-from hydrogram import Client
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Awaitable, Callable, Sequence, cast
 
+from hydrogram import Client, filters
+from hydrogram.errors import (
+    ChannelInvalid,
+    ChannelPrivate,
+    PeerIdInvalid,
+    UsernameInvalid,
+    UsernameNotOccupied,
+)
+from hydrogram.handlers import MessageHandler
+from hydrogram.storage import SQLiteStorage
+from hydrogram.types import (
+    ForumTopic,
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+from tg_tools.autotune import AutoTuner
+from tg_tools.bandwidth import BandwidthLimiter
+from tg_tools.catalog import CatalogWriter, message_record
 from tg_tools.config import console
+from tg_tools.db import DBManager
 from tg_tools.exceptions import TGToolsError
+from tg_tools.logs import log
+from tg_tools.media import MediaSessionPool
+from tg_tools.planning import JobPlan, JobStats
+from tg_tools.utils import chunked, floodwait_listener, handle_floodwait
+
+# erros de um peer que não foi encontrado ou cujo access hash não vale mais
+PEER_ERRORS = (
+    ChannelInvalid,
+    ChannelPrivate,
+    PeerIdInvalid,
+    UsernameInvalid,
+    UsernameNotOccupied,
+)
+
+# estatísticas da tarefa atual; cada tarefa do `serve` roda no próprio contexto
+_job_stats: ContextVar[JobStats] = ContextVar("job_stats")
+
+
+async def collect_burst(
+    queue: asyncio.Queue, window: float, limit: int
+) -> list[Message]:
+    """
+    Aguarda a próxima mensagem e junta as que chegarem em até `window` segundos depois dela
+    (no máximo `limit`), para tratar rajadas de posts em um único lote.
+    """
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + window
+    while len(batch) < limit and (timeout := deadline - loop.time()) > 0:
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+@dataclass
+class ScanProgress:
+    """Estado da varredura carregado entre as janelas de ids."""
+
+    accepted: int = 0
+    scanned: int = 0
+    windows: int = 0
 
 
 # -----------------------------
@@ -11,15 +81,375 @@ class BaseTG:
     """Classe base para comportamentos comuns entre Userbot e Bot."""
 
     LIMIT_GET_MESSAGES = 200
+    # lotes vazios sondados, a distâncias que dobram, antes de concluir que o chat acabou
+    LATEST_PROBES = 6
+
+    # tipos aceitos em um álbum (media group) e o máximo de itens por álbum
+    ALBUM_MEDIA = {
+        "photo": InputMediaPhoto,
+        "video": InputMediaVideo,
+        "document": InputMediaDocument,
+        "audio": InputMediaAudio,
+    }
+    ALBUM_SIZE = 10
 
     def __init__(self, client: Client) -> None:
         self.client = client
+        # sem limite por padrão; a CLI configura a partir de "limit-up"/"limit-down"
+        self.bandwidth = BandwidthLimiter()
+        self.stats = JobStats()
+        self._session_lock = asyncio.Lock()
+        self._session_users = 0
+        # a CLI configura para o userbot, cuja sessão (session string) fica só em memória
+        self.peer_cache: DBManager | None = None
+        self._peer_account: str | None = None
+        # conexões de mídia por data center, abertas junto com a sessão
+        self.media_connections = 1
+        self.media = MediaSessionPool(client)
+
+    @property
+    def stats(self) -> JobStats:
+        return _job_stats.get()
+
+    @stats.setter
+    def stats(self, value: JobStats) -> None:
+        _job_stats.set(value)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncGenerator[Client, None]:
+        """
+        Conecta o cliente na primeira entrada e desconecta na última. Entradas aninhadas ou
+        simultâneas reaproveitam a mesma conexão (o `serve` mantém uma aberta o tempo todo).
+        """
+        async with self._session_lock:
+            if self._session_users == 0:
+                await self.client.start()
+                self.media = MediaSessionPool(self.client, self.media_connections)
+                await self._load_peers()
+            self._session_users += 1
+        try:
+            yield self.client
+        finally:
+            async with self._session_lock:
+                self._session_users -= 1
+                if self._session_users == 0:
+                    try:
+                        await self._save_peers()
+                        await self.media.close()
+                    finally:
+                        await self.client.stop()
+
+    @asynccontextmanager
+    async def autotune(self, tuner: AutoTuner | None) -> AsyncGenerator[None, None]:
+        """
+        Roda o `tuner` em segundo plano durante a tarefa, medindo as estatísticas dela e
+        recebendo os FloodWait tratados pelo `handle_floodwait`.
+        """
+        if tuner is None:
+            yield
+            return
+        token = floodwait_listener.set(tuner.floodwait)
+        task = asyncio.create_task(tuner.run(self.stats))
+        try:
+            yield
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            floodwait_listener.reset(token)
+
+    async def _load_peers(self) -> None:
+        """Carrega na sessão os peers já resolvidos pela conta em execuções anteriores."""
+        if not self.peer_cache:
+            return
+        self._peer_account = str(await self.client.storage.user_id())
+        peers = self.peer_cache.get_peers(self._peer_account, SQLiteStorage.USERNAME_TTL)
+        if peers:
+            # grava com o horário original de cada peer (o update_peers usaria o atual),
+            # assim o prazo dos usernames não recomeça a cada execução
+            conn = self.client.storage.conn  # type: ignore
+            await conn.executemany(
+                "REPLACE INTO peers (id, access_hash, type, username, phone_number, last_update_on)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(peer) for peer in peers],
+            )
+            await conn.commit()
+
+    async def _save_peers(self) -> None:
+        """Salva os peers conhecidos pela sessão (os carregados e os resolvidos agora)."""
+        if not (self.peer_cache and self._peer_account):
+            return
+        conn = self.client.storage.conn  # type: ignore
+        cursor = await conn.execute(
+            "SELECT id, access_hash, type, username, phone_number, last_update_on FROM peers"
+        )
+        peers = [list(row) for row in await cursor.fetchall()]
+        self.peer_cache.set_peers(self._peer_account, peers)
+
+    async def _forget_peer(self, chat_id: int | str) -> bool:
+        """
+        Remove o peer do cache (sessão e banco) para que seja resolvido de novo pela API.
+        Retorna se ele estava salvo.
+        """
+        if not (self.peer_cache and self._peer_account):
+            return False
+        peer = chat_id.lstrip("@").lower() if isinstance(chat_id, str) else chat_id
+        conn = self.client.storage.conn  # type: ignore
+        await conn.execute("DELETE FROM peers WHERE id = ? OR username = ?", (peer, peer))
+        await conn.commit()
+        return self.peer_cache.remove_peer(self._peer_account, peer)
 
     async def verify_chat_id(self, chat_id: int | str) -> None:
         """Verifica se o chat existe e o cliente tem acesso."""
         try:
-            async with self.client:
-                await self.client.get_chat(chat_id)
-                console.log(f"[green]Chat verificado! ID: {chat_id}[/green]")
+            async with self.session():
+                try:
+                    await self.client.get_chat(chat_id)
+                except PEER_ERRORS:
+                    # o peer salvo pode estar desatualizado (access hash ou username)
+                    if not await self._forget_peer(chat_id):
+                        raise
+                    log.warning(
+                        f"Peer do cache inválido, resolvendo de novo! ID: {chat_id}"
+                    )
+                    await self.client.get_chat(chat_id)
+                log.info(f"Chat verificado! ID: {chat_id}")
         except Exception as e:
             raise TGToolsError(f"Erro ao verificar chat! Erro {e}")
+
+    async def iter_messages(
+        self, chat_id: int | str, message_ids: Sequence[int]
+    ) -> AsyncGenerator[list[Message], None]:
+        """
+        Busca as mensagens em lotes de até LIMIT_GET_MESSAGES ids por chamada.
+        O cliente precisa estar conectado.
+        """
+        for batch in chunked(message_ids, self.LIMIT_GET_MESSAGES):
+            messages = await handle_floodwait(
+                self.client.get_messages, chat_id, message_ids=list(batch)
+            )
+            if not isinstance(messages, list):
+                messages = [messages]
+            yield cast(list[Message], messages)
+
+    async def get_topic(self, chat_id: int | str, msg_thread_id: int) -> ForumTopic:
+        """Busca o tópico do fórum. O cliente precisa estar conectado."""
+        topics = await self.client.get_forum_topics_by_id(
+            chat_id, topic_ids=msg_thread_id
+        )
+        if not topics:
+            raise TGToolsError(f"Tópico inexistente! ID: {msg_thread_id}")
+        topic = topics[0] if isinstance(topics, list) else topics
+        log.info(
+            f"Tópico indentificado: {topic.title}, Última mensagem: {topic.top_message}"
+        )
+        return topic
+
+    async def scan_messages(
+        self,
+        chat_id: int | str,
+        start_id: int,
+        target: int,
+        process: Callable[[list[Any], int], Awaitable[tuple[int, int | None]]],
+        lookahead: bool = False,
+        end_id: int | None = None,
+        msg_thread_id: int | None = None,
+        select: Callable[[Message], Any] | None = None,
+    ) -> ScanProgress:
+        """
+        Entrega janelas de mensagens a partir de `start_id` para `process` até ele aceitar
+        `target` mensagens. `process(mensagens, restantes)` retorna (aceitas, id em que parou);
+        a próxima janela começa logo depois desse id, ou no fim da janela se ele for None.
+
+        Sem `lookahead`, lê só os `target` ids a partir de `start_id`. Com ele, segue lendo
+        até atingir o alvo, passar de `end_id` ou encontrar uma janela sem nenhuma mensagem
+        (fim do chat). As janelas têm no máximo LIMIT_GET_MESSAGES ids e `select` converte
+        cada mensagem assim que chega (None descarta), então a memória não cresce com o
+        intervalo lido. O cliente precisa estar conectado.
+        """
+        progress = ScanProgress()
+        next_id = start_id
+        if not lookahead:
+            last = start_id + target - 1
+            end_id = last if end_id is None else min(end_id, last)
+
+        while progress.accepted < target:
+            stop = next_id + self.LIMIT_GET_MESSAGES
+            if end_id is not None:
+                stop = min(stop, end_id + 1)
+            if stop <= next_id:
+                break
+
+            window: list[Any] = []
+            empty = True
+            async for batch in self.iter_messages(chat_id, range(next_id, stop)):
+                for msg in batch:
+                    empty = empty and msg.empty
+                    if msg_thread_id and msg.message_thread_id != msg_thread_id:
+                        continue
+                    item = select(msg) if select else msg
+                    if item is not None:
+                        window.append(item)
+            progress.windows += 1
+
+            accepted, last_id = await process(window, target - progress.accepted)
+            progress.accepted += accepted
+
+            scanned_until = stop if last_id is None else last_id + 1
+            progress.scanned += scanned_until - next_id
+            next_id = scanned_until
+
+            if lookahead and empty:
+                break
+
+        log.info(
+            f"Varredura concluída! Ids lidos: {progress.scanned}, Aceitas: {progress.accepted}/{target}, Janelas: {progress.windows}"
+        )
+        return progress
+
+    async def plan_messages(
+        self,
+        groups: dict[int | str, list[int]],
+        plan: JobPlan,
+        classify: Callable[[Message], tuple[str | None, str | None]],
+        msg_thread_id: int | None = None,
+    ) -> JobPlan:
+        """
+        Preenche o `plan` só com os metadados das mensagens, sem transferir ou gravar nada.
+        `classify` retorna (motivo do descarte, tipo da mídia) para cada mensagem.
+        """
+        async with self.session():
+            for chat_id, message_ids in groups.items():
+                async for messages in self.iter_messages(chat_id, message_ids):
+                    for msg in messages:
+                        if msg_thread_id and msg.message_thread_id != msg_thread_id:
+                            plan.reject("tópico")
+                            continue
+
+                        reason, kind = classify(msg)
+                        if reason or not kind:
+                            plan.reject(reason or "tipo de mídia")
+                            continue
+
+                        media = getattr(msg, kind, None)
+                        plan.accept(
+                            msg.id,
+                            kind,
+                            size=getattr(media, "file_size", 0) or 0,
+                            name=getattr(media, "file_name", None) or "",
+                        )
+        return plan
+
+    async def export_catalog(
+        self,
+        chat_id: int | str,
+        message_ids: Sequence[int],
+        writer: CatalogWriter,
+        msg_thread_id: int | None = None,
+    ) -> int:
+        """
+        Grava no `writer` os metadados das mensagens, lote a lote, e retorna quantas foram
+        exportadas. Mensagens excluídas (e de outros tópicos) são ignoradas.
+        """
+        total = len(message_ids)
+        scanned = 0
+        async with self.session():
+            async for messages in self.iter_messages(chat_id, message_ids):
+                scanned += len(messages)
+                for msg in messages:
+                    if msg.empty:
+                        continue
+                    if msg_thread_id and msg.message_thread_id != msg_thread_id:
+                        continue
+                    writer.write(message_record(msg, chat_id))
+                if log.progress:
+                    console.print(
+                        f"Exportando: {scanned}/{total} mensagens lidas, {writer.count} exportadas",
+                        end="\r",
+                    )
+        log.summary(
+            f"Catálogo exportado! Mensagens: {writer.count}, Arquivo: {writer.path}"
+        )
+        return writer.count
+
+    async def latest_message_id(self, chat_id: int | str, after: int) -> int:
+        """
+        Retorna o maior id de mensagem existente depois de `after`, sondando lotes de
+        LIMIT_GET_MESSAGES ids. Um lote vazio pode ser só uma sequência de mensagens apagadas,
+        então segue sondando lotes cada vez mais distantes (LATEST_PROBES lotes vazios
+        seguidos) antes de concluir; lacunas maiores que o alcance das sondas não são
+        detectadas. O cliente precisa estar conectado.
+        """
+        latest, start = after, after + 1
+        misses = 0
+        while True:
+            message_ids = list(range(start, start + self.LIMIT_GET_MESSAGES))
+            messages = await handle_floodwait(
+                self.client.get_messages, chat_id, message_ids=message_ids
+            )
+            found = [msg.id for msg in cast(list[Message], messages) if not msg.empty]
+            if found:
+                latest = max(found)
+                start = latest + 1
+                misses = 0
+                continue
+            if misses == self.LATEST_PROBES:
+                log.debug(
+                    "Última mensagem: %s (nenhuma mensagem sondada até o id %s)",
+                    latest,
+                    message_ids[-1],
+                )
+                return latest
+            start += self.LIMIT_GET_MESSAGES * 2**misses
+            misses += 1
+
+    async def mirror_messages(
+        self,
+        chat_id: int | str,
+        handle_batch: Callable[[list[Message]], Awaitable[None]],
+        last_id: int | None,
+        on_mark: Callable[[int], None],
+        window: float = 2.0,
+    ) -> None:
+        """
+        Repassa para `handle_batch` as mensagens novas do chat assim que chegam, agrupando
+        rajadas em lotes. Com `last_id`, primeiro recupera o que foi postado desde então.
+        Após cada lote chama `on_mark` com o maior id processado. Roda até ser interrompido.
+        """
+        queue: asyncio.Queue[Message] = asyncio.Queue()
+
+        async def on_message(_: Client, message: Message) -> None:
+            await queue.put(message)
+
+        handler = MessageHandler(on_message, filters.chat(chat_id))
+
+        async with self.session():
+            # registra antes da recuperação para não perder o que chegar nesse meio tempo
+            self.client.add_handler(handler)
+            try:
+                mark = last_id
+                if mark is not None:
+                    latest = await self.latest_message_id(chat_id, mark)
+                    log.info(f"Recuperando mensagens! De: {mark + 1}, Até: {latest}")
+                    message_ids = list(range(mark + 1, latest + 1))
+                    async for messages in self.iter_messages(chat_id, message_ids):
+                        await handle_batch([msg for msg in messages if not msg.empty])
+                        mark = max(msg.id for msg in messages)
+                        on_mark(mark)
+
+                log.info(f"Aguardando novas mensagens! Chat: {chat_id}")
+                while True:
+                    burst = await collect_burst(queue, window, self.LIMIT_GET_MESSAGES)
+                    batch = sorted(
+                        {
+                            msg.id: msg for msg in burst if mark is None or msg.id > mark
+                        }.values(),
+                        key=lambda msg: msg.id,
+                    )
+                    if not batch:
+                        continue
+                    await handle_batch(batch)
+                    mark = batch[-1].id
+                    on_mark(mark)
+            finally:
+                self.client.remove_handler(handler)
@@ -1,13 +1,20 @@
 import asyncio
-from typing import cast
+from typing import Callable
 
 from hydrogram import Client
-from hydrogram.types import ForumTopic, Message
+from hydrogram.types import Message
 
 from tg_tools.base_tg import BaseTG
-from tg_tools.config import console
 from tg_tools.exceptions import TGToolsError
-from tg_tools.utils import caption_filters, get_link_info, handle_floodwait
+from tg_tools.logs import log
+from tg_tools.planning import JobPlan, JobStats
+from tg_tools.utils import (
+    caption_filters,
+    get_link_info,
+    group_albums,
+    group_links_by_chat,
+    handle_floodwait,
+)
 
 
 # -----------------------------
@@ -26,6 +33,18 @@ class Bot(BaseTG):
         "sticker",
     )
 
+    # ordem em que _send_message procura o conteúdo da mensagem
+    COPY_ORDER = (
+        "document",
+        "video",
+        "animation",
+        "sticker",
+        "voice",
+        "audio",
+        "text",
+        "photo",
+    )
+
     def __init__(self, api_id: str, api_hash: str, bot_token: str) -> None:
         super().__init__(
             Client("bot", api_id=api_id, api_hash=api_hash, bot_token=bot_token)
@@ -33,12 +52,386 @@ class Bot(BaseTG):
 
     async def verify_token(self) -> None:
         try:
-            async with self.client:
+            async with self.session():
                 user = await self.client.get_me()
-                console.log(f"[green]Token verificado! Bot: {user.first_name}[/green]")
+                log.info(f"Token verificado! Bot: {user.first_name}")
         except Exception as e:
             raise TGToolsError(f"Erro ao verificar token! Erro {e}")
 
+    def _get_copy_kind(self, msg: Message, media_type: str) -> str | None:
+        """Retorna o tipo de conteúdo que será copiado da mensagem (None se nenhum)."""
+        for kind in self.COPY_ORDER:
+            if media_type in ("all", kind) and getattr(msg, kind, None):
+                return kind
+        return None
+
+    async def plan_copy(
+        self,
+        groups: dict[int | str, list[int]],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        msg_thread_id: int | None = None,
+    ) -> JobPlan:
+        """Dimensiona uma cópia só com os metadados, sem enviar nada e sem o --delay."""
+
+        def classify(msg: Message) -> tuple[str | None, str | None]:
+            if getattr(msg, "empty", False):
+                return "mensagem vazia", None
+            if not caption_filters(msg, filter_caption_includes):
+                return "caption", None
+            return None, self._get_copy_kind(msg, media_type)
+
+        for chat_id in groups:
+            await self.verify_chat_id(chat_id)
+
+        return await self.plan_messages(
+            groups, JobPlan("copy"), classify, msg_thread_id=msg_thread_id
+        )
+
+    async def _send_message(
+        self,
+        msg: Message,
+        to_chat_id: int | str,
+        media_type: str,
+        test_mode: bool,
+    ) -> tuple[Message | None, bool] | tuple[None, None]:
+        """
+        Reenvia a mensagem para o chat de destino.
+        Retorna (resposta, pular), onde `pular` indica que a mensagem não tem conteúdo do tipo desejado.
+        """
+        media_type_all = media_type == "all"
+        message_media_type = None
+
+        if (media_type_all or media_type == "document") and msg.document:
+            message_media_type = "document"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_document(
+                            to_chat_id,
+                            document=msg.document.file_id,
+                            caption=msg.caption,
+                            caption_entities=msg.caption_entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "video") and msg.video:
+            message_media_type = "video"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_video(
+                            to_chat_id,
+                            video=msg.video.file_id,
+                            caption=msg.caption,
+                            caption_entities=msg.caption_entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "animation") and msg.animation:
+            message_media_type = "animation"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_animation(
+                            to_chat_id,
+                            animation=msg.animation.file_id,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "sticker") and msg.sticker:
+            message_media_type = "sticker"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_sticker(
+                            to_chat_id,
+                            sticker=msg.sticker.file_id,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "voice") and msg.voice:
+            message_media_type = "voice"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_voice(
+                            to_chat_id,
+                            voice=msg.voice.file_id,
+                            caption=msg.caption,
+                            caption_entities=msg.caption_entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "audio") and msg.audio:
+            message_media_type = "audio"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_audio(
+                            to_chat_id,
+                            audio=msg.audio.file_id,
+                            caption=msg.caption,
+                            caption_entities=msg.caption_entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "text") and msg.text:
+            message_media_type = "text"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_message(
+                            to_chat_id,
+                            text=msg.text,
+                            entities=msg.entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        if (media_type_all or media_type == "photo") and msg.photo:
+            message_media_type = "photo"
+            if not test_mode:
+                return (
+                    await handle_floodwait(
+                        lambda: self.client.send_photo(
+                            to_chat_id,
+                            photo=msg.photo.file_id,
+                            caption=msg.caption,
+                            caption_entities=msg.caption_entities,
+                            reply_to_message_id=msg.id,
+                        )
+                    ),
+                    False,
+                )
+
+        # if test_mode, devolve a própria msg para marcação como enviada
+        if test_mode and message_media_type:
+            return msg, False
+
+        return None, True
+
+    async def _copy_one(
+        self,
+        msg: Message,
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        counter: str,
+        failed: list[int] | None = None,
+    ) -> bool:
+        """
+        Copia uma mensagem avulsa e aguarda o `delay`. Retorna True se foi copiada; se o envio
+        falhar, o id vai para `failed`.
+        """
+        if not caption_filters(msg, filter_caption_includes):
+            log.debug(
+                "Caption não contém os filtros %s (%s)! ID: %s",
+                filter_caption_includes,
+                counter,
+                msg.id,
+            )
+            return False
+
+        try:
+            response, skip = await handle_floodwait(
+                self._send_message,
+                msg=msg,
+                to_chat_id=to_chat_id,
+                media_type=media_type,
+                test_mode=test_mode,
+            )
+        except Exception as e:
+            response, skip = None, True
+            log.error(
+                "Erro ao copiar mensagem (%s)! Erro %s", counter, e, msg_id=msg.id
+            )
+            if failed is not None:
+                failed.append(msg.id)
+
+        if skip:
+            pass
+        elif response:
+            self.stats.messages += 1
+            log.info("Mensagem copiada (%s)! ID: %s", counter, msg.id, msg_id=msg.id)
+        else:
+            log.error(
+                "Mensagem inválida ou excluída (%s)! ID: %s", counter, msg.id, msg_id=msg.id
+            )
+            if failed is not None:
+                failed.append(msg.id)
+
+        log.debug("Aguardando %s segundo(s)...", delay)
+        await asyncio.sleep(delay)
+        self.stats.waited += delay
+        return bool(response) and not skip
+
+    async def _copy_album(
+        self,
+        album: list[Message],
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        counter: str,
+        failed: list[int] | None = None,
+    ) -> int:
+        """
+        Copia um álbum (mesmo media_group_id) com uma única chamada a send_media_group e
+        aguarda o `delay`. Retorna quantas mensagens do álbum foram copiadas; se o envio
+        falhar, os ids vão para `failed`.
+        """
+        # o caption do álbum costuma estar só em uma das mensagens
+        if not any(caption_filters(msg, filter_caption_includes) for msg in album):
+            log.debug(
+                "Caption não contém os filtros %s (%s)! Álbum: %s",
+                filter_caption_includes,
+                counter,
+                album[0].media_group_id,
+            )
+            return 0
+
+        media = []
+        for msg in album:
+            kind = self._get_copy_kind(msg, media_type)
+            if kind in self.ALBUM_MEDIA:
+                media.append(
+                    self.ALBUM_MEDIA[kind](
+                        getattr(msg, kind).file_id,
+                        caption=msg.caption or "",
+                        caption_entities=msg.caption_entities,
+                    )
+                )
+
+        # sem ao menos 2 itens não há grupo: envia como mensagens avulsas
+        if len(media) < 2:
+            copied = 0
+            for msg in album:
+                if await self._copy_one(
+                    msg,
+                    to_chat_id=to_chat_id,
+                    delay=delay,
+                    media_type=media_type,
+                    filter_caption_includes=None,
+                    test_mode=test_mode,
+                    counter=counter,
+                    failed=failed,
+                ):
+                    copied += 1
+            return copied
+
+        copied = 0
+        try:
+            if not test_mode:
+                await handle_floodwait(
+                    lambda: self.client.send_media_group(
+                        to_chat_id, media=media, reply_to_message_id=album[0].id
+                    )
+                )
+            copied = len(media)
+            self.stats.messages += copied
+            log.info(
+                f"Álbum copiado ({counter})! Mensagens: {copied}, IDs: {album[0].id}-{album[-1].id}"
+            )
+        except Exception as e:
+            log.error(f"Erro ao copiar álbum ({counter})! Erro {e}")
+            if failed is not None:
+                failed.extend(msg.id for msg in album)
+
+        log.debug("Aguardando %s segundo(s)...", delay)
+        await asyncio.sleep(delay)
+        self.stats.waited += delay
+        return copied
+
+    async def _copy_batch(
+        self,
+        messages: list[Message],
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        total: int,
+        start: int = 0,
+        limit: int | None = None,
+        hold_album: bool = False,
+        failed: list[int] | None = None,
+    ) -> tuple[int, int | None]:
+        """
+        Copia as mensagens em ordem, enviando cada álbum como um único grupo (álbuns não são
+        divididos, mesmo que passem do `limit`). Para ao copiar `limit` mensagens e retorna
+        (copiadas, id em que parou), com None quando o lote todo foi considerado.
+
+        Com `hold_album`, um álbum no fim do lote pode continuar no próximo: ele não é enviado
+        e o id em que parou é o da mensagem anterior a ele. Os ids cujo envio falhou vão
+        para `failed`.
+        """
+        units = group_albums(messages)
+        held_from = None
+        if hold_album and len(units) > 1 and getattr(units[-1][0], "media_group_id", None):
+            units.pop()
+            held_from = units[-1][-1].id
+
+        copied = 0
+        last_id = None
+        for unit in units:
+            if limit is not None and copied >= limit:
+                return copied, last_id
+            last_id = unit[-1].id
+            counter = f"{start + copied + 1}/{total}"
+
+            if len(unit) > 1:
+                copied += await self._copy_album(
+                    unit,
+                    to_chat_id=to_chat_id,
+                    delay=delay,
+                    media_type=media_type,
+                    filter_caption_includes=filter_caption_includes,
+                    test_mode=test_mode,
+                    counter=counter,
+                    failed=failed,
+                )
+            # nada a enviar, então não aguarda o delay
+            elif unit[0].empty:
+                log.error(
+                    f"Mensagem inválida ou excluída ({counter})! ID: {unit[0].id}"
+                )
+            elif await self._copy_one(
+                unit[0],
+                to_chat_id=to_chat_id,
+                delay=delay,
+                media_type=media_type,
+                filter_caption_includes=filter_caption_includes,
+                test_mode=test_mode,
+                counter=counter,
+                failed=failed,
+            ):
+                copied += 1
+        return copied, held_from
+
     async def copy_messages(
         self,
         link: str,
@@ -59,257 +452,251 @@ class Bot(BaseTG):
         await self.verify_chat_id(chat_id)
         await self.verify_chat_id(to_chat_id)
 
-        async with self.client:
-            console.log(
-                f"[blue]Copiando mensagens! Chat: {chat_id}, Chat de destino: {to_chat_id}, Quantidade: {number_files}[/blue]"
-            )
-
-            async def enviar_mensagem(
-                msg: Message,
-            ) -> tuple[Message | None, bool] | tuple[None, None]:
-                media_type_all = media_type == "all"
-                message_media_type = None
-
-                if (media_type_all or media_type == "document") and msg.document:
-                    message_media_type = "document"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_document(
-                                    to_chat_id,
-                                    document=msg.document.file_id,
-                                    caption=msg.caption,
-                                    caption_entities=msg.caption_entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+        self.stats = JobStats()
 
-                if (media_type_all or media_type == "video") and msg.video:
-                    message_media_type = "video"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_video(
-                                    to_chat_id,
-                                    video=msg.video.file_id,
-                                    caption=msg.caption,
-                                    caption_entities=msg.caption_entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+        async with self.session():
+            log.info(
+                f"Copiando mensagens! Chat: {chat_id}, Chat de destino: {to_chat_id}, Quantidade: {number_files}"
+            )
 
-                if (media_type_all or media_type == "animation") and msg.animation:
-                    message_media_type = "animation"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_animation(
-                                    to_chat_id,
-                                    animation=msg.animation.file_id,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+            copied = 0
+
+            async def process(
+                messages: list[Message], remaining: int
+            ) -> tuple[int, int | None]:
+                nonlocal copied
+                accepted, stopped_at = await self._copy_batch(
+                    messages,
+                    to_chat_id=to_chat_id,
+                    delay=delay,
+                    media_type=media_type,
+                    filter_caption_includes=filter_caption_includes,
+                    test_mode=test_mode,
+                    total=number_files,
+                    start=copied,
+                    limit=remaining,
+                    hold_album=True,
+                )
+                copied += accepted
+                return accepted, stopped_at
+
+            # com --verify-messages (ou em tópicos) continua lendo janelas até completar
+            topic = None
+            if msg_thread_id:
+                topic = await self.get_topic(chat_id, msg_thread_id)
+            await self.scan_messages(
+                chat_id,
+                start_id=start_msg_id,
+                target=number_files,
+                process=process,
+                lookahead=verify_messages or topic is not None,
+                end_id=topic.top_message if topic else None,
+                msg_thread_id=topic.id if topic else None,
+            )
 
-                if (media_type_all or media_type == "sticker") and msg.sticker:
-                    message_media_type = "sticker"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_sticker(
-                                    to_chat_id,
-                                    sticker=msg.sticker.file_id,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+            log.summary(
+                f"Mensagens copiadas ({copied}/{number_files})! Chat: {chat_id}"
+            )
 
-                if (media_type_all or media_type == "voice") and msg.voice:
-                    message_media_type = "voice"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_voice(
-                                    to_chat_id,
-                                    voice=msg.voice.file_id,
-                                    caption=msg.caption,
-                                    caption_entities=msg.caption_entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+    async def copy_links(
+        self,
+        links: list[str],
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+    ) -> None:
+        """
+        Copia mensagens de uma lista de links avulsos para o chat id informado.
+        Os links são agrupados por chat e buscados em lotes de até LIMIT_GET_MESSAGES ids.
+        """
 
-                if (media_type_all or media_type == "audio") and msg.audio:
-                    message_media_type = "audio"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_audio(
-                                    to_chat_id,
-                                    audio=msg.audio.file_id,
-                                    caption=msg.caption,
-                                    caption_entities=msg.caption_entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+        groups = group_links_by_chat(links)
+        if not groups:
+            raise TGToolsError("Nenhum link válido encontrado!")
 
-                if (media_type_all or media_type == "text") and msg.text:
-                    message_media_type = "text"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_message(
-                                    to_chat_id,
-                                    text=msg.text,
-                                    entities=msg.entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+        for chat_id in groups:
+            await self.verify_chat_id(chat_id)
+        await self.verify_chat_id(to_chat_id)
 
-                if (media_type_all or media_type == "photo") and msg.photo:
-                    message_media_type = "photo"
-                    if not test_mode:
-                        return (
-                            await handle_floodwait(
-                                lambda: self.client.send_photo(
-                                    to_chat_id,
-                                    photo=msg.photo.file_id,
-                                    caption=msg.caption,
-                                    caption_entities=msg.caption_entities,
-                                    reply_to_message_id=msg.id,
-                                )
-                            ),
-                            False,
-                        )
+        await self._copy_groups(
+            groups,
+            to_chat_id=to_chat_id,
+            delay=delay,
+            media_type=media_type,
+            filter_caption_includes=filter_caption_includes,
+            test_mode=test_mode,
+        )
 
-                # if test_mode, devolve a própria msg para marcação como enviada
-                if test_mode and message_media_type:
-                    return msg, False
+    async def copy_sync(
+        self,
+        link: str,
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        last_id: int | None,
+        on_mark: Callable[[int], None],
+        test_mode: bool,
+    ) -> None:
+        """
+        Copia tudo o que foi postado no chat do link desde o último id processado (`last_id`)
+        até a última mensagem. Sem `last_id`, começa pela mensagem do link.
+        """
 
-                return None, True
+        chat_id, msg_thread_id, start_msg_id = get_link_info(link)
+        if last_id is not None:
+            start_msg_id = last_id + 1
 
-            async def read(
-                message_ids: list[int],
-                number_files_local: int,
-                topic: ForumTopic | None = None,
-            ) -> None:
-                if number_files_local == 0 or not message_ids:
-                    console.log("[green]Nada a fazer neste range.[/green]")
-                    return
+        await self.verify_chat_id(chat_id)
+        await self.verify_chat_id(to_chat_id)
 
-                messages = cast(
-                    list[Message],
-                    await self.client.get_messages(chat_id, message_ids=message_ids),
-                )
-                total_message_ids = len(messages)
-                valid_messages: list[int] = []
+        async with self.session():
+            latest = await self.latest_message_id(chat_id, start_msg_id - 1)
+            log.info(
+                f"Sincronizando! Chat: {chat_id}, De: {start_msg_id}, Até: {latest}"
+            )
+            await self._copy_groups(
+                {chat_id: list(range(start_msg_id, latest + 1))},
+                to_chat_id=to_chat_id,
+                delay=delay,
+                media_type=media_type,
+                filter_caption_includes=filter_caption_includes,
+                test_mode=test_mode,
+                msg_thread_id=msg_thread_id,
+                on_mark=on_mark,
+            )
 
-                for index, msg in enumerate(messages):
-                    if topic and (topic.id != msg.message_thread_id):
-                        continue
+    async def _copy_groups(
+        self,
+        groups: dict[int | str, list[int]],
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        msg_thread_id: int | None = None,
+        on_mark: Callable[[int], None] | None = None,
+    ) -> None:
+        """
+        Copia as mensagens agrupadas por chat, buscadas em lotes de até LIMIT_GET_MESSAGES ids.
+        Após cada lote chama `on_mark` com o maior id do lote, ou com o anterior ao álbum que
+        ficou para o próximo lote. A marca nunca passa de uma mensagem cujo envio falhou, para
+        que ela seja tentada de novo na próxima execução.
+        """
 
-                    # filtros
-                    if not caption_filters(msg, filter_caption_includes):
-                        console.log(
-                            f"[red]Caption não contém os filtros {filter_caption_includes} ({index + 1}/{total_message_ids})! ID: {msg.id}[/red]"
-                        )
-                        continue
+        total_links = sum(len(ids) for ids in groups.values())
 
-                    try:
-                        response, skip = await handle_floodwait(
-                            enviar_mensagem, msg=msg
-                        )
-                    except Exception as e:
-                        skip = True
-                        console.log(
-                            f"[red]Erro ao copiar mensagem ({index + 1}/{total_message_ids})! Erro {e}[/red]"
-                        )
+        self.stats = JobStats()
 
-                    finally:
-                        if skip:
-                            pass
-                        elif response:
-                            valid_messages.append(msg.id)
-                            console.log(
-                                f"[green]Mensagem copiada ({index + 1}/{total_message_ids})! ID: {msg.id}[/green]"
-                            )
-                        else:
-                            console.log(
-                                f"[red]Mensagem inválida ou excluída ({index + 1}/{total_message_ids})! ID: {msg.id}[/red]"
-                            )
-
-                        console.log(f"[blue]Aguardando {delay} segundo(s)...[/blue]")
-                        await asyncio.sleep(delay)
-
-                total_valid_messages = len(valid_messages)
-                console.log(
-                    f"[green]Mensagens copiadas ({total_valid_messages}/{number_files_local})! Chat: {chat_id}[/green]"
-                )
+        async with self.session():
+            log.info(
+                f"Copiando mensagens! Mensagens: {total_links}, Chats: {len(groups)}, Chat de destino: {to_chat_id}"
+            )
 
-                if (
-                    verify_messages
-                    and not topic
-                    and total_valid_messages > 0
-                    and total_valid_messages < number_files_local
-                ):
-                    console.log(
-                        "[blue]Verificando mensagens novamente por conteúdos ausentes...[/blue]"
+            total_copied = 0
+
+            for chat_id, message_ids in groups.items():
+                # o álbum no fim de um lote segue para o próximo, para não ser dividido
+                held: list[Message] = []
+                failed: list[int] = []
+
+                def mark(upto: int) -> None:
+                    if on_mark:
+                        on_mark(min([upto] + [msg_id - 1 for msg_id in failed]))
+
+                async for messages in self.iter_messages(chat_id, message_ids):
+                    batch = held + [
+                        msg
+                        for msg in messages
+                        if not msg_thread_id or msg.message_thread_id == msg_thread_id
+                    ]
+                    copied, held_from = await self._copy_batch(
+                        batch,
+                        to_chat_id=to_chat_id,
+                        delay=delay,
+                        media_type=media_type,
+                        filter_caption_includes=filter_caption_includes,
+                        test_mode=test_mode,
+                        total=total_links,
+                        start=total_copied,
+                        hold_album=True,
+                        failed=failed,
                     )
-                    difference = number_files_local - total_valid_messages
-                    last_id = valid_messages[-1] if valid_messages else message_ids[-1]
-                    new_message_ids = list(range(last_id + 1, last_id + 1 + difference))
-                    await read(new_message_ids, number_files_local=difference)
-
-                if topic and total_valid_messages < number_files_local:
-                    difference = number_files_local - total_valid_messages
-                    last_valid_msg_id = (
-                        valid_messages[-1] if valid_messages else message_ids[-1]
+                    total_copied += copied
+                    held = [
+                        msg
+                        for msg in batch
+                        if held_from is not None and msg.id > held_from
+                    ]
+
+                    if messages:
+                        last_seen = max(msg.id for msg in messages)
+                        mark(held_from if held else last_seen)
+
+                if held:
+                    copied, _ = await self._copy_batch(
+                        held,
+                        to_chat_id=to_chat_id,
+                        delay=delay,
+                        media_type=media_type,
+                        filter_caption_includes=filter_caption_includes,
+                        test_mode=test_mode,
+                        total=total_links,
+                        start=total_copied,
+                        failed=failed,
                     )
-                    last_msg_id_topic = topic.top_message
-                    range_msgs_id_topic = list(
-                        range(last_valid_msg_id + 1, last_msg_id_topic)
+                    total_copied += copied
+                    mark(last_seen)
+
+                if on_mark and failed:
+                    log.warning(
+                        "Progresso mantido antes da mensagem %s, que falhou! Chat: %s",
+                        min(failed),
+                        chat_id,
                     )
-                    total_range_msgs_id_topic = len(range_msgs_id_topic)
 
-                    console.log(
-                        "[yellow]Verificando mensagens novamente por conteúdos ausentes...[/yellow]"
-                    )
-                    console.log(
-                        f"[yellow]Será usado um deslocamento de {total_range_msgs_id_topic} ids no tópico a partir da mensagem: {last_valid_msg_id}[/yellow]"
-                    )
-                    if total_range_msgs_id_topic > self.LIMIT_GET_MESSAGES:
-                        range_msgs_id_topic = range_msgs_id_topic[
-                            0 : self.LIMIT_GET_MESSAGES
-                        ]
+            log.summary(f"Mensagens copiadas ({total_copied}/{total_links})!")
 
-                    await read(
-                        range_msgs_id_topic, number_files_local=difference, topic=topic
-                    )
+    async def mirror_copy(
+        self,
+        chat_id: int | str,
+        to_chat_id: int | str,
+        delay: float,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        last_id: int | None,
+        on_mark: Callable[[int], None],
+        window: float,
+        test_mode: bool,
+    ) -> None:
+        """
+        Copia as mensagens novas do chat conforme são postadas, até ser interrompido.
+        Com `last_id`, começa recuperando o que foi postado depois dele.
+        """
 
-            range_init = list(range(start_msg_id, start_msg_id + number_files))
-            if not msg_thread_id:
-                await read(range_init, number_files_local=number_files)
-            else:
-                topics = await self.client.get_forum_topics_by_id(
-                    chat_id, topic_ids=msg_thread_id
-                )
-                if not topics:
-                    raise TGToolsError(f"Tópico inexistente! ID: {msg_thread_id}")
-                topic = topics[0] if isinstance(topics, list) else topics
+        await self.verify_chat_id(chat_id)
+        await self.verify_chat_id(to_chat_id)
 
-                last_msg_id_topic = topic.top_message
-                console.log(
-                    f"[blue]Tópico indentificado: {topic.title}, Mensagem inicial: {start_msg_id}, Última mensagem: {last_msg_id_topic}[/blue]"
-                )
-                await read(range_init, number_files_local=number_files, topic=topic)
+        total_copied = 0
+
+        async def handle_batch(messages: list[Message]) -> None:
+            nonlocal total_copied
+            copied, _ = await self._copy_batch(
+                messages,
+                to_chat_id=to_chat_id,
+                delay=delay,
+                media_type=media_type,
+                filter_caption_includes=filter_caption_includes,
+                test_mode=test_mode,
+                total=len(messages),
+            )
+            total_copied += copied
+
+        self.stats = JobStats()
+        log.info(f"Espelhando chat! Chat: {chat_id}, Chat de destino: {to_chat_id}")
+        try:
+            await self.mirror_messages(chat_id, handle_batch, last_id, on_mark, window)
+        finally:
+            log.summary(f"Espelhamento encerrado! Mensagens copiadas: {total_copied}")
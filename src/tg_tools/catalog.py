@@ -0,0 +1,149 @@
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Literal
+
+from hydrogram.types import Message
+
+from tg_tools.exceptions import TGToolsError
+
+CatalogFormat = Literal["jsonl", "parquet"]
+CATALOG_FORMATS: tuple[CatalogFormat, ...] = ("jsonl", "parquet")
+
+# ordem em que o tipo da mensagem é identificado
+CATALOG_KINDS = (
+    "video",
+    "photo",
+    "document",
+    "audio",
+    "voice",
+    "animation",
+    "sticker",
+    "video_note",
+    "text",
+)
+
+
+def message_record(msg: Message, chat_id: int | str) -> dict:
+    """Extrai os metadados da mensagem em um registro plano do catálogo."""
+    kind = next((kind for kind in CATALOG_KINDS if getattr(msg, kind, None)), None)
+    media = getattr(msg, kind, None) if kind and kind != "text" else None
+
+    return {
+        "id": msg.id,
+        "chat_id": str(chat_id),
+        "thread_id": msg.message_thread_id,
+        "date": msg.date,
+        "type": kind,
+        "file_name": getattr(media, "file_name", None),
+        "mime_type": getattr(media, "mime_type", None),
+        "size": getattr(media, "file_size", None),
+        "duration": getattr(media, "duration", None),
+        "width": getattr(media, "width", None),
+        "height": getattr(media, "height", None),
+        "media_group_id": msg.media_group_id,
+        "views": msg.views,
+        # str simples: o Str do hydrogram carrega as entities junto
+        "caption": str(text) if (text := msg.caption or msg.text) else None,
+    }
+
+
+class CatalogWriter(ABC):
+    """Grava os registros do catálogo aos poucos, sem manter a exportação em memória."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.count = 0
+
+    @abstractmethod
+    def write(self, record: dict) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "CatalogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class JsonlCatalogWriter(CatalogWriter):
+    """Um objeto JSON por linha."""
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__(path)
+        self._file = self.path.open("w", encoding="utf-8")
+
+    def write(self, record: dict) -> None:
+        record = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in record.items()
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetCatalogWriter(CatalogWriter):
+    """Arquivo Parquet gravado em row groups de `batch_size` registros (requer pyarrow)."""
+
+    def __init__(self, path: str | Path, batch_size: int = 10_000) -> None:
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise TGToolsError(
+                "Exportar em Parquet requer o pyarrow. Instale com: pip install tg-tools[parquet]"
+            )
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("chat_id", pa.string()),
+                ("thread_id", pa.int64()),
+                ("date", pa.timestamp("s")),
+                ("type", pa.string()),
+                ("file_name", pa.string()),
+                ("mime_type", pa.string()),
+                ("size", pa.int64()),
+                ("duration", pa.int64()),
+                ("width", pa.int64()),
+                ("height", pa.int64()),
+                ("media_group_id", pa.string()),
+                ("views", pa.int64()),
+                ("caption", pa.string()),
+            ]
+        )
+        self.batch_size = batch_size
+        self._rows: list[dict] = []
+        self._writer = pq.ParquetWriter(self.path, self.schema)
+
+    def write(self, record: dict) -> None:
+        if record.get("media_group_id") is not None:
+            record = {**record, "media_group_id": str(record["media_group_id"])}
+        self._rows.append(record)
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+            self._writer.write_table(table)
+            self._rows.clear()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def open_catalog(path: str | Path, format: CatalogFormat) -> CatalogWriter:
+    if format == "parquet":
+        return ParquetCatalogWriter(path)
+    return JsonlCatalogWriter(path)
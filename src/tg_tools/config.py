@@ -1,7 +1,20 @@
+from contextvars import ContextVar
 from pathlib import Path
+from typing import cast
 
 from rich.console import Console
 
 DIRETORIO_BASE = Path(__file__).parent
 
-console = Console()
+# console da tarefa atual; o `serve` troca por um console que envia os eventos ao cliente
+current_console: ContextVar[Console] = ContextVar("console", default=Console())
+
+
+class _ConsoleProxy:
+    """Encaminha as chamadas para o console da tarefa atual."""
+
+    def __getattr__(self, name: str):
+        return getattr(current_console.get(), name)
+
+
+console = cast(Console, _ConsoleProxy())
@@ -1,17 +1,38 @@
 import os
+import time
 from pathlib import Path
 
 from tinydb import Query, TinyDB
 
 
+# cache de peers em um arquivo à parte: cresce a cada chat resolvido e o TinyDB regrava o
+# arquivo inteiro a cada alteração, o que não deve incluir as credenciais do config.json
+PEERS_FILE = "peers.json"
+
+
 class DBManager:
     def __init__(self, db_file: str = "config.json") -> None:
         # Cria o banco de dados no usuário
         data_dir = Path(os.path.expanduser("~"), ".tg-tools")
         data_dir.mkdir(exist_ok=True)
         self.db_full_path = Path(data_dir, db_file)
+        self.data_dir = self.db_full_path.parent
         self.db = TinyDB(self.db_full_path)
         self.config_table = self.db.table("config")
+        self.throughput_table = self.db.table("throughput")
+        self.marks_table = self.db.table("marks")
+        self.peers_db = TinyDB(Path(self.data_dir, PEERS_FILE))
+        self.peers_table = self.peers_db.table("peers")
+        self._migrate_peers()
+
+    def _migrate_peers(self) -> None:
+        # versões anteriores guardavam os peers no config.json
+        if "peers" not in self.db.tables():
+            return
+        legacy = self.db.table("peers")
+        if not len(self.peers_table):
+            self.peers_table.insert_multiple(legacy.all())
+        self.db.drop_table("peers")
 
     def set_config(self, key: str, value: str) -> None:
         # Insere ou atualiza uma configuração
@@ -29,3 +50,69 @@ class DBManager:
     def clear_configs(self) -> None:
         # Limpa todas as configurações
         self.config_table.truncate()
+
+    def record_throughput(
+        self, kind: str, amount: float, seconds: float, keep: int = 20
+    ) -> None:
+        # Registra a vazão de uma tarefa real, mantendo só as `keep` últimas de cada tipo
+        if amount <= 0 or seconds <= 0:
+            return
+        self.throughput_table.insert(
+            {"kind": kind, "amount": amount, "seconds": seconds}
+        )
+        records = self.throughput_table.search(Query().kind == kind)
+        if len(records) > keep:
+            self.throughput_table.remove(
+                doc_ids=[record.doc_id for record in records[:-keep]]
+            )
+
+    def get_throughput(self, kind: str) -> float | None:
+        # Retorna a vazão média (unidades por segundo) das tarefas registradas
+        records = self.throughput_table.search(Query().kind == kind)
+        seconds = sum(record["seconds"] for record in records)
+        if not seconds:
+            return None
+        return sum(record["amount"] for record in records) / seconds
+
+    def get_mark(self, key: str) -> int | None:
+        # Recupera o último id de mensagem processado pela tarefa identificada por `key`
+        result = self.marks_table.get(Query().key == key)
+        return result["msg_id"] if result else None  # type: ignore
+
+    def set_mark(self, key: str, msg_id: int) -> None:
+        # Salva o último id de mensagem processado pela tarefa
+        self.marks_table.upsert({"key": key, "msg_id": msg_id}, Query().key == key)
+
+    def get_peers(self, account: str, username_ttl: float | None = None) -> list[list]:
+        # Recupera os peers (id, access_hash, type, username, phone_number, last_update_on)
+        # salvos da conta; o username de um peer atualizado há mais de `username_ttl`
+        # segundos é descartado
+        result = self.peers_table.get(Query().account == account)
+        if not result:
+            return []
+        # peers salvos antes do horário por peer usam o horário do último salvamento
+        saved_at = result.get("saved_at", 0)  # type: ignore
+        peers = [[*peer[:5], peer[5] if len(peer) > 5 else saved_at] for peer in result["peers"]]  # type: ignore
+        if username_ttl is not None:
+            now = time.time()
+            peers = [
+                [*peer[:3], None, *peer[4:]] if now - peer[5] > username_ttl else peer
+                for peer in peers
+            ]
+        return peers
+
+    def set_peers(self, account: str, peers: list[list]) -> None:
+        # Substitui os peers salvos da conta, cada um com o horário da última atualização
+        self.peers_table.upsert(
+            {"account": account, "peers": peers}, Query().account == account
+        )
+
+    def remove_peer(self, account: str, peer: int | str) -> bool:
+        # Remove o peer salvo (por id ou username); retorna se havia algo salvo
+        result = self.peers_table.get(Query().account == account)
+        peers = result["peers"] if result else []  # type: ignore
+        kept = [item for item in peers if peer not in (item[0], item[3])]
+        if len(kept) == len(peers):
+            return False
+        self.peers_table.update({"peers": kept}, Query().account == account)
+        return True
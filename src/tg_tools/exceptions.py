@@ -3,3 +3,11 @@ class TGToolsError(Exception):
 
     def __init__(self, message: str) -> None:
         self.message = message
+
+
+class FloodWaitLimitError(TGToolsError):
+    """O limite de tentativas do handle_floodwait foi atingido."""
+
+
+class IncompleteDownloadError(TGToolsError):
+    """O download terminou com menos bytes do que o informado pelo Telegram."""
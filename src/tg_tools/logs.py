@@ -0,0 +1,119 @@
+import json
+from datetime import datetime
+from typing import Literal
+
+from rich.console import Console
+from rich.text import Text
+
+from tg_tools.config import current_console
+
+DEBUG = 10
+INFO = 20
+SUMMARY = 25  # resumos das tarefas, mostrados mesmo com --quiet
+WARNING = 30
+ERROR = 40
+
+LEVELS = {
+    "debug": DEBUG,
+    "info": INFO,
+    "summary": SUMMARY,
+    "warning": WARNING,
+    "error": ERROR,
+}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+LEVEL_STYLES = {
+    DEBUG: "blue",
+    INFO: "green",
+    SUMMARY: "bold green",
+    WARNING: "yellow",
+    ERROR: "red",
+}
+
+LogFormat = Literal["auto", "rich", "plain", "json"]
+LOG_FORMATS: tuple[LogFormat, ...] = ("auto", "rich", "plain", "json")
+
+
+class Logger:
+    """
+    Log da ferramenta, escrito no console da tarefa atual (o `serve` troca por um por tarefa).
+    Mensagens abaixo de `level` são descartadas antes de qualquer formatação: os argumentos
+    só são aplicados (`mensagem % args`) quando a linha vai ser escrita. Formatos:
+    - rich: linhas coloridas do rich, só faz sentido em um terminal
+    - plain: "hora NÍVEL mensagem", sem markup
+    - json: um objeto por linha, com os campos extras passados na chamada
+    - auto: rich em terminais e plain nos demais casos (arquivos, pipes, `serve`)
+    """
+
+    def __init__(self, level: int = INFO, format: LogFormat = "auto") -> None:
+        self.level = level
+        self.format = format
+
+    def configure(self, level: int | str, format: LogFormat = "auto") -> None:
+        self.level = LEVELS[level] if isinstance(level, str) else level
+        self.format = format
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    @property
+    def rich(self) -> bool:
+        """Se a saída atual é o console rich (tabelas e cores podem ser usadas)."""
+        return self._format(current_console.get()) == "rich"
+
+    @property
+    def progress(self) -> bool:
+        """Se as linhas de progresso devem ser mostradas (nem --quiet, nem JSON)."""
+        return self.level <= INFO and self.format != "json"
+
+    def _format(self, out: Console) -> LogFormat:
+        if self.format == "auto":
+            return "rich" if out.is_terminal else "plain"
+        return self.format
+
+    def log(self, level: int, message: str, *args, **fields) -> None:
+        if level < self.level:
+            return
+        if args:
+            message = message % args
+
+        out = current_console.get()
+        format = self._format(out)
+        if format == "rich":
+            # Text não passa pelo parser de markup (nomes de arquivo com [colchetes])
+            out.log(Text(message, style=LEVEL_STYLES[level]), _stack_offset=3)
+            return
+
+        now = datetime.now()
+        if format == "json":
+            line = json.dumps(
+                {
+                    "ts": now.isoformat(timespec="milliseconds"),
+                    "level": LEVEL_NAMES[level],
+                    "msg": message,
+                    **fields,
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+        else:
+            line = f"{now:%H:%M:%S} {LEVEL_NAMES[level].upper():<7} {message}"
+        out.file.write(line + "\n")
+        out.file.flush()
+
+    def debug(self, message: str, *args, **fields) -> None:
+        self.log(DEBUG, message, *args, **fields)
+
+    def info(self, message: str, *args, **fields) -> None:
+        self.log(INFO, message, *args, **fields)
+
+    def summary(self, message: str, *args, **fields) -> None:
+        self.log(SUMMARY, message, *args, **fields)
+
+    def warning(self, message: str, *args, **fields) -> None:
+        self.log(WARNING, message, *args, **fields)
+
+    def error(self, message: str, *args, **fields) -> None:
+        self.log(ERROR, message, *args, **fields)
+
+
+log = Logger()
@@ -0,0 +1,169 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from hydrogram import Client, raw
+from hydrogram.errors import AuthBytesInvalid, FloodWait
+from hydrogram.file_id import FileId, FileType
+from hydrogram.session import Session
+from hydrogram.session.auth import Auth
+
+from tg_tools.utils import wait_floodwait
+
+# tamanho dos blocos pedidos ao Telegram (o máximo aceito pelo upload.GetFile)
+CHUNK_SIZE = 1024 * 1024
+
+
+class MediaSessionPool:
+    """
+    Sessões de mídia por data center, criadas sob demanda e mantidas abertas enquanto o
+    cliente estiver conectado. Cada DC tem até `connections` conexões, compartilhadas pelas
+    transferências simultâneas; uma nova só é aberta quando todas as existentes estão em uso.
+    A autorização em outro DC é exportada uma única vez e reaproveitada pelas conexões dele.
+    """
+
+    def __init__(self, client: Client, connections: int = 1) -> None:
+        self.client = client
+        self.connections = max(connections, 1)
+        self._sessions: dict[int, list[Session]] = {}
+        self._auth_keys: dict[int, bytes] = {}
+        self._busy: dict[Session, int] = defaultdict(int)
+        # sessões trocadas pelo `reconnect` que ainda têm transferências em andamento
+        self._retired: set[Session] = set()
+        self._locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def _import_authorization(self, session: Session, dc_id: int) -> None:
+        for _ in range(3):
+            exported = await self.client.invoke(
+                raw.functions.auth.ExportAuthorization(dc_id=dc_id)
+            )
+            try:
+                await session.invoke(
+                    raw.functions.auth.ImportAuthorization(
+                        id=exported.id, bytes=exported.bytes
+                    )
+                )
+                return
+            except AuthBytesInvalid:
+                continue
+        raise AuthBytesInvalid
+
+    async def _create(self, dc_id: int) -> Session:
+        storage = self.client.storage
+        test_mode = await storage.test_mode()
+        home = dc_id == await storage.dc_id()
+        auth_key = self._auth_keys.get(dc_id)
+        authorized = home or auth_key is not None
+        if auth_key is None:
+            auth_key = (
+                await storage.auth_key()
+                if home
+                else await Auth(self.client, dc_id, test_mode).create()
+            )
+
+        session = Session(self.client, dc_id, auth_key, test_mode, is_media=True)
+        await session.start()
+        if not authorized:
+            try:
+                await self._import_authorization(session, dc_id)
+            except BaseException:
+                await session.stop()
+                raise
+        self._auth_keys[dc_id] = auth_key  # type: ignore
+        return session
+
+    @asynccontextmanager
+    async def lease(self, dc_id: int) -> AsyncGenerator[Session, None]:
+        """Empresta a conexão menos ocupada do DC, abrindo outra se todas estiverem em uso."""
+        async with self._locks[dc_id]:
+            sessions = self._sessions.setdefault(dc_id, [])
+            session = min(sessions, key=self._busy.__getitem__, default=None)
+            if session is None or (
+                self._busy[session] and len(sessions) < self.connections
+            ):
+                session = await self._create(dc_id)
+                sessions.append(session)
+            self._busy[session] += 1
+        try:
+            yield session
+        finally:
+            self._busy[session] -= 1
+            if session in self._retired and not self._busy[session]:
+                self._retired.discard(session)
+                del self._busy[session]
+                await session.stop()
+
+    async def reconnect(self, dc_id: int) -> None:
+        """
+        Troca as conexões do DC: as próximas transferências abrem conexões novas (com a mesma
+        autorização) e as atuais são encerradas assim que ficarem livres.
+        """
+        async with self._locks[dc_id]:
+            for session in self._sessions.pop(dc_id, []):
+                if self._busy[session]:
+                    self._retired.add(session)
+                else:
+                    del self._busy[session]
+                    await session.stop()
+
+    async def stream(self, file_id: str) -> AsyncGenerator[bytes, None]:
+        """
+        Baixa o arquivo em blocos de CHUNK_SIZE por uma conexão do pool. Arquivos servidos
+        por CDN (e fotos de perfil) seguem pelo `stream_media` do hydrogram.
+        """
+        decoded = FileId.decode(file_id)
+        if decoded.file_type == FileType.CHAT_PHOTO:
+            async for chunk in self.client.stream_media(file_id):  # type: ignore
+                yield chunk
+            return
+
+        location_type = (
+            raw.types.InputPhotoFileLocation
+            if decoded.file_type == FileType.PHOTO
+            else raw.types.InputDocumentFileLocation
+        )
+        location = location_type(
+            id=decoded.media_id,
+            access_hash=decoded.access_hash,
+            file_reference=decoded.file_reference,
+            thumb_size=decoded.thumbnail_size,
+        )
+
+        offset = 0
+        async with self.lease(decoded.dc_id) as session:
+            while True:
+                # o FloodWait é aguardado aqui, sem perder o que já foi baixado
+                try:
+                    result = await session.invoke(
+                        raw.functions.upload.GetFile(
+                            location=location, offset=offset, limit=CHUNK_SIZE
+                        ),
+                        sleep_threshold=0,
+                    )
+                except FloodWait as e:
+                    await wait_floodwait(e)
+                    continue
+                if isinstance(result, raw.types.upload.FileCdnRedirect):
+                    break
+                yield result.bytes
+                offset += CHUNK_SIZE
+                if len(result.bytes) < CHUNK_SIZE:
+                    return
+
+        async for chunk in self.client.stream_media(  # type: ignore
+            file_id, offset=offset // CHUNK_SIZE
+        ):
+            yield chunk
+
+    async def close(self) -> None:
+        """Encerra todas as conexões do pool."""
+        for sessions in self._sessions.values():
+            for session in sessions:
+                await session.stop()
+        for session in self._retired:
+            await session.stop()
+        self._sessions.clear()
+        self._retired.clear()
+        self._auth_keys.clear()
+        self._busy.clear()
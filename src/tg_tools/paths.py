@@ -0,0 +1,101 @@
+import os
+import threading
+from pathlib import Path
+
+import pathvalidate
+
+MAX_FILE_NAME_LENGTH = 200
+
+
+def build_file_name(stem: str, extension: str, suffix: str = "") -> str:
+    """
+    Monta `stem + suffix + extension` sanitizado, truncando só o stem para que o nome final
+    (incluindo a extensão e o sufixo de unicidade) caiba em MAX_FILE_NAME_LENGTH.
+    """
+    extension = pathvalidate.sanitize_filename(extension)
+    max_stem = max(MAX_FILE_NAME_LENGTH - len(extension) - len(suffix), 1)
+    stem = pathvalidate.sanitize_filename(stem, max_len=max_stem).rstrip(". ")
+    return f"{stem}{suffix}{extension}"
+
+
+# -----------------------------
+# Alocação de caminhos de destino
+# -----------------------------
+class PathAllocator:
+    """
+    Reserva nomes únicos em uma pasta de destino sem consultar o disco a cada arquivo.
+
+    Os nomes já existentes são lidos uma única vez com `os.scandir` e mantidos em memória;
+    cada reserva é registrada no índice sob lock, então downloads paralelos (tarefas ou threads)
+    nunca recebem o mesmo caminho. A comparação ignora maiúsculas/minúsculas para também ser
+    segura em sistemas de arquivos que não as diferenciam.
+
+    Regras de nome (determinísticas para a mesma mensagem):
+        - sem nome: "<msg_id><ext>";
+        - nome livre: "<nome><ext>";
+        - nome ocupado: "<nome>_<msg_id><ext>" e, se ainda assim ocupado, "<nome>_<msg_id>_<n><ext>".
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._names: set[str] | None = None
+        self._lock = threading.Lock()
+        self._children: dict[str, "PathAllocator"] = {}
+
+    def _load(self) -> set[str]:
+        if self._names is None:
+            names: set[str] = set()
+            try:
+                with os.scandir(self.directory) as entries:
+                    names = {entry.name.casefold() for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            self._names = names
+        return self._names
+
+    def _reserve(self, names: set[str], candidate: str) -> bool:
+        key = candidate.casefold()
+        if key in names:
+            return False
+        names.add(key)
+        return True
+
+    def allocate(self, stem: str | None, extension: str, msg_id: int) -> Path:
+        """Reserva e retorna um caminho único para a mídia da mensagem `msg_id`."""
+        if stem and not pathvalidate.sanitize_filename(stem).strip(". "):
+            stem = None
+
+        with self._lock:
+            names = self._load()
+
+            if not stem:
+                candidates = [build_file_name(str(msg_id), extension)]
+            else:
+                candidates = [
+                    build_file_name(stem, extension),
+                    build_file_name(stem, extension, f"_{msg_id}"),
+                ]
+
+            for candidate in candidates:
+                if self._reserve(names, candidate):
+                    return Path(self.directory, candidate)
+
+            base = stem or str(msg_id)
+            counter = 1
+            while True:
+                candidate = build_file_name(base, extension, f"_{msg_id}_{counter}")
+                if self._reserve(names, candidate):
+                    return Path(self.directory, candidate)
+                counter += 1
+
+    def release(self, path: Path) -> None:
+        """Libera um nome reservado que acabou não sendo gravado (ex.: erro no download)."""
+        with self._lock:
+            self._load().discard(path.name.casefold())
+
+    def child(self, name: str) -> "PathAllocator":
+        """Retorna o alocador de uma subpasta (criado uma única vez)."""
+        with self._lock:
+            if name not in self._children:
+                self._children[name] = PathAllocator(Path(self.directory, name))
+            return self._children[name]
@@ -0,0 +1,159 @@
+import heapq
+import json
+import time
+from dataclasses import dataclass, field
+
+from rich.console import Console
+from rich.table import Table
+
+from tg_tools.utils import format_size
+
+
+# -----------------------------
+# Estatísticas de execução
+# -----------------------------
+@dataclass
+class JobStats:
+    """Contadores de uma tarefa real, usados para medir a vazão e estimar tarefas futuras."""
+
+    bytes: int = 0
+    messages: int = 0
+    waited: float = 0.0  # segundos em esperas propositais (--delay)
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def active(self) -> float:
+        """Tempo gasto de fato com a tarefa, sem as esperas propositais."""
+        return max(self.elapsed - self.waited, 0.0)
+
+
+# -----------------------------
+# Planejamento de tarefas
+# -----------------------------
+class JobPlan:
+    """
+    Resumo de uma tarefa feito só com os metadados das mensagens: nada é baixado, gravado ou
+    enviado. Conta mensagens por tipo, bytes totais, maiores arquivos e quantas mensagens cada
+    filtro descartou.
+    """
+
+    def __init__(self, kind: str, top: int = 10) -> None:
+        self.kind = kind
+        self.top = top
+        self.scanned = 0
+        self.accepted = 0
+        self.total_bytes = 0
+        self.by_type: dict[str, list[int]] = {}  # tipo -> [mensagens, bytes]
+        self.rejected: dict[str, int] = {}
+        self._largest: list[tuple[int, int, str]] = []
+
+    def reject(self, reason: str) -> None:
+        self.scanned += 1
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def accept(self, msg_id: int, media_type: str, size: int, name: str) -> None:
+        self.scanned += 1
+        self.accepted += 1
+        self.total_bytes += size
+        counts = self.by_type.setdefault(media_type, [0, 0])
+        counts[0] += 1
+        counts[1] += size
+
+        # mantém só os `top` maiores em um heap mínimo
+        item = (size, msg_id, name)
+        if len(self._largest) < self.top:
+            heapq.heappush(self._largest, item)
+        elif item > self._largest[0]:
+            heapq.heapreplace(self._largest, item)
+
+    @property
+    def largest(self) -> list[tuple[int, int, str]]:
+        return sorted(self._largest, reverse=True)
+
+    def eta(self, throughput: float | None, delay: float = 0.0) -> float | None:
+        """
+        Estima a duração em segundos a partir da vazão medida em execuções anteriores:
+        bytes/s para downloads e mensagens/s para cópias (somando o --delay de cada mensagem).
+        """
+        if not throughput:
+            return None
+        if self.kind == "copy":
+            return self.accepted / throughput + self.accepted * delay
+        return self.total_bytes / throughput
+
+    def summary(self, throughput: float | None, delay: float = 0.0) -> dict:
+        return {
+            "kind": self.kind,
+            "scanned": self.scanned,
+            "accepted": self.accepted,
+            "total_bytes": self.total_bytes,
+            "by_type": {
+                media_type: {"messages": counts[0], "bytes": counts[1]}
+                for media_type, counts in sorted(self.by_type.items())
+            },
+            "rejected": dict(sorted(self.rejected.items())),
+            "hit_rate": round(self.accepted / self.scanned, 4) if self.scanned else 0.0,
+            "largest": [
+                {"id": msg_id, "name": name, "bytes": size}
+                for size, msg_id, name in self.largest
+            ],
+            "throughput": throughput,
+            "eta_seconds": self.eta(throughput, delay),
+        }
+
+    def print(
+        self,
+        console: Console,
+        output: str,
+        throughput: float | None,
+        delay: float = 0.0,
+    ) -> None:
+        summary = self.summary(throughput, delay)
+        if output == "json":
+            console.print_json(json.dumps(summary, ensure_ascii=False))
+            return
+
+        table = Table(title="Plano da tarefa")
+        table.add_column("Tipo")
+        table.add_column("Mensagens", justify="right")
+        table.add_column("Tamanho", justify="right")
+        for media_type, counts in summary["by_type"].items():
+            table.add_row(
+                media_type, str(counts["messages"]), format_size(counts["bytes"])
+            )
+        table.add_row(
+            "[bold]Total[/bold]",
+            f"[bold]{self.accepted}[/bold]",
+            f"[bold]{format_size(self.total_bytes)}[/bold]",
+        )
+        console.print(table)
+
+        console.print(
+            f"Mensagens analisadas: {self.scanned}, aceitas: {self.accepted} ({summary['hit_rate'] * 100:.1f}%)"
+        )
+        for reason, count in summary["rejected"].items():
+            console.print(f"  Descartadas por {reason}: {count}")
+
+        if self.largest:
+            console.print("Maiores arquivos:")
+            for size, msg_id, name in self.largest:
+                console.print(f"  {format_size(size):>12}  {msg_id}  {name}")
+
+        eta = summary["eta_seconds"]
+        if eta is None:
+            console.print(
+                "Tempo estimado: sem medições anteriores (execute uma tarefa real primeiro)."
+            )
+        else:
+            console.print(f"Tempo estimado: {format_duration(eta)}")
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,124 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from fnmatch import fnmatch
+
+from hydrogram.types import Message
+
+from tg_tools.exceptions import TGToolsError
+
+
+def parse_datetime(value: str, end: bool = False) -> datetime:
+    """
+    Lê uma data (AAAA-MM-DD) ou data e hora ISO no horário local, como as datas das
+    mensagens. Com `end`, uma data sem hora vale até o fim do dia.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise TGToolsError(f"Data inválida: {value} (use AAAA-MM-DD ou AAAA-MM-DDTHH:MM)")
+    if parsed.tzinfo:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    return parsed
+
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    """Lê uma resolução no formato LARGURAxALTURA (ex.: 1280x720)."""
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise TGToolsError(f"Resolução inválida: {value} (use LARGURAxALTURA, ex.: 1280x720)")
+
+
+@dataclass
+class MediaFilter:
+    """
+    Filtros pelos metadados da mídia (tamanho, data, duração, resolução, MIME e nome),
+    avaliados nas mensagens antes de qualquer download. Uma mídia sem o metadado de um
+    filtro ativo (ex.: duração de uma foto) é descartada. `dropped` conta os descartes
+    por filtro.
+    """
+
+    min_size: int | None = None
+    max_size: int | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    min_duration: int | None = None
+    max_duration: int | None = None
+    min_resolution: tuple[int, int] | None = None
+    max_resolution: tuple[int, int] | None = None
+    mime_globs: list[str] | None = None
+    name_globs: list[str] | None = None
+    dropped: Counter[str] = field(default_factory=Counter, compare=False)
+
+    def key(self) -> dict:
+        """Filtros definidos, para compor a chave do progresso salvo (--sync, mirror)."""
+        return {
+            name: value
+            for name, value in vars(self).items()
+            if name != "dropped" and value is not None
+        }
+
+    def reason(self, msg: Message, kind: str) -> str | None:
+        """Filtro que descarta a mídia `kind` da mensagem (None se ela passa em todos)."""
+        media = getattr(msg, kind, None)
+        size = getattr(media, "file_size", None) or 0
+        if self.min_size is not None and size < self.min_size:
+            return "tamanho mínimo"
+        if self.max_size is not None and size > self.max_size:
+            return "tamanho máximo"
+
+        date = getattr(msg, "date", None)
+        if self.since and not (date and date >= self.since):
+            return "data inicial"
+        if self.until and not (date and date <= self.until):
+            return "data final"
+
+        if self.min_duration is not None or self.max_duration is not None:
+            duration = getattr(media, "duration", None)
+            if duration is None:
+                return "duração"
+            if self.min_duration is not None and duration < self.min_duration:
+                return "duração mínima"
+            if self.max_duration is not None and duration > self.max_duration:
+                return "duração máxima"
+
+        if self.min_resolution or self.max_resolution:
+            width, height = getattr(media, "width", None), getattr(media, "height", None)
+            if not (width and height):
+                return "resolução"
+            if self.min_resolution and (
+                width < self.min_resolution[0] or height < self.min_resolution[1]
+            ):
+                return "resolução mínima"
+            if self.max_resolution and (
+                width > self.max_resolution[0] or height > self.max_resolution[1]
+            ):
+                return "resolução máxima"
+
+        if self.mime_globs:
+            # fotos não trazem o MIME; o download as grava como JPEG
+            mime_type = getattr(media, "mime_type", None) or (
+                "image/jpeg" if kind == "photo" else ""
+            )
+            if not any(
+                fnmatch(mime_type.lower(), glob.lower()) for glob in self.mime_globs
+            ):
+                return "MIME"
+
+        if self.name_globs:
+            file_name = (getattr(media, "file_name", None) or "").lower()
+            if not any(fnmatch(file_name, glob.lower()) for glob in self.name_globs):
+                return "nome do arquivo"
+
+        return None
+
+    def accept(self, msg: Message, kind: str) -> bool:
+        """Avalia a mensagem e conta o descarte no filtro que a rejeitou."""
+        reason = self.reason(msg, kind)
+        if reason:
+            self.dropped[reason] += 1
+        return reason is None
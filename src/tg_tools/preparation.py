@@ -0,0 +1,95 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncGenerator, BinaryIO
+
+from tg_tools.utils import generate_file_thumbnail, recompress_photo
+
+
+# -----------------------------
+# Preparação dos arquivos antes do envio
+# -----------------------------
+@dataclass
+class PreparedFile:
+    """Resultado da preparação de um arquivo para envio."""
+
+    file: Path
+    size: int = 0
+    thumbnail: bytes | None = None
+    photo: bytes | None = None  # foto recomprimida, quando a original excede os limites
+    error: str | None = None
+    stream: BinaryIO | None = None  # conteúdo já em buffer (membros de pacotes .tar/.zip)
+
+
+def prepare_file(file: Path, media_type: str, thumbnail_per_file: bool) -> PreparedFile:
+    """
+    Executa o trabalho de CPU de um arquivo (thumbnail e recompressão de fotos).
+    Roda em um processo separado, por isso não usa o console nem o cliente.
+    """
+    prepared = PreparedFile(file)
+    try:
+        prepared.size = file.stat().st_size
+        if media_type == "photo":
+            prepared.photo = recompress_photo(file)
+        elif thumbnail_per_file:
+            prepared.thumbnail = generate_file_thumbnail(file)
+    except Exception as e:
+        prepared.error = str(getattr(e, "message", e))
+    return prepared
+
+
+def needs_preparation(media_type: str, thumbnail_per_file: bool) -> bool:
+    """Indica se há trabalho de CPU a fazer; do contrário o pool de processos é dispensado."""
+    return media_type == "photo" or thumbnail_per_file
+
+
+async def prepare_files(
+    files: list[Path],
+    media_type: str,
+    thumbnail_per_file: bool,
+    ahead: int,
+    executor: Executor | None = None,
+) -> AsyncGenerator[PreparedFile, None]:
+    """
+    Prepara os próximos `ahead` arquivos em um ProcessPoolExecutor enquanto os anteriores
+    são enviados. Os arquivos preparados chegam na ordem original através de uma fila limitada.
+    """
+    if not needs_preparation(media_type, thumbnail_per_file):
+        for file in files:
+            yield PreparedFile(file, size=file.stat().st_size if file.is_file() else 0)
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[PreparedFile | None] = asyncio.Queue(maxsize=ahead)
+    own_executor = executor is None
+    pool = executor or ProcessPoolExecutor(max_workers=ahead)
+
+    async def producer() -> None:
+        pending: deque[asyncio.Future[PreparedFile]] = deque()
+        try:
+            for file in files:
+                pending.append(
+                    loop.run_in_executor(
+                        pool, prepare_file, file, media_type, thumbnail_per_file
+                    )
+                )
+                if len(pending) >= ahead:
+                    await queue.put(await pending.popleft())
+            while pending:
+                await queue.put(await pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+            await queue.put(None)
+
+    task = asyncio.create_task(producer())
+    try:
+        while (prepared := await queue.get()) is not None:
+            yield prepared
+        await task
+    finally:
+        task.cancel()
+        if own_executor:
+            pool.shutdown(wait=False, cancel_futures=True)
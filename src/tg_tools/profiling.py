@@ -0,0 +1,138 @@
+import asyncio
+import cProfile
+import pstats
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+# só as funções do projeto entram no resumo
+PACKAGE_DIR = Path(__file__).parent
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def coroutine_stack(coro) -> list[tuple[str, str, int]]:
+    """
+    Segue a cadeia de awaits de uma coroutine (ou async generator) e retorna os frames
+    suspensos, da mais externa para a mais interna, como (nome, arquivo, linha).
+    """
+    stack = []
+    while coro is not None:
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "ag_frame", None)
+            or getattr(coro, "gi_frame", None)
+        )
+        if frame is None:
+            break
+        code = frame.f_code
+        stack.append((_frame_name(code), code.co_filename, code.co_firstlineno))
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "ag_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+        )
+    return stack
+
+
+class Profiler:
+    """
+    Perfil de uma execução: tempo de CPU por função (cProfile) e tempo de parede por
+    coroutine, amostrando a cadeia de awaits de cada task do event loop a cada `interval`.
+    Grava `<prefixo>.folded` (formato de flamegraph.pl/speedscope) e `<prefixo>.pstats`.
+    """
+
+    def __init__(self, prefix: str | Path, interval: float = 0.005, top: int = 15):
+        self.prefix = Path(prefix)
+        self.interval = interval
+        self.top = top
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._files: dict[str, tuple[str, int]] = {}
+        self._cpu = cProfile.Profile(time.process_time)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._cpu.enable()
+
+    def stop(self) -> None:
+        self._cpu.disable()
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                tasks = list(asyncio.all_tasks(self._loop))
+            except RuntimeError:
+                continue
+            for task in tasks:
+                stack = coroutine_stack(task.get_coro())
+                if not stack:
+                    continue
+                for name, file, line in stack:
+                    self._files[name] = (file, line)
+                self.samples[tuple(name for name, _, _ in stack)] += 1
+
+    def wall_times(self) -> Counter[str]:
+        """Tempo de parede inclusivo (segundos) de cada coroutine amostrada."""
+        wall: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            for name in set(stack):
+                wall[name] += count * self.interval
+        return wall
+
+    def write(self) -> tuple[Path, Path]:
+        folded = self.prefix.with_name(self.prefix.name + ".folded")
+        with folded.open("w", encoding="utf-8") as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+        stats_file = self.prefix.with_name(self.prefix.name + ".pstats")
+        self._cpu.dump_stats(stats_file)
+        return folded, stats_file
+
+    def summary(self) -> Table:
+        """Top-N funções do tg_tools por tempo de CPU, com o tempo de parede das coroutines."""
+        stats = pstats.Stats(self._cpu)
+        # (arquivo, linha) -> [nome, CPU própria, CPU acumulada, parede]
+        rows: dict[tuple[str, int], list] = {}
+
+        for (file, line, name), (_, _, tottime, cumtime, _) in stats.stats.items():  # type: ignore
+            if file.startswith(str(PACKAGE_DIR)):
+                rows[(file, line)] = [f"{name} ({Path(file).name}:{line})", tottime, cumtime, 0.0]
+
+        for name, seconds in self.wall_times().items():
+            file, line = self._files[name]
+            if file.startswith(str(PACKAGE_DIR)):
+                rows.setdefault((file, line), [name, 0.0, 0.0, 0.0])[3] = seconds
+
+        table = Table(title=f"Perfil (tempo total: {self.elapsed:.2f}s)")
+        table.add_column("Função")
+        table.add_column("CPU própria (s)", justify="right")
+        table.add_column("CPU acumulada (s)", justify="right")
+        table.add_column("Parede (s)", justify="right")
+        ranked = sorted(rows.values(), key=lambda row: (row[2], row[3]), reverse=True)
+        for name, tottime, cumtime, seconds in ranked[: self.top]:
+            table.add_row(name, f"{tottime:.3f}", f"{cumtime:.3f}", f"{seconds:.3f}")
+        return table
+
+    def report(self, console: Console) -> None:
+        folded, stats_file = self.write()
+        console.print(self.summary())
+        console.print(f"Flamegraph: {folded}, Estatísticas de CPU: {stats_file}")
@@ -0,0 +1,28 @@
+class MediaRecord:
+    """
+    O mínimo de uma mensagem com mídia para baixá-la: a Message do hydrogram (com
+    entidades, thumbs e objetos aninhados) é descartada assim que o registro é criado.
+    """
+
+    __slots__ = ("id", "kind", "file_id", "size", "file_name", "mime_type", "caption")
+
+    def __init__(
+        self,
+        id: int,
+        kind: str,
+        file_id: str,
+        size: int = 0,
+        file_name: str | None = None,
+        mime_type: str | None = None,
+        caption: str | None = None,
+    ) -> None:
+        self.id = id
+        self.kind = kind
+        self.file_id = file_id
+        self.size = size
+        self.file_name = file_name
+        self.mime_type = mime_type
+        self.caption = caption
+
+    def __repr__(self) -> str:
+        return f"MediaRecord(id={self.id}, kind={self.kind!r}, size={self.size})"
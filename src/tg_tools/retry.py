@@ -0,0 +1,143 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Generic, Hashable, Literal, TypeVar
+
+from hydrogram.errors import (
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    InternalServerError,
+    ServiceUnavailable,
+)
+from rich.table import Table
+
+from tg_tools.exceptions import FloodWaitLimitError, IncompleteDownloadError
+
+T = TypeVar("T")
+
+# refresh: busca a mensagem de novo (file reference novo) antes da próxima tentativa
+# reconnect: troca as conexões de mídia do data center do arquivo
+# backoff: só aguarda e tenta de novo
+RetryAction = Literal["backoff", "refresh", "reconnect"]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Quantas vezes e como um item que falhou com uma classe de erro volta para a fila."""
+
+    action: RetryAction
+    attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter: aleatório entre 0 e base * 2^(tentativa - 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+# a primeira classe que bater decide a política; erros fora da lista são permanentes
+RETRY_POLICIES: list[tuple[tuple[type[BaseException], ...], RetryPolicy]] = [
+    (
+        (FileReferenceExpired, FileReferenceInvalid),
+        RetryPolicy("refresh", attempts=3, base_delay=0.5),
+    ),
+    ((ConnectionError, TimeoutError), RetryPolicy("reconnect")),
+    (
+        (
+            InternalServerError,
+            ServiceUnavailable,
+            FloodWaitLimitError,
+            IncompleteDownloadError,
+        ),
+        RetryPolicy("backoff"),
+    ),
+]
+
+
+def retry_policy(error: BaseException) -> RetryPolicy | None:
+    """Política para o erro (None se o erro não for transitório)."""
+    for errors, policy in RETRY_POLICIES:
+        if isinstance(error, errors):
+            return policy
+    return None
+
+
+@dataclass
+class RetryItem(Generic[T]):
+    item: T
+    policy: RetryPolicy
+    attempt: int
+
+
+@dataclass
+class Failure:
+    """Item descartado de vez: erro permanente ou tentativas esgotadas."""
+
+    description: str
+    error: str
+    attempts: int
+    key: Hashable = None
+
+
+class RetryQueue(Generic[T]):
+    """
+    Itens que falharam durante uma tarefa. Os com erros transitórios voltam para o fim da
+    tarefa (`drain`), tentados de novo depois de todos os outros; os demais ficam em
+    `failures` para o relatório final.
+    """
+
+    def __init__(self) -> None:
+        self.pending: list[RetryItem[T]] = []
+        self.failures: list[Failure] = []
+        self._attempts: dict[Hashable, int] = {}
+
+    def fail(
+        self, item: T, key: Hashable, description: str, error: BaseException
+    ) -> RetryPolicy | None:
+        """
+        Registra a falha do item. Retorna a política quando ele foi reenfileirado e None
+        quando a falha é definitiva.
+        """
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        policy = retry_policy(error)
+        if policy is None or attempt >= policy.attempts:
+            self._record_failure(key, description, error, attempt)
+            return None
+        self.pending.append(RetryItem(item, policy, attempt))
+        return policy
+
+    def give_up(self, key: Hashable, description: str, error: BaseException) -> None:
+        """
+        Registra a falha definitiva de um item que não pode mais ser tentado (ex.: mensagem
+        apagada antes da nova tentativa), sem consultar as políticas.
+        """
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        self._record_failure(key, description, error, attempt)
+
+    def _record_failure(
+        self, key: Hashable, description: str, error: BaseException, attempts: int
+    ) -> None:
+        message = getattr(error, "message", None) or str(error) or repr(error)
+        self.failures.append(Failure(description, message, attempts, key))
+
+    async def drain(self) -> list[RetryItem[T]]:
+        """
+        Retira os itens reenfileirados, aguardando antes o maior backoff entre eles (todos
+        voltam juntos, no fim da tarefa).
+        """
+        items, self.pending = self.pending, []
+        if items:
+            await asyncio.sleep(max(entry.policy.delay(entry.attempt) for entry in items))
+        return items
+
+    def report(self) -> Table | None:
+        """Tabela com as falhas definitivas (None se não houver nenhuma)."""
+        if not self.failures:
+            return None
+        table = Table(title=f"Falhas definitivas: {len(self.failures)}")
+        table.add_column("Item")
+        table.add_column("Tentativas", justify="right")
+        table.add_column("Erro")
+        for failure in self.failures:
+            table.add_row(failure.description, str(failure.attempts), failure.error)
+        return table
@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, Literal, TypeVar
+
+if TYPE_CHECKING:
+    from tg_tools.autotune import AutoTuner
+
+T = TypeVar("T")
+
+SchedulePolicy = Literal["order", "small-first", "large-first", "lanes"]
+SCHEDULE_POLICIES: tuple[SchedulePolicy, ...] = (
+    "order",
+    "small-first",
+    "large-first",
+    "lanes",
+)
+# abaixo disso o arquivo é considerado pequeno
+DEFAULT_SMALL_SIZE = 20 * 1024 * 1024
+
+
+def schedule(
+    items: list[T],
+    size_of: Callable[[T], int],
+    policy: SchedulePolicy = "order",
+    small_size: int = DEFAULT_SMALL_SIZE,
+) -> list[T]:
+    """
+    Ordena as transferências pela política escolhida:
+    - order: mantém a ordem original
+    - small-first / large-first: pelo tamanho (empates mantêm a ordem original)
+    - lanes: alterna entre a fila de pequenos e a de grandes, cada uma na ordem original
+    """
+    if policy == "small-first":
+        return sorted(items, key=size_of)
+    if policy == "large-first":
+        return sorted(items, key=size_of, reverse=True)
+    if policy == "lanes":
+        small = [item for item in items if size_of(item) < small_size]
+        large = [item for item in items if size_of(item) >= small_size]
+        lanes: list[T] = []
+        for index in range(max(len(small), len(large))):
+            lanes.extend(lane[index] for lane in (small, large) if index < len(lane))
+        return lanes
+    return list(items)
+
+
+class TransferScheduler:
+    """
+    Ordena e limita as transferências simultâneas de uma tarefa. `small_slots` vagas ficam
+    reservadas para arquivos pequenos, assim arquivos grandes nunca ocupam todas as vagas.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        policy: SchedulePolicy = "order",
+        small_slots: int = 0,
+        small_size: int = DEFAULT_SMALL_SIZE,
+    ) -> None:
+        if policy not in SCHEDULE_POLICIES:
+            raise ValueError(f"Política de agendamento inválida: {policy}")
+        self.workers = max(workers, 1)
+        self.policy = policy
+        self._small_slots = max(small_slots, 0)
+        # ao menos uma vaga continua disponível para arquivos grandes
+        self.small_slots = min(self._small_slots, self.workers - 1)
+        self.small_size = small_size
+        self._active = 0
+        self._active_large = 0
+        self._condition = asyncio.Condition()
+        # ajusta `workers` durante a tarefa (--max-workers)
+        self.tuner: "AutoTuner | None" = None
+
+    async def resize(self, workers: int) -> None:
+        """
+        Muda a quantidade de vagas com a tarefa rodando. Transferências em andamento
+        continuam; com menos vagas, as próximas só começam quando houver espaço.
+        """
+        async with self._condition:
+            self.workers = max(workers, 1)
+            self.small_slots = min(self._small_slots, self.workers - 1)
+            self._condition.notify_all()
+
+    def order(self, items: list[T], size_of: Callable[[T], int]) -> list[T]:
+        return schedule(items, size_of, self.policy, self.small_size)
+
+    def _can_start(self, large: bool) -> bool:
+        if self._active >= self.workers:
+            return False
+        return not large or self._active_large < self.workers - self.small_slots
+
+    @asynccontextmanager
+    async def slot(self, size: int) -> AsyncGenerator[None, None]:
+        """Aguarda uma vaga compatível com o tamanho do arquivo."""
+        large = size >= self.small_size
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._can_start(large))
+            self._active += 1
+            self._active_large += large
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._active -= 1
+                self._active_large -= large
+                self._condition.notify_all()
@@ -0,0 +1,366 @@
+import asyncio
+import json
+import os
+import re
+import secrets
+import time
+from argparse import ArgumentParser, Namespace
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Protocol
+
+from rich.console import Console
+
+from tg_tools.archives import STDIN_SOURCE
+from tg_tools.base_tg import BaseTG
+from tg_tools.config import console, current_console
+from tg_tools.exceptions import TGToolsError
+from tg_tools.logs import log
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# arquivos do daemon na pasta de dados
+SERVE_SOCKET = "serve.sock"
+SERVE_TOKEN = "serve.token"
+# tamanho máximo do corpo de uma requisição (a tarefa é só uma lista de argumentos)
+MAX_BODY_SIZE = 1024 * 1024
+# comandos que leem ou alteram as credenciais salvas: só pela CLI, nunca pelo daemon
+CONFIG_COMMANDS = ("get", "set", "remove")
+CONFIG_FLAGS = ("reset", "status", "get_db_file", "create_session_string")
+# opções globais aplicadas uma única vez, ao iniciar o serve (logs, banda, conexões, perfil)
+DAEMON_OPTIONS = (
+    "quiet",
+    "log_level",
+    "log_format",
+    "limit_up",
+    "limit_down",
+    "media_connections",
+    "profile",
+)
+
+
+class Clients(Protocol):
+    async def userbot(self) -> Any: ...
+
+    async def bot(self) -> Any: ...
+
+
+class JobExit(Exception):
+    """O parser pediu para encerrar (--help, --version ou argumentos inválidos)."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+class JobArgumentParser(ArgumentParser):
+    """Parser das tarefas do `serve`: mensagens vão para o console da tarefa e não encerram o daemon."""
+
+    def _print_message(self, message: str, file=None) -> None:
+        if message:
+            console.print(message, end="", markup=False, highlight=False)
+
+    def exit(self, status: int = 0, message: str | None = None):
+        if message:
+            self._print_message(message)
+        raise JobExit(status)
+
+
+class WarmClients:
+    """
+    Mantém os clientes criados pelo provider conectados enquanto o daemon estiver rodando,
+    assim as tarefas não pagam o login a cada execução.
+    """
+
+    def __init__(self, provider: Clients) -> None:
+        self.provider = provider
+        self._clients: dict[str, BaseTG] = {}
+        self._lock = asyncio.Lock()
+        self._stack = AsyncExitStack()
+
+    async def _warm(self, name: str, factory: Callable[[], Awaitable[BaseTG | None]]):
+        async with self._lock:
+            if name not in self._clients:
+                if (client := await factory()) is None:
+                    return None
+                await self._stack.enter_async_context(client.session())
+                self._clients[name] = client
+            return self._clients[name]
+
+    async def userbot(self) -> Any:
+        return await self._warm("userbot", self.provider.userbot)
+
+    async def bot(self) -> Any:
+        return await self._warm("bot", self.provider.bot)
+
+    async def close(self) -> None:
+        await self._stack.aclose()
+        self._clients.clear()
+
+
+class EventStream:
+    """
+    Arquivo de texto usado pelo console da tarefa: cada linha vira um evento "log" e cada
+    linha terminada em "\\r" (barras de progresso) vira um evento "progress".
+    """
+
+    def __init__(self, emit: Callable[[dict], None]) -> None:
+        self.emit = emit
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        *parts, self._buffer = re.split(r"(\r|\n)", self._buffer)
+        for line, end in zip(parts[::2], parts[1::2]):
+            if line.strip():
+                self.emit({"event": "progress" if end == "\r" else "log", "text": line})
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+@dataclass
+class Job:
+    id: int
+    args: list[str]
+    status: str = "running"
+    started: float = field(default_factory=time.time)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "args": self.args,
+            "status": self.status,
+            "elapsed": round(time.time() - self.started, 3),
+        }
+
+
+class JobServer:
+    """
+    Recebe tarefas por HTTP (`POST /jobs` com {"args": [...]}) com os mesmos argumentos da
+    CLI, executa em paralelo nos clientes já conectados e devolve os eventos em NDJSON.
+
+    Toda requisição precisa do token do daemon (`Authorization: Bearer <token>`). Requisições
+    com `Origin` (vindas de um navegador) são recusadas e `POST /jobs` exige
+    `Content-Type: application/json`, que não pode ser enviado sem preflight CORS.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[list[str]], Namespace],
+        run: Callable[[Namespace, Clients], Awaitable[None]],
+        clients: Clients,
+        token: str,
+    ) -> None:
+        self.parse = parse
+        self.run = run
+        self.clients = clients
+        self.token = token
+        self.jobs: dict[int, Job] = {}
+        self._ids = count(1)
+
+    def _refuse(self, method: str, headers: dict[str, str]) -> tuple[int, str] | None:
+        """Status e motivo para recusar a requisição (None se ela pode seguir)."""
+        if "origin" in headers:
+            return 403, "Requisições de navegador não são aceitas."
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(
+            token.strip().encode(), self.token.encode()
+        ):
+            return 401, "Token inválido."
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if method == "POST" and content_type != "application/json":
+            return 415, "Use Content-Type: application/json."
+        return None
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            method, path, headers, body = await self._read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            self._respond(writer, 400, {"error": str(e) or "Requisição inválida."})
+            await self._close(writer)
+            return
+
+        if refused := self._refuse(method, headers):
+            status, error = refused
+            self._respond(writer, status, {"error": error})
+        elif method == "GET" and path == "/health":
+            self._respond(writer, 200, {"status": "ok", "jobs": len(self.jobs)})
+        elif method == "GET" and path == "/jobs":
+            self._respond(writer, 200, [job.as_dict() for job in self.jobs.values()])
+        elif method == "POST" and path == "/jobs":
+            try:
+                payload = json.loads(body or b"{}")
+                args = payload["args"]
+                if not isinstance(args, list) or not all(
+                    isinstance(arg, str) for arg in args
+                ):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                self._respond(
+                    writer, 400, {"error": 'Envie {"args": [...]} com strings.'}
+                )
+            else:
+                await self._stream_job(args, writer)
+        else:
+            self._respond(writer, 404, {"error": "Rota não encontrada."})
+        await self._close(writer)
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[str, str, dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("Requisição inválida.")
+        method, path = request_line[0].upper(), request_line[1].split("?")[0]
+
+        headers: dict[str, str] = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_SIZE:
+            raise ValueError("Corpo da requisição muito grande.")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, data: Any) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode()
+            + body
+        )
+
+    async def _close(self, writer: asyncio.StreamWriter) -> None:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    async def _stream_job(self, args: list[str], writer: asyncio.StreamWriter) -> None:
+        job = Job(next(self._ids), args)
+
+        def emit(event: dict) -> None:
+            # o cliente pode desconectar; a tarefa continua rodando até o fim
+            if not writer.is_closing():
+                line = json.dumps({"job": job.id, **event}, ensure_ascii=False)
+                writer.write(line.encode() + b"\n")
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        emit({"event": "start", "args": args})
+
+        # cada conexão roda na própria task, então o console e as estatísticas ficam isolados
+        current_console.set(
+            Console(file=EventStream(emit), width=120, color_system=None, log_path=False)  # type: ignore
+        )
+        self.jobs[job.id] = job
+        error = None
+        try:
+            await self.run_args(args)
+            job.status = "ok"
+        except JobExit as e:
+            job.status = "ok" if e.status == 0 else "error"
+        except TGToolsError as e:
+            job.status, error = "error", e.message
+        except Exception as e:
+            job.status, error = "error", str(e) or type(e).__name__
+        finally:
+            del self.jobs[job.id]
+
+        end = {"event": "end", "status": job.status}
+        if error:
+            end["error"] = error
+        emit(end)
+
+    async def run_args(self, args: list[str]) -> None:
+        parsed = self.parse(args)
+        if (
+            parsed.command == "serve"
+            or parsed.command in CONFIG_COMMANDS
+            or any(getattr(parsed, flag, False) for flag in CONFIG_FLAGS)
+        ):
+            raise TGToolsError("Comando indisponível no serve.")
+        defaults = self.parse([])
+        if changed := [
+            f"--{name.replace('_', '-')}"
+            for name in DAEMON_OPTIONS
+            if getattr(parsed, name, None) != getattr(defaults, name, None)
+        ]:
+            raise TGToolsError(
+                f"Opções que valem para o serve inteiro, defina-as ao iniciá-lo: {', '.join(changed)}"
+            )
+        if getattr(parsed, "links_file", None) == "-":
+            raise TGToolsError("Use um arquivo em --links-file (sem entrada padrão no serve).")
+        if getattr(parsed, "path_or_file", None) == STDIN_SOURCE:
+            raise TGToolsError("Use um arquivo de pacote (sem entrada padrão no serve).")
+        await self.run(parsed, self.clients)
+
+
+async def serve(
+    parse: Callable[[list[str]], Namespace],
+    run: Callable[[Namespace, Clients], Awaitable[None]],
+    clients: Clients,
+    token_file: Path,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+) -> None:
+    """
+    Inicia o daemon: conecta os clientes configurados e atende as tarefas até ser encerrado.
+    Um token novo é gerado a cada início e gravado em `token_file`, legível só pelo usuário.
+    """
+    token = secrets.token_urlsafe(32)
+    write_private(token_file, token)
+    warm = WarmClients(clients)
+    server = JobServer(parse, run, warm, token)
+
+    for name in ("userbot", "bot"):
+        try:
+            if await getattr(warm, name)() is None:
+                log.warning(f"{name} não configurado, ignorando.")
+        except TGToolsError as e:
+            log.error(e.message)
+
+    if socket_path:
+        Path(socket_path).unlink(missing_ok=True)
+        listener = await asyncio.start_unix_server(server.handle, path=socket_path)
+        os.chmod(socket_path, 0o600)
+        address = socket_path
+    else:
+        listener = await asyncio.start_server(server.handle, host=host, port=port)
+        address = f"http://{host}:{port}"
+
+    log.info(f"Aguardando tarefas em {address} (token em {token_file})")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await warm.close()
+        token_file.unlink(missing_ok=True)
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+
+
+def write_private(path: Path, content: str) -> None:
+    """Grava o arquivo com permissão só para o usuário (0600) desde a criação."""
+    path.unlink(missing_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as file:
+        file.write(content)
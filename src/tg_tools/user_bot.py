@@ -1,25 +1,45 @@
 import asyncio
-import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
 from io import BytesIO
 from pathlib import Path
-from typing import Literal, cast
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, BinaryIO, Callable, Literal, cast
 
 from hydrogram import Client
-from hydrogram.types import ForumTopic, Message
+from hydrogram.file_id import FileId
+from hydrogram.types import Message
 
+from tg_tools.archives import archive_files
 from tg_tools.base_tg import BaseTG
 from tg_tools.config import console
-from tg_tools.exceptions import TGToolsError
+from tg_tools.exceptions import IncompleteDownloadError, TGToolsError
+from tg_tools.logs import log
+from tg_tools.paths import PathAllocator
+from tg_tools.planning import JobPlan, JobStats
+from tg_tools.prefilters import MediaFilter
+from tg_tools.preparation import PreparedFile, needs_preparation, prepare_files
+from tg_tools.records import MediaRecord
+from tg_tools.retry import RetryQueue
+from tg_tools.scheduling import SchedulePolicy, TransferScheduler, schedule
 from tg_tools.utils import (
     caption_filters,
     delete_file,
     format_size,
     get_link_info,
+    group_links_by_chat,
     guess_extension_from_name_or_mime,
     handle_floodwait,
-    sanitize_filename,
     search_files,
 )
+from tg_tools.writer import (
+    DEFAULT_BUFFER_SIZE,
+    ArchiveSpec,
+    ArchiveWriter,
+    FileWriter,
+    FsyncPolicy,
+    open_writer,
+)
 
 
 # -----------------------------
@@ -35,6 +55,9 @@ class Userbot(BaseTG):
         "animation",
         "document",
     )
+    # mídias que podem ser reenviadas pelo _send_file (relay) e as que só são baixadas
+    SENDABLE_MEDIA = MESSAGE_TYPES[1:]
+    DOWNLOADABLE_MEDIA = SENDABLE_MEDIA + ("sticker", "video_note")
 
     def __init__(self, session_string: str) -> None:
         super().__init__(Client("userbot", session_string=session_string))
@@ -43,12 +66,12 @@ class Userbot(BaseTG):
     async def create_session_string(api_id: int | str, api_hash: str) -> str:
         """Cria uma nova sessão e exporta em formato de string."""
         try:
-            console.log("[blue]Criando nova sessão...[/blue]")
+            log.info("Criando nova sessão...")
             async with Client(
                 "_userbot", api_id=api_id, api_hash=api_hash, in_memory=True
             ) as app:
                 session = await app.export_session_string()
-                console.log("[green]Sessão criada com sucesso![/green]")
+                log.info("Sessão criada com sucesso!")
                 return session
         except Exception as e:
             raise TGToolsError(f"Erro ao criar sessão! Erro {e}")
@@ -56,14 +79,18 @@ class Userbot(BaseTG):
     async def verify_session(self) -> None:
         """Verifica a sessão do userbot."""
         try:
-            async with self.client:
+            async with self.session():
                 user = await self.client.get_me()
-                console.log(
-                    f"[green]Sessão verificada! Usuário: {user.first_name}[/green]"
-                )
+                log.info(f"Sessão verificada! Usuário: {user.first_name}")
         except Exception as e:
             raise TGToolsError(f"Erro ao verificar sessão! Erro {e}")
 
+    async def latest_message_id(self, chat_id: int | str, after: int) -> int:
+        """Retorna o id da última mensagem do chat (userbots podem ler o histórico direto)."""
+        async for msg in self.client.get_chat_history(chat_id, limit=1):  # type: ignore
+            return max(msg.id, after)
+        return after
+
     # --- Helpers para download --- #
     def _get_media_info(self, msg: Message) -> tuple[str | None, str | None]:
         """Retorna (file_name, mime_type) baseado no conteúdo da mensagem."""
@@ -87,13 +114,632 @@ class Userbot(BaseTG):
             )
         return None, None
 
-    def _build_target_path(self, base_path: Path, raw_name: str | None) -> str:
-        base = base_path.absolute().as_posix().removesuffix("/") + "/"
-        if raw_name:
-            sanitized = sanitize_filename(raw_name)
-            return base + sanitized
+    def _media_kind(
+        self, msg: Message, kinds: tuple[str, ...] = DOWNLOADABLE_MEDIA
+    ) -> str | None:
+        """Atributo da mensagem com a mídia (video, photo...) entre `kinds`, ou None."""
+        return next((kind for kind in kinds if getattr(msg, kind, None)), None)
+
+    def _media_record(self, msg: Message) -> MediaRecord | None:
+        """
+        Reduz a mensagem ao registro compacto usado no download
+        (None se a mídia não for baixável, como enquetes e localizações).
+        """
+        kind = self._media_kind(msg)
+        if kind is None:
+            return None
+        media = getattr(msg, kind)
+        file_name, mime_type = self._get_media_info(msg)
+        return MediaRecord(
+            id=msg.id,
+            kind=kind,
+            file_id=media.file_id,
+            size=getattr(media, "file_size", 0) or 0,
+            file_name=file_name,
+            mime_type=mime_type,
+            # str simples: o Str do hydrogram mantém a lista de entities viva
+            caption=str(msg.caption) if msg.caption else None,
+        )
+
+    def _select_media(
+        self,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        media_filter: MediaFilter | None = None,
+    ) -> Callable[[Message], MediaRecord | None]:
+        """Converte as mensagens aceitas em MediaRecord e descarta as demais."""
+
+        def select(msg: Message) -> MediaRecord | None:
+            if not self._accept_message(
+                msg, media_type, filter_caption_includes, media_filter
+            ):
+                return None
+            return self._media_record(msg)
+
+        return select
+
+    def _target_name(
+        self, record: MediaRecord, name: Literal["file_name", "caption"]
+    ) -> tuple[str | None, str]:
+        """Retorna (nome sem extensão, extensão) do arquivo de destino da mídia."""
+        file_name, mime_type = record.file_name, record.mime_type
+        extension = guess_extension_from_name_or_mime(file_name or "", mime_type)
+
+        # nome baseado em caption
+        if name == "caption" and record.caption:
+            return record.caption, extension
+
+        if file_name and file_name.endswith(extension):
+            file_name = file_name[: -len(extension)]
+        return file_name or None, extension
+
+    def _reject_reason(
+        self,
+        msg: Message,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        media_filter: MediaFilter | None = None,
+    ) -> str | None:
+        """Retorna o motivo pelo qual a mensagem não deve ser baixada (None se aceita)."""
+        if not (isinstance(msg, Message) and msg.media):
+            return "sem mídia"
+
+        # conta como valida só se tiver um tipo reconhecido
+        is_valid_media = media_type == "all" or (
+            (media_type == "video" and msg.video)
+            or (media_type == "photo" and msg.photo)
+            or (media_type == "voice" and msg.voice)
+            or (media_type == "audio" and msg.audio)
+            or (media_type == "animation" and msg.animation)
+            or (media_type == "document" and msg.document)
+        )
+
+        if not is_valid_media:
+            return "tipo de mídia"
+
+        if not caption_filters(msg, filter_caption_includes):
+            return "caption"
+
+        # filtros pelos metadados (--min-size, --since, --mime-glob...)
+        if media_filter and (kind := self._media_kind(msg)):
+            return media_filter.reason(msg, kind)
+
+        return None
+
+    def _accept_message(
+        self,
+        msg: Message,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        media_filter: MediaFilter | None = None,
+    ) -> bool:
+        """
+        Verifica se a mensagem tem mídia do tipo desejado e passa nos filtros de caption e
+        de metadados (os descartes de cada filtro são contados em `media_filter.dropped`).
+        """
+        reason = self._reject_reason(msg, media_type, filter_caption_includes)
+        if reason is None and media_filter and (kind := self._media_kind(msg)):
+            if not media_filter.accept(msg, kind):
+                return False
+
+        # filtros por caption
+        if reason == "caption":
+            log.debug(
+                "Caption não contém os filtros %s! Mensagem: %s",
+                filter_caption_includes,
+                msg.id,
+            )
+
+        return reason is None
+
+    async def plan_download(
+        self,
+        groups: dict[int | str, list[int]],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        msg_thread_id: int | None = None,
+        media_filter: MediaFilter | None = None,
+    ) -> JobPlan:
+        """Dimensiona um download só com os metadados, sem baixar nem gravar nada."""
+
+        def classify(msg: Message) -> tuple[str | None, str | None]:
+            reason = self._reject_reason(
+                msg, media_type, filter_caption_includes, media_filter
+            )
+            if reason:
+                return reason, None
+            return None, self._media_kind(msg)
+
+        for chat_id in groups:
+            await self.verify_chat_id(chat_id)
+
+        return await self.plan_messages(
+            groups, JobPlan("download"), classify, msg_thread_id=msg_thread_id
+        )
+
+    @staticmethod
+    def _download_progress(current: int, total: int) -> None:
+        # a linha de progresso é a chamada mais frequente: nada é formatado se não aparecer
+        if not log.progress:
+            return
+        try:
+            progress_str = f"Baixando... {format_size(current)} / {format_size(total)} - {current / total * 100:.2f}%"
+            console.print(progress_str, end="\r")
+        except Exception:
+            pass
+
+    async def _download_message(
+        self,
+        record: MediaRecord,
+        name: Literal["file_name", "caption"],
+        test_mode: bool,
+        counter: str,
+        writer: FileWriter,
+        allocator: PathAllocator,
+    ) -> str:
+        """Baixa a mídia do registro para a pasta do `allocator` e retorna o caminho final."""
+        stem, extension = self._target_name(record, name)
+        target_path = allocator.allocate(stem, extension, record.id).as_posix()
+
+        log.debug(
+            "Baixando arquivo (%s)! Mensagem: %s, Arquivo: %s",
+            counter,
+            record.id,
+            target_path,
+        )
+        try:
+            if test_mode and isinstance(writer, ArchiveWriter):
+                # nada entra nos pacotes nem no índice: só mostra o nome que o membro teria
+                pass
+            elif test_mode:
+                # escreve arquivo dummy em pasta .test_mode para não sujar pasta original
+                file_test = allocator.child(".test_mode").allocate(
+                    stem, f"{extension}.test_mode", record.id
+                )
+                target_path = (
+                    await writer.write_bytes(file_test, b"TEST MODE", record.id)
+                ).as_posix()
+            else:
+                final_path = await handle_floodwait(
+                    self._stream_to_file, record, Path(target_path), writer
+                )
+                target_path = final_path.as_posix()
+        except BaseException:
+            allocator.release(Path(target_path))
+            raise
+
+        log.info(
+            "Arquivo baixado (%s)! Mensagem: %s, Arquivo: %s",
+            counter,
+            record.id,
+            target_path,
+            msg_id=record.id,
+            file=target_path,
+        )
+        return target_path
+
+    async def _download_batch(
+        self,
+        records: list[MediaRecord],
+        name: Literal["file_name", "caption"],
+        test_mode: bool,
+        writer: FileWriter,
+        allocator: PathAllocator,
+        scheduler: TransferScheduler,
+        total: int,
+        start: int = 0,
+        chat_id: int | str | None = None,
+        retries: RetryQueue[tuple[int | str, MediaRecord]] | None = None,
+    ) -> list[int]:
+        """
+        Baixa os registros na ordem e com as vagas definidas pelo `scheduler`.
+        Retorna os ids baixados com sucesso, na ordem dos registros.
+        Com `retries`, os que falharem com erros transitórios voltam para o fim da tarefa.
+        """
+
+        async def worker(index: int, record: MediaRecord) -> int | None:
+            async with scheduler.slot(record.size):
+                try:
+                    await self._download_message(
+                        record,
+                        name=name,
+                        test_mode=test_mode,
+                        counter=f"{index}/{total}",
+                        writer=writer,
+                        allocator=allocator,
+                    )
+                    self.stats.messages += 1
+                    return record.id
+                except Exception as e:
+                    policy = retries and retries.fail(
+                        (chat_id, record),  # type: ignore
+                        (chat_id, record.id),
+                        f"Chat: {chat_id}, Mensagem: {record.id}",
+                        e,
+                    )
+                    if policy:
+                        log.warning(
+                            "Erro ao baixar arquivo (%s/%s)! Mensagem: %s, Erro %s, Nova tentativa no fim da tarefa (%s)",
+                            index,
+                            total,
+                            record.id,
+                            e,
+                            policy.action,
+                            msg_id=record.id,
+                        )
+                    else:
+                        log.error(
+                            "Erro ao baixar arquivo (%s/%s)! Mensagem: %s, Erro %s",
+                            index,
+                            total,
+                            record.id,
+                            e,
+                            msg_id=record.id,
+                        )
+                    return None
+
+        # as tarefas disputam as vagas na ordem em que são criadas
+        ordered = scheduler.order(
+            list(enumerate(records, start=start + 1)),
+            size_of=lambda item: item[1].size,
+        )
+        results = await asyncio.gather(
+            *(worker(index, record) for index, record in ordered)
+        )
+        downloaded = {msg_id for msg_id in results if msg_id is not None}
+        return [record.id for record in records if record.id in downloaded]
+
+    async def _retry_downloads(
+        self,
+        retries: RetryQueue[tuple[int | str, MediaRecord]],
+        name: Literal["file_name", "caption"],
+        test_mode: bool,
+        writer: FileWriter,
+        allocator: PathAllocator,
+        scheduler: TransferScheduler,
+    ) -> int:
+        """
+        Tenta de novo os downloads reenfileirados até não sobrar nenhum, aplicando antes a
+        ação da política de cada um: `refresh` busca a mensagem de novo (file reference
+        novo) e `reconnect` troca as conexões de mídia do DC do arquivo.
+        Retorna quantos foram baixados nas novas tentativas.
+        """
+        downloaded = 0
+        while entries := await retries.drain():
+            log.info(f"Tentando de novo {len(entries)} download(s) que falharam...")
+            records: dict[int | str, list[MediaRecord]] = {}
+            refresh: dict[int | str, list[int]] = {}
+            for entry in entries:
+                chat_id, record = entry.item
+                if entry.policy.action == "refresh":
+                    refresh.setdefault(chat_id, []).append(record.id)
+                    continue
+                if entry.policy.action == "reconnect":
+                    await self.media.reconnect(FileId.decode(record.file_id).dc_id)
+                records.setdefault(chat_id, []).append(record)
+
+            for chat_id, message_ids in refresh.items():
+                found: set[int] = set()
+                async for messages in self.iter_messages(chat_id, message_ids):
+                    for msg in messages:
+                        if record := self._media_record(msg):
+                            found.add(record.id)
+                            records.setdefault(chat_id, []).append(record)
+                for msg_id in message_ids:
+                    if msg_id not in found:
+                        retries.give_up(
+                            (chat_id, msg_id),
+                            f"Chat: {chat_id}, Mensagem: {msg_id}",
+                            TGToolsError("Mensagem não encontrada"),
+                        )
+
+            total = sum(len(items) for items in records.values())
+            start = 0
+            for chat_id, items in records.items():
+                downloaded += len(
+                    await self._download_batch(
+                        items,
+                        name=name,
+                        test_mode=test_mode,
+                        writer=writer,
+                        allocator=allocator,
+                        scheduler=scheduler,
+                        total=total,
+                        start=start,
+                        chat_id=chat_id,
+                        retries=retries,
+                    )
+                )
+                start += len(items)
+        return downloaded
+
+    @staticmethod
+    def _report_filter(media_filter: MediaFilter | None) -> None:
+        """Resumo de quantas mensagens cada filtro de metadados descartou."""
+        if not (media_filter and media_filter.dropped):
+            return
+        dropped = ", ".join(
+            f"{reason}: {count}" for reason, count in media_filter.dropped.most_common()
+        )
+        log.summary(
+            f"Descartadas pelos filtros! {dropped}", dropped=dict(media_filter.dropped)
+        )
+
+    @staticmethod
+    def _report_failures(retries: RetryQueue) -> None:
+        if log.rich:
+            if table := retries.report():
+                console.print(table)
+            return
+        for failure in retries.failures:
+            log.error(
+                "Falha definitiva! %s, Tentativas: %s, Erro %s",
+                failure.description,
+                failure.attempts,
+                failure.error,
+            )
+
+    async def _stream_to_file(
+        self, record: MediaRecord, target: Path, writer: FileWriter
+    ) -> Path:
+        """
+        Baixa a mídia em blocos e repassa para o `writer`, que grava fora do event loop.
+        Confere o tamanho final com o informado pelo Telegram antes de confirmar o arquivo.
+        """
+        total = record.size
+        handle = writer.open(target, record.id)
+        try:
+            # fecha o gerador em caso de erro: a sessão do pool é liberada na hora
+            async with aclosing(self.media.stream(record.file_id)) as chunks:
+                async for chunk in chunks:
+                    await self.bandwidth.consume_down(len(chunk))
+                    await handle.write(chunk)
+                    self.stats.bytes += len(chunk)
+                    self._download_progress(handle.size, total)
+
+            if total and handle.size != total:
+                raise IncompleteDownloadError(
+                    f"Download incompleto! Recebido: {format_size(handle.size)} de {format_size(total)}"
+                )
+            return await handle.commit()
+        except BaseException:
+            await handle.abort()
+            raise
+
+    async def _send_file(
+        self,
+        chat_id: int | str,
+        media_type: str,
+        file: str | BinaryIO,
+        caption: str,
+        thumbnail: bytes | None = None,
+        progress: Callable | None = None,
+        **kwargs,
+    ) -> Message | None:
+        """
+        Envia um arquivo (caminho ou objeto binário) usando o método adequado ao tipo de mídia.
+        Parâmetros extras (file_name, caption_entities, duration...) são repassados ao método.
+        """
+
+        # thumb precisa ser BytesIO novo por envio
+        thumb_obj = BytesIO(thumbnail) if thumbnail else None
+        # cada parte enviada passa pelo limite global de banda
+        progress = self.bandwidth.throttled_progress(progress)
+
+        if media_type == "video":
+            return await self.client.send_video(
+                chat_id=chat_id,
+                video=file,
+                caption=caption,
+                thumb=thumb_obj,
+                progress=progress,
+                **kwargs,
+            )
+        elif media_type == "photo":
+            return await self.client.send_photo(
+                chat_id=chat_id,
+                photo=file,
+                caption=caption,
+                progress=progress,
+                **kwargs,
+            )
+        elif media_type == "voice":
+            return await self.client.send_voice(
+                chat_id=chat_id,
+                voice=file,
+                caption=caption,
+                progress=progress,
+                **kwargs,
+            )
+        elif media_type == "audio":
+            return await self.client.send_audio(
+                chat_id=chat_id,
+                audio=file,
+                caption=caption,
+                thumb=thumb_obj,
+                progress=progress,
+                **kwargs,
+            )
+        elif media_type == "animation":
+            return await self.client.send_animation(
+                chat_id=chat_id,
+                animation=file,
+                caption=caption,
+                thumb=thumb_obj,
+                progress=progress,
+                **kwargs,
+            )
+        elif media_type == "document":
+            return await self.client.send_document(
+                chat_id=chat_id,
+                document=file,
+                caption=caption,
+                thumb=thumb_obj,
+                progress=progress,
+                **kwargs,
+            )
         else:
-            return f"{base}{time.time()}.unknown"
+            raise TGToolsError(f"Tipo de arquivo desconhecido: {media_type}")
+
+    @staticmethod
+    def _upload_source(prepared: PreparedFile) -> str | BinaryIO:
+        """
+        Caminho do arquivo ou, para fotos recomprimidas na preparação e membros de pacotes,
+        o conteúdo em memória.
+        """
+        if prepared.stream:
+            prepared.stream.seek(0)
+            return prepared.stream
+        if not prepared.photo:
+            return prepared.file.as_posix()
+        upload = BytesIO(prepared.photo)
+        upload.name = f"{prepared.file.stem}.jpg"
+        return upload
+
+    async def _upload_album(
+        self,
+        chat_id: int | str,
+        media_type: str,
+        files: list[PreparedFile],
+        thumbnail: bytes | None,
+        delete: bool,
+        test_mode: bool,
+    ) -> bool:
+        """Envia os arquivos preparados em um único álbum (send_media_group)."""
+        names = ", ".join(prepared.file.name for prepared in files)
+        log.info(f"Enviando álbum! Arquivos ({len(files)}): {names}")
+
+        def build_media() -> list:
+            media = []
+            for prepared in files:
+                kwargs = {}
+                thumb = prepared.thumbnail or thumbnail
+                if thumb and media_type != "photo":
+                    kwargs["thumb"] = BytesIO(thumb)
+                media.append(
+                    self.ALBUM_MEDIA[media_type](
+                        self._upload_source(prepared),
+                        caption=prepared.file.name,
+                        **kwargs,
+                    )
+                )
+            return media
+
+        try:
+            if not test_mode:
+                # send_media_group não informa o progresso: o limite de banda é consumido antes
+                await self.bandwidth.consume_up(sum(prepared.size for prepared in files))
+                # objetos novos a cada tentativa, já que os buffers são lidos no envio
+                await handle_floodwait(
+                    lambda: self.client.send_media_group(chat_id, media=build_media())
+                )
+            log.info(f"Álbum enviado! Arquivos: {len(files)}")
+        except Exception as e:
+            log.error(f"Erro ao enviar álbum! Erro {e}")
+            return False
+
+        if delete and not test_mode:
+            for prepared in files:
+                delete_file(prepared.file)
+        return True
+
+    @staticmethod
+    def _upload_progress(current: int, total: int) -> None:
+        # a linha de progresso é a chamada mais frequente: nada é formatado se não aparecer
+        if not log.progress:
+            return
+        try:
+            progress_str = f"Enviando... {format_size(current)} / {format_size(total)} - {current / total * 100:.2f}%"
+            console.print(progress_str, end="\r")
+        except Exception:
+            pass
+
+    async def _upload_files(
+        self,
+        chat_id: int | str,
+        media_type: str,
+        files: AsyncIterator[PreparedFile],
+        total: int | str,
+        thumbnail: bytes | None,
+        delete: bool,
+        album: bool,
+        test_mode: bool,
+    ) -> set[Path]:
+        """
+        Envia os arquivos preparados, um a um ou em álbuns de até ALBUM_SIZE itens, e retorna
+        os que foram enviados. Os buffers dos arquivos são fechados após o envio.
+        """
+        sent: set[Path] = set()
+        index = 0
+        pending: list[PreparedFile] = []
+
+        async def send_album() -> None:
+            try:
+                if await self._upload_album(
+                    chat_id,
+                    media_type,
+                    pending,
+                    thumbnail=thumbnail,
+                    delete=delete,
+                    test_mode=test_mode,
+                ):
+                    sent.update(item.file for item in pending)
+            finally:
+                for item in pending:
+                    if item.stream:
+                        item.stream.close()
+                pending.clear()
+
+        async for prepared in files:
+            index += 1
+            file = prepared.file
+
+            if album and not prepared.error:
+                pending.append(prepared)
+                if len(pending) == self.ALBUM_SIZE:
+                    await send_album()
+                continue
+
+            try:
+                if prepared.error:
+                    raise TGToolsError(prepared.error)
+
+                log.debug("Enviando arquivo (%s/%s)! Arquivo: %s", index, total, file)
+
+                async def send():
+                    return await self._send_file(
+                        chat_id,
+                        media_type=media_type,
+                        file=self._upload_source(prepared),
+                        caption=file.name,
+                        thumbnail=prepared.thumbnail or thumbnail,
+                        progress=self._upload_progress,
+                    )
+
+                if not test_mode:
+                    enviado = await handle_floodwait(send)
+                else:
+                    enviado = True
+
+                log.info(
+                    "Arquivo enviado (%s/%s)! Arquivo: %s", index, total, file, file=file
+                )
+                sent.add(file)
+
+                if enviado and delete:
+                    delete_file(file)
+
+            except Exception as e:
+                log.error(
+                    "Erro ao enviar arquivo (%s/%s)! Erro %s", index, total, e, file=file
+                )
+            finally:
+                if prepared.stream:
+                    prepared.stream.close()
+
+        if pending:
+            await send_album()
+        return sent
 
     async def upload_media(
         self,
@@ -104,121 +750,112 @@ class Userbot(BaseTG):
         delete: bool = False,
         listen_new_files: bool = False,
         thumbnail: bytes | None = None,
+        thumbnail_per_file: bool = False,
+        prepare_ahead: int = 2,
+        album: bool = False,
+        schedule_policy: SchedulePolicy = "order",
         test_mode: bool = False,
     ) -> None:
         """
         Envia arquivos para o chat id informado.
+        Com `thumbnail_per_file`, cada arquivo tenta gerar a própria thumbnail antes de usar a padrão.
+        O trabalho de CPU dos próximos `prepare_ahead` arquivos roda em paralelo aos envios.
+        Com `album`, os arquivos são enviados em álbuns de até ALBUM_SIZE itens.
+        `schedule_policy` define a ordem dos envios pelo tamanho dos arquivos.
         """
 
+        if album and media_type not in self.ALBUM_MEDIA:
+            raise TGToolsError(f"O tipo {media_type} não pode ser enviado em álbum.")
+
         await self.verify_chat_id(chat_id)
 
-        async with self.client:
-            console.log(
-                f"[blue]Enviando arquivos! Origem: {path_or_file}, Chat: {chat_id}[/blue]"
-            )
+        async with self.session():
+            log.info(f"Enviando arquivos! Origem: {path_or_file}, Chat: {chat_id}")
 
-            def progress(current: int, total: int) -> None:  # progress callback
-                try:
-                    progress_str = f"Enviando... {format_size(current)} / {format_size(total)} - {current / total * 100:.2f}%"
-                    console.print(progress_str, end="\r")
-                except Exception:
-                    pass
-
-            seen = set()
-
-            while True:
-                files = search_files(path_or_file, formats=formats) or []
-                files = [f for f in files if f not in seen]
-                length_files = len(files)
-                console.log(
-                    f"[blue]Total de arquivos encontrados: {length_files}, Tipo: {media_type}[/blue]"
-                )
+            seen: set[Path] = set()
 
-                for index, file in enumerate(files):
-                    try:
-                        console.log(
-                            f"[blue]Enviando arquivo ({index + 1}/{length_files})! Arquivo: {file}[/blue]"
-                        )
+            # pool de processos compartilhado por todas as varreduras (só quando há trabalho de CPU)
+            executor = (
+                ProcessPoolExecutor(max_workers=prepare_ahead)
+                if needs_preparation(media_type, thumbnail_per_file)
+                else None
+            )
 
-                        # thumb precisa ser BytesIO novo por envio
-                        thumb_obj = BytesIO(thumbnail) if thumbnail else None
-
-                        async def send():
-                            if media_type == "video":
-                                return await self.client.send_video(
-                                    chat_id=chat_id,
-                                    video=file.as_posix(),
-                                    caption=file.name,
-                                    thumb=thumb_obj,
-                                    progress=progress,
-                                )
-                            elif media_type == "photo":
-                                return await self.client.send_photo(
-                                    chat_id=chat_id,
-                                    photo=file.as_posix(),
-                                    caption=file.name,
-                                    progress=progress,
-                                )
-                            elif media_type == "voice":
-                                return await self.client.send_voice(
-                                    chat_id=chat_id,
-                                    voice=file.as_posix(),
-                                    caption=file.name,
-                                    progress=progress,
-                                )
-                            elif media_type == "audio":
-                                return await self.client.send_audio(
-                                    chat_id=chat_id,
-                                    audio=file.as_posix(),
-                                    caption=file.name,
-                                    thumb=thumb_obj,
-                                    progress=progress,
-                                )
-                            elif media_type == "animation":
-                                return await self.client.send_animation(
-                                    chat_id=chat_id,
-                                    animation=file.as_posix(),
-                                    caption=file.name,
-                                    thumb=thumb_obj,
-                                    progress=progress,
-                                )
-                            elif media_type == "document":
-                                return await self.client.send_document(
-                                    chat_id=chat_id,
-                                    document=file.as_posix(),
-                                    caption=file.name,
-                                    thumb=thumb_obj,
-                                    progress=progress,
-                                )
-                            else:
-                                raise TGToolsError(
-                                    f"Tipo de arquivo desconhecido: {media_type}"
-                                )
+            try:
+                while True:
+                    files = search_files(path_or_file, formats=formats) or []
+                    files = schedule(
+                        [f for f in files if f not in seen],
+                        size_of=lambda f: f.stat().st_size,
+                        policy=schedule_policy,
+                    )
+                    length_files = len(files)
+                    log.info(
+                        f"Total de arquivos encontrados: {length_files}, Tipo: {media_type}"
+                    )
 
-                        if not test_mode:
-                            enviado = await handle_floodwait(send)
-                        else:
-                            enviado = True
+                    seen |= await self._upload_files(
+                        chat_id,
+                        media_type,
+                        prepare_files(
+                            files,
+                            media_type=media_type,
+                            thumbnail_per_file=thumbnail_per_file,
+                            ahead=prepare_ahead,
+                            executor=executor,
+                        ),
+                        total=length_files,
+                        thumbnail=thumbnail,
+                        delete=delete,
+                        album=album,
+                        test_mode=test_mode,
+                    )
 
-                        console.log(
-                            f"[green]Arquivo enviado ({index + 1}/{length_files})! Arquivo: {file}[/green]"
-                        )
-                        seen.add(file)
+                    if not listen_new_files or len(files) == 0:
+                        break
 
-                        if enviado and delete:
-                            delete_file(file)
+                    await asyncio.sleep(1)
+            finally:
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
 
-                    except Exception as e:
-                        console.log(
-                            f"[red]Erro ao enviar arquivo ({index + 1}/{length_files})! Erro {e}[/red]"
-                        )
+            log.summary("Tarefa concluída!")
 
-                if not listen_new_files or len(files) == 0:
-                    break
+    async def upload_archive(
+        self,
+        source: str | Path,
+        chat_id: int | str,
+        formats: list[str],
+        media_type: str,
+        thumbnail: bytes | None = None,
+        album: bool = False,
+        buffer_size: int = 64 * 1024 * 1024,
+        test_mode: bool = False,
+    ) -> None:
+        """
+        Envia os arquivos de um pacote .tar/.zip (ou da entrada padrão, com `source` igual
+        a "-") sem extrair para o disco. Os formatos são filtrados pelo nome de cada membro,
+        que passa por um buffer de até `buffer_size` bytes em memória antes do envio.
+        """
 
-                await asyncio.sleep(1)
+        if album and media_type not in self.ALBUM_MEDIA:
+            raise TGToolsError(f"O tipo {media_type} não pode ser enviado em álbum.")
 
-            console.log("[green]Tarefa concluída![/green]")
+        await self.verify_chat_id(chat_id)
+
+        async with self.session():
+            log.info(f"Enviando arquivos do pacote! Origem: {source}, Chat: {chat_id}")
+            sent = await self._upload_files(
+                chat_id,
+                media_type,
+                archive_files(source, formats, buffer_size),
+                total="?",
+                thumbnail=thumbnail,
+                delete=False,
+                album=album,
+                test_mode=test_mode,
+            )
+            log.summary(f"Tarefa concluída! Arquivos enviados: {len(sent)}")
 
     async def download_media(
         self,
@@ -230,9 +867,16 @@ class Userbot(BaseTG):
         verify_messages: bool,
         filter_caption_includes: list[str] | None,
         test_mode: bool,
+        fsync: FsyncPolicy = "none",
+        write_buffer: int = DEFAULT_BUFFER_SIZE,
+        scheduler: TransferScheduler | None = None,
+        archive: ArchiveSpec | None = None,
+        media_filter: MediaFilter | None = None,
     ) -> None:
         """ "
         Baixa arquivos do link informado.
+        As gravações em disco são feitas pelo FileWriter, fora do event loop; com `archive`,
+        os arquivos vão para pacotes tar/zip com rotação por tamanho (ArchiveWriter).
         """
 
         chat_id, msg_thread_id, start_msg_id = get_link_info(link)
@@ -245,171 +889,493 @@ class Userbot(BaseTG):
         if path.is_file():
             path = path.parent
 
-        async with self.client:
-            console.log(
-                f"[blue]Baixando arquivos! Chat: {chat_id}, Quantidade: {number_files}, Pasta: {path}, Tipo de nome: {name}, Tipo de mídia: {media_type}, Verificar mensagens: {verify_messages}, Filtros caption: {filter_caption_includes}[/blue]"
+        allocator = PathAllocator(path.absolute())
+        scheduler = scheduler or TransferScheduler()
+
+        self.stats = JobStats()
+        async with self.session(), open_writer(
+            path.absolute(), write_buffer, fsync, archive
+        ) as writer, self.autotune(scheduler.tuner):
+            log.info(
+                f"Baixando arquivos! Chat: {chat_id}, Quantidade: {number_files}, Pasta: {path}, Tipo de nome: {name}, Tipo de mídia: {media_type}, Verificar mensagens: {verify_messages}, Filtros caption: {filter_caption_includes}"
             )
 
-            def progress(current: int, total: int) -> None:
-                try:
-                    progress_str = f"Baixando... {format_size(current)} / {format_size(total)} - {current / total * 100:.2f}%"
-                    console.print(progress_str, end="\r")
-                except Exception:
-                    pass
-
-            async def read(
-                message_ids: list[int],
-                number_files_local: int,
-                topic: ForumTopic | None = None,
-            ) -> None:
-                if number_files_local == 0 or not message_ids:
-                    console.log("[green]Nada a fazer neste range.[/green]")
-                    return
-
-                messages = cast(
-                    list[Message],
-                    await self.client.get_messages(chat_id, message_ids=message_ids),
+            downloaded = 0
+            retries: RetryQueue[tuple[int | str, MediaRecord]] = RetryQueue()
+
+            async def process(
+                records: list[MediaRecord], remaining: int
+            ) -> tuple[int, int | None]:
+                nonlocal downloaded
+                accepted = records[:remaining]
+                stopped_at = accepted[-1].id if len(records) >= remaining else None
+
+                pending = len(retries.pending)
+                valid_messages = await self._download_batch(
+                    accepted,
+                    name=name,
+                    test_mode=test_mode,
+                    writer=writer,
+                    allocator=allocator,
+                    scheduler=scheduler,
+                    total=number_files,
+                    start=downloaded,
+                    chat_id=chat_id,
+                    retries=retries,
                 )
+                downloaded += len(accepted)
+                # as que voltaram para a fila já contam: a nova tentativa completa o alvo
+                requeued = len(retries.pending) - pending
+                return len(valid_messages) + requeued, stopped_at
 
-                valid_messages: list[int] = []
-                total_valid_messages = 0
+            # com --verify-messages (ou em tópicos) continua lendo janelas até completar
+            topic = None
+            if msg_thread_id:
+                topic = await self.get_topic(chat_id, msg_thread_id)
+            await self.scan_messages(
+                chat_id,
+                start_id=start_msg_id,
+                target=number_files,
+                process=process,
+                lookahead=verify_messages or topic is not None,
+                end_id=topic.top_message if topic else None,
+                msg_thread_id=topic.id if topic else None,
+                select=self._select_media(
+                    media_type, filter_caption_includes, media_filter
+                ),
+            )
+            await self._retry_downloads(
+                retries, name, test_mode, writer, allocator, scheduler
+            )
+            self._report_filter(media_filter)
+            self._report_failures(retries)
 
-                for msg in messages:
-                    path_verify = Path(
-                        path.absolute().as_posix().removesuffix("/") + "/"
-                    )
+    async def download_links(
+        self,
+        links: list[str],
+        path: str | Path,
+        name: Literal["file_name", "caption"],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        fsync: FsyncPolicy = "none",
+        write_buffer: int = DEFAULT_BUFFER_SIZE,
+        scheduler: TransferScheduler | None = None,
+        archive: ArchiveSpec | None = None,
+        media_filter: MediaFilter | None = None,
+    ) -> None:
+        """
+        Baixa arquivos de uma lista de links avulsos.
+        Os links são agrupados por chat e buscados em lotes de até LIMIT_GET_MESSAGES ids.
+        """
 
-                    if not (isinstance(msg, Message) and msg.media):
-                        continue
+        groups = group_links_by_chat(links)
+        if not groups:
+            raise TGToolsError("Nenhum link válido encontrado!")
 
-                    if topic and (topic.id != msg.message_thread_id):
-                        continue
+        for chat_id in groups:
+            await self.verify_chat_id(chat_id)
 
-                    media_type_all = media_type == "all"
+        await self._download_groups(
+            groups,
+            path=path,
+            name=name,
+            media_type=media_type,
+            filter_caption_includes=filter_caption_includes,
+            test_mode=test_mode,
+            fsync=fsync,
+            write_buffer=write_buffer,
+            scheduler=scheduler,
+            archive=archive,
+            media_filter=media_filter,
+        )
 
-                    file_name, mime_type = self._get_media_info(msg)
+    async def download_sync(
+        self,
+        link: str,
+        path: str | Path,
+        name: Literal["file_name", "caption"],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        last_id: int | None,
+        on_mark: Callable[[int], None],
+        test_mode: bool,
+        fsync: FsyncPolicy = "none",
+        write_buffer: int = DEFAULT_BUFFER_SIZE,
+        scheduler: TransferScheduler | None = None,
+        archive: ArchiveSpec | None = None,
+        media_filter: MediaFilter | None = None,
+    ) -> None:
+        """
+        Baixa tudo o que foi postado no chat do link desde o último id processado (`last_id`)
+        até a última mensagem. Sem `last_id`, começa pela mensagem do link.
+        """
 
-                    # conta como valida só se tiver um tipo reconhecido
-                    is_valid_media = media_type_all or (
-                        (media_type == "video" and msg.video)
-                        or (media_type == "photo" and msg.photo)
-                        or (media_type == "voice" and msg.voice)
-                        or (media_type == "audio" and msg.audio)
-                        or (media_type == "animation" and msg.animation)
-                        or (media_type == "document" and msg.document)
-                    )
+        chat_id, msg_thread_id, start_msg_id = get_link_info(link)
+        if last_id is not None:
+            start_msg_id = last_id + 1
 
-                    if not is_valid_media:
-                        continue
+        await self.verify_chat_id(chat_id)
 
-                    # nome baseado em caption
-                    if name == "caption" and msg.caption:
-                        extension = guess_extension_from_name_or_mime(
-                            file_name or "", mime_type
-                        )
-                        raw = (msg.caption[:200]) if msg.caption else ""
-                        file_name = f"{raw}{extension}"
+        async with self.session():
+            latest = await self.latest_message_id(chat_id, start_msg_id - 1)
+            log.info(
+                f"Sincronizando! Chat: {chat_id}, De: {start_msg_id}, Até: {latest}"
+            )
+            await self._download_groups(
+                {chat_id: list(range(start_msg_id, latest + 1))},
+                path=path,
+                name=name,
+                media_type=media_type,
+                filter_caption_includes=filter_caption_includes,
+                test_mode=test_mode,
+                fsync=fsync,
+                write_buffer=write_buffer,
+                scheduler=scheduler,
+                msg_thread_id=msg_thread_id,
+                on_mark=on_mark,
+                archive=archive,
+                media_filter=media_filter,
+            )
 
-                    # constrói path final
-                    target_path = self._build_target_path(path_verify, file_name)
+    async def _download_groups(
+        self,
+        groups: dict[int | str, list[int]],
+        path: str | Path,
+        name: Literal["file_name", "caption"],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        test_mode: bool,
+        fsync: FsyncPolicy = "none",
+        write_buffer: int = DEFAULT_BUFFER_SIZE,
+        scheduler: TransferScheduler | None = None,
+        msg_thread_id: int | None = None,
+        on_mark: Callable[[int], None] | None = None,
+        archive: ArchiveSpec | None = None,
+        media_filter: MediaFilter | None = None,
+    ) -> None:
+        """
+        Baixa as mensagens agrupadas por chat em lotes de até LIMIT_GET_MESSAGES ids.
+        Após cada lote chama `on_mark` com o maior id do lote, mas nunca além de uma mídia que
+        ainda não foi baixada; depois das novas tentativas, a marca para antes da primeira
+        falha definitiva, para que ela seja tentada de novo na próxima execução.
+        """
 
-                    # filtros por caption
-                    if not caption_filters(msg, filter_caption_includes):
-                        console.log(
-                            f"[red]Caption não contém os filtros {filter_caption_includes}! Mensagem: {msg.id}[/red]"
-                        )
-                        continue
+        if isinstance(path, str):
+            path = Path(path)
 
-                    try:
-                        total_valid_messages += 1
-                        console.log(
-                            f"[blue]Baixando arquivo ({total_valid_messages}/{number_files_local})! Mensagem: {msg.id}, Arquivo: {target_path}[/blue]"
-                        )
-                        if test_mode:
-                            # escreve arquivo dummy em pasta .test_mode para não sujar pasta original
-                            test_dir = Path(path, ".test_mode")
-                            test_dir.mkdir(parents=True, exist_ok=True)
-                            file_test = (
-                                self._build_target_path(test_dir, file_name)
-                                + ".test_mode"
-                            )
-                            Path(file_test).write_text("TEST MODE")
-                            target_path = file_test
-                        else:
+        if path.is_file():
+            path = path.parent
 
-                            async def download():
-                                return await self.client.download_media(
-                                    msg, progress=progress, file_name=target_path
-                                )
+        total_links = sum(len(ids) for ids in groups.values())
 
-                            await handle_floodwait(download)
+        allocator = PathAllocator(path.absolute())
+        scheduler = scheduler or TransferScheduler()
 
-                        valid_messages.append(msg.id)
-                        console.log(
-                            f"[green]Arquivo baixado ({total_valid_messages}/{number_files_local})! Mensagem: {msg.id}, Arquivo: {target_path}[/green]"
-                        )
+        self.stats = JobStats()
+        async with self.session(), open_writer(
+            path.absolute(), write_buffer, fsync, archive
+        ) as writer, self.autotune(scheduler.tuner):
+            log.info(
+                f"Baixando arquivos! Mensagens: {total_links}, Chats: {len(groups)}, Pasta: {path}, Tipo de nome: {name}, Tipo de mídia: {media_type}, Filtros caption: {filter_caption_includes}"
+            )
 
-                    except Exception as e:
-                        console.log(
-                            f"[red]Erro ao baixar arquivo ({total_valid_messages}/{number_files_local})! Erro {e}[/red]"
-                        )
+            total_accepted = 0
+            total_downloaded = 0
+            select = self._select_media(
+                media_type, filter_caption_includes, media_filter
+            )
+            retries: RetryQueue[tuple[int | str, MediaRecord]] = RetryQueue()
+            # maior id lido e menor id ainda não baixado de cada chat
+            last_seen: dict[int | str, int] = {}
+            missing: dict[int | str, int] = {}
 
-                # pós-processamento: checar se precisa re-ler
-                total_valid_messages = len(valid_messages)
+            def mark(chat_id: int | str) -> None:
+                if on_mark and chat_id in last_seen:
+                    if chat_id in missing:
+                        on_mark(min(last_seen[chat_id], missing[chat_id] - 1))
+                    else:
+                        on_mark(last_seen[chat_id])
 
-                if (
-                    verify_messages
-                    and not topic
-                    and total_valid_messages > 0
-                    and total_valid_messages < number_files_local
-                ):
-                    console.log(
-                        "[blue]Verificando mensagens novamente por conteúdos ausentes...[/blue]"
-                    )
-                    difference = number_files_local - total_valid_messages
-                    last_id = valid_messages[-1] if valid_messages else message_ids[-1]
-                    new_message_ids = list(range(last_id + 1, last_id + 1 + difference))
-                    await read(new_message_ids, number_files_local=difference)
-
-                if topic and total_valid_messages < number_files_local:
-                    difference = number_files_local - total_valid_messages
-                    last_valid_msg_id = (
-                        valid_messages[-1] if valid_messages else message_ids[-1]
-                    )
-                    last_msg_id_topic = topic.top_message
-                    range_msgs_id_topic = list(
-                        range(last_valid_msg_id + 1, last_msg_id_topic)
+            for chat_id, message_ids in groups.items():
+                async for messages in self.iter_messages(chat_id, message_ids):
+                    last_id = max((msg.id for msg in messages), default=None)
+                    accepted = [
+                        record
+                        for msg in messages
+                        if (
+                            not msg_thread_id
+                            or msg.message_thread_id == msg_thread_id
+                        )
+                        and (record := select(msg))
+                    ]
+                    # o lote continua referenciado pelo iter_messages até o próximo
+                    messages.clear()
+                    downloaded = await self._download_batch(
+                        accepted,
+                        name=name,
+                        test_mode=test_mode,
+                        writer=writer,
+                        allocator=allocator,
+                        scheduler=scheduler,
+                        total=total_links,
+                        start=total_accepted,
+                        chat_id=chat_id,
+                        retries=retries,
                     )
-                    total_range_msgs_id_topic = len(range_msgs_id_topic)
+                    total_accepted += len(accepted)
+                    total_downloaded += len(downloaded)
+                    if pending := {record.id for record in accepted} - set(downloaded):
+                        first = min(pending)
+                        missing[chat_id] = min(missing.get(chat_id, first), first)
+                    if last_id is not None:
+                        last_seen[chat_id] = last_id
+                    mark(chat_id)
 
-                    console.log(
-                        "[yellow]Verificando mensagens novamente por conteúdos ausentes (tópico)...[/yellow]"
-                    )
-                    console.log(
-                        f"[yellow]Será usado um deslocamento de {total_range_msgs_id_topic} ids no tópico a partir da mensagem: {last_valid_msg_id}[/yellow]"
+            total_downloaded += await self._retry_downloads(
+                retries, name, test_mode, writer, allocator, scheduler
+            )
+            # só as falhas definitivas seguram a marca depois das novas tentativas
+            missing.clear()
+            for failure in retries.failures:
+                chat_id, msg_id = failure.key
+                missing[chat_id] = min(missing.get(chat_id, msg_id), msg_id)
+            for chat_id in last_seen:
+                mark(chat_id)
+                if on_mark and chat_id in missing:
+                    log.warning(
+                        "Progresso mantido antes da mensagem %s, que falhou! Chat: %s",
+                        missing[chat_id],
+                        chat_id,
                     )
-                    if total_range_msgs_id_topic > self.LIMIT_GET_MESSAGES:
-                        range_msgs_id_topic = range_msgs_id_topic[
-                            0 : self.LIMIT_GET_MESSAGES
-                        ]
+            log.summary(
+                f"Tarefa concluída! Arquivos baixados: {total_downloaded}/{total_links}"
+            )
+            self._report_filter(media_filter)
+            self._report_failures(retries)
 
-                    await read(
-                        range_msgs_id_topic, number_files_local=difference, topic=topic
-                    )
+    async def mirror_download(
+        self,
+        chat_id: int | str,
+        path: str | Path,
+        name: Literal["file_name", "caption"],
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        last_id: int | None,
+        on_mark: Callable[[int], None],
+        window: float,
+        test_mode: bool,
+        fsync: FsyncPolicy = "none",
+        write_buffer: int = DEFAULT_BUFFER_SIZE,
+        scheduler: TransferScheduler | None = None,
+        archive: ArchiveSpec | None = None,
+        media_filter: MediaFilter | None = None,
+    ) -> None:
+        """
+        Baixa as mídias novas do chat conforme são postadas, até ser interrompido.
+        Com `last_id`, começa recuperando o que foi postado depois dele.
+        """
 
-            range_init = list(range(start_msg_id, start_msg_id + number_files))
-            if not msg_thread_id:
-                await read(range_init, number_files_local=number_files)
-            else:
-                topics = await self.client.get_forum_topics_by_id(
-                    chat_id, topic_ids=msg_thread_id
-                )
-                if not topics:
-                    raise TGToolsError(f"Tópico inexistente! ID: {msg_thread_id}")
-                topic = topics[0] if isinstance(topics, list) else topics
+        await self.verify_chat_id(chat_id)
+
+        if isinstance(path, str):
+            path = Path(path)
+
+        allocator = PathAllocator(path.absolute())
+        scheduler = scheduler or TransferScheduler()
+        total_downloaded = 0
+        select = self._select_media(media_type, filter_caption_includes, media_filter)
+
+        # o espelhamento não tem fim: as falhas são tentadas de novo ao fim de cada lote
+        retries: RetryQueue[tuple[int | str, MediaRecord]] = RetryQueue()
 
-                last_msg_id_topic = topic.top_message
-                console.log(
-                    f"[blue]Tópico indentificado: {topic.title}, Mensagem inicial: {start_msg_id}, Última mensagem: {last_msg_id_topic}[/blue]"
+        async def handle_batch(messages: list[Message]) -> None:
+            nonlocal total_downloaded
+            accepted = [record for msg in messages if (record := select(msg))]
+            downloaded = await self._download_batch(
+                accepted,
+                name=name,
+                test_mode=test_mode,
+                writer=writer,
+                allocator=allocator,
+                scheduler=scheduler,
+                total=len(accepted),
+                chat_id=chat_id,
+                retries=retries,
+            )
+            total_downloaded += len(downloaded) + await self._retry_downloads(
+                retries, name, test_mode, writer, allocator, scheduler
+            )
+
+        self.stats = JobStats()
+        async with open_writer(
+            path.absolute(), write_buffer, fsync, archive
+        ) as writer, self.autotune(scheduler.tuner):
+            log.info(
+                f"Espelhando chat! Chat: {chat_id}, Pasta: {path}, Tipo de nome: {name}, Tipo de mídia: {media_type}, Filtros caption: {filter_caption_includes}"
+            )
+            try:
+                await self.mirror_messages(
+                    chat_id, handle_batch, last_id, on_mark, window
+                )
+            finally:
+                log.summary(
+                    f"Espelhamento encerrado! Arquivos baixados: {total_downloaded}"
                 )
-                await read(range_init, number_files_local=number_files, topic=topic)
+                self._report_filter(media_filter)
+                self._report_failures(retries)
+
+    async def _download_thumbnail(self, media) -> bytes | None:
+        """Baixa em memória a thumbnail original da mídia, quando existir."""
+        thumbs = getattr(media, "thumbs", None)
+        if not thumbs:
+            return None
+        try:
+            thumb = await self.client.download_media(thumbs[0].file_id, in_memory=True)
+            return cast(BytesIO, thumb).getvalue() if thumb else None
+        except Exception:
+            return None
+
+    async def _stream_to_buffer(self, msg: Message, buffer: BinaryIO) -> int:
+        """Baixa a mídia da mensagem em blocos direto para `buffer` e retorna o total de bytes."""
+        buffer.seek(0)
+        buffer.truncate()
+        total = 0
+        media = getattr(msg, cast(str, self._media_kind(msg, self.SENDABLE_MEDIA)))
+        async with aclosing(self.media.stream(media.file_id)) as chunks:
+            async for chunk in chunks:
+                await self.bandwidth.consume_down(len(chunk))
+                buffer.write(chunk)
+                total += len(chunk)
+        buffer.seek(0)
+        return total
+
+    async def relay_media(
+        self,
+        link: str,
+        number_files: int,
+        to_chat_id: int | str,
+        media_type: str,
+        filter_caption_includes: list[str] | None,
+        buffer_size: int,
+        pipeline: int,
+        test_mode: bool,
+        media_filter: MediaFilter | None = None,
+    ) -> None:
+        """
+        Retransmite as mídias do link informado para o chat id informado sem gravar em disco.
+
+        Cada arquivo é baixado em blocos para um buffer em memória (que só transborda para um
+        arquivo temporário acima de `buffer_size` bytes) enquanto o arquivo anterior é enviado.
+        Até `pipeline` arquivos ficam prontos na fila aguardando envio.
+        """
+
+        chat_id, msg_thread_id, start_msg_id = get_link_info(link)
+
+        await self.verify_chat_id(chat_id)
+        await self.verify_chat_id(to_chat_id)
+
+        async with self.session():
+            log.info(
+                f"Retransmitindo arquivos! Chat: {chat_id}, Chat de destino: {to_chat_id}, Quantidade: {number_files}, Tipo de mídia: {media_type}, Buffer: {format_size(buffer_size)}, Pipeline: {pipeline}"
+            )
+
+            queue: asyncio.Queue[tuple[Message, BinaryIO | None] | None] = (
+                asyncio.Queue(maxsize=pipeline)
+            )
+            message_ids = list(range(start_msg_id, start_msg_id + number_files))
+
+            async def producer() -> None:
+                try:
+                    async for messages in self.iter_messages(chat_id, message_ids):
+                        for msg in messages:
+                            if msg_thread_id and msg.message_thread_id != msg_thread_id:
+                                continue
+
+                            if not self._accept_message(
+                                msg, media_type, filter_caption_includes, media_filter
+                            ):
+                                continue
+
+                            if not self._media_kind(msg, self.SENDABLE_MEDIA):
+                                continue
+
+                            if test_mode:
+                                await queue.put((msg, None))
+                                continue
+
+                            buffer = SpooledTemporaryFile(max_size=buffer_size)
+                            try:
+                                log.debug("Baixando para o buffer! Mensagem: %s", msg.id)
+                                await handle_floodwait(
+                                    self._stream_to_buffer, msg, buffer
+                                )
+                            except Exception as e:
+                                buffer.close()
+                                log.error(
+                                    f"Erro ao baixar arquivo! Mensagem: {msg.id}, Erro {e}"
+                                )
+                                continue
+
+                            await queue.put((msg, cast(BinaryIO, buffer)))
+                finally:
+                    await queue.put(None)
+
+            async def consumer() -> int:
+                total_sent = 0
+                while (item := await queue.get()) is not None:
+                    msg, buffer = item
+                    kind = cast(str, self._media_kind(msg, self.SENDABLE_MEDIA))
+                    media = getattr(msg, kind)
+                    file_name, mime_type = self._get_media_info(msg)
+                    file_name = file_name or (
+                        f"{msg.id}{guess_extension_from_name_or_mime('', mime_type)}"
+                    )
+
+                    extra: dict = {"caption_entities": msg.caption_entities}
+                    if kind in ("video", "audio", "animation", "document"):
+                        extra["file_name"] = file_name
+                    if kind in ("video", "animation"):
+                        extra["width"] = media.width or 0
+                        extra["height"] = media.height or 0
+                    if kind in ("video", "audio", "voice", "animation"):
+                        extra["duration"] = media.duration or 0
+                    if kind == "audio":
+                        extra["performer"] = media.performer
+                        extra["title"] = media.title
+
+                    try:
+                        if buffer is not None:
+                            thumbnail = await self._download_thumbnail(media)
+                            await handle_floodwait(
+                                lambda: self._send_file(
+                                    to_chat_id,
+                                    media_type=kind,
+                                    file=buffer,
+                                    caption=msg.caption or "",
+                                    thumbnail=thumbnail,
+                                    progress=self._upload_progress,
+                                    **extra,
+                                )
+                            )
+                        total_sent += 1
+                        log.info(
+                            "Arquivo retransmitido (%s)! Mensagem: %s, Arquivo: %s",
+                            total_sent,
+                            msg.id,
+                            file_name,
+                            msg_id=msg.id,
+                        )
+                    except Exception as e:
+                        log.error(
+                            f"Erro ao enviar arquivo! Mensagem: {msg.id}, Erro {e}"
+                        )
+                    finally:
+                        if buffer is not None:
+                            buffer.close()
+                return total_sent
+
+            _, total_sent = await asyncio.gather(producer(), consumer())
+
+            log.summary(f"Tarefa concluída! Arquivos retransmitidos: {total_sent}")
+            self._report_filter(media_filter)
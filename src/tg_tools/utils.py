@@ -1,23 +1,45 @@
 import asyncio
 import base64
+import json
 import re
+import sys
+from contextvars import ContextVar
 from io import BytesIO
 from mimetypes import guess_extension
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Sequence
 
 import pathvalidate
 from hydrogram.errors.exceptions import FloodWait
 from hydrogram.types import Message
 from PIL import Image
 
-from tg_tools.config import console
-from tg_tools.exceptions import TGToolsError
+from tg_tools.exceptions import FloodWaitLimitError, TGToolsError
+from tg_tools.logs import log
 
 THUMBNAIL_MAX_SIZE = 200 * 1024
 THUMBNAIL_MAX_WIDTH = 320
 THUMBNAIL_MAX_HEIGHT = 320
 THUMBNAIL_FORMAT = "JPEG"
+THUMBNAIL_MIN_QUALITY = 10
+THUMBNAIL_MAX_QUALITY = 95
+THUMBNAIL_FILE_NAME = "thumbnail.jpg"
+THUMBNAIL_SOURCE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+# Limites do Telegram para envio como foto
+PHOTO_MAX_SIZE = 10 * 1024 * 1024
+PHOTO_MAX_DIMENSIONS_SUM = 10000
+PHOTO_MAX_RATIO = 20
+
+# Padrões de links compilados uma única vez (usados em massa no modo --links-file)
+REGEX_CANAL = re.compile(r"^https?:\/\/t.me(?:\/c)?\/(\w+)\/(\d+)\/?$")
+REGEX_FORUM_TOPIC = re.compile(r"^https?:\/\/t.me(?:\/c)?\/(\w+)\/(\d+)\/(\d+)\/?$")
+REGEX_BOT = re.compile(r"^tg:\/\/openmessage\?user_id=(\w+)&message_id=(\d+)$")
+
+# chamado com a espera de cada FloodWait da tarefa atual (sinal de sobrecarga do AutoTuner)
+floodwait_listener: ContextVar[Callable[[float], None] | None] = ContextVar(
+    "floodwait_listener", default=None
+)
 
 
 def format_size(size_in_bytes: int) -> str:
@@ -37,48 +59,135 @@ def format_size(size_in_bytes: int) -> str:
     return f"{size:.2f} {units[unit_index]}"
 
 
-def file_thumbnail_to_base64(file_path: str | Path) -> str:
+def normalize_thumbnail(file_path: str | Path) -> bytes:
+    """
+    Ajusta a imagem às regras de thumbnail do Telegram: redimensiona para caber em
+    THUMBNAIL_MAX_WIDTH x THUMBNAIL_MAX_HEIGHT, converte para JPEG e busca a maior
+    qualidade que fique abaixo de THUMBNAIL_MAX_SIZE.
+    """
     try:
         with Image.open(file_path) as img:
-
-            # Verifica o tamanho da imagem
-            size = Path(file_path).stat().st_size
-            if size > THUMBNAIL_MAX_SIZE:
-                raise TGToolsError(
-                    f"Tamanho inválido! Tamanho: {format_size(size)} (máximo: {format_size(THUMBNAIL_MAX_SIZE)}), Arquivo: {file_path}"
-                )
-
-            # Verifica as dimensões da imagem
-            width, height = img.size
-            if width > THUMBNAIL_MAX_WIDTH or height > THUMBNAIL_MAX_HEIGHT:
+            img.load()
+
+            # Remove transparência sobre fundo branco e converte para RGB
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            # Redimensiona mantendo a proporção
+            img.thumbnail((THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT))
+
+            # Busca binária pela maior qualidade dentro do limite de tamanho
+            best = None
+            low, high = THUMBNAIL_MIN_QUALITY, THUMBNAIL_MAX_QUALITY
+            while low <= high:
+                quality = (low + high) // 2
+                buffer = BytesIO()
+                img.save(buffer, format=THUMBNAIL_FORMAT, quality=quality, optimize=True)
+                if buffer.tell() <= THUMBNAIL_MAX_SIZE:
+                    best = buffer.getvalue()
+                    low = quality + 1
+                else:
+                    high = quality - 1
+
+            if best is None:
                 raise TGToolsError(
-                    f"Dimensões inválidas! Dimensões: {width}x{height} (máximo: {THUMBNAIL_MAX_WIDTH}x{THUMBNAIL_MAX_HEIGHT}), Arquivo: {file_path}"
+                    f"Não foi possível comprimir abaixo de {format_size(THUMBNAIL_MAX_SIZE)}, Arquivo: {file_path}"
                 )
-
-            # Verifica o formato da imagem
-            if img.format != THUMBNAIL_FORMAT:
-                raise TGToolsError(
-                    f"Formato inválido! Formato: {img.format} (esperado: {THUMBNAIL_FORMAT}), Arquivo: {file_path}"
-                )
-
-            with open(file_path, "rb") as f:
-                return base64.b64encode(f.read()).decode("utf-8")
+            return best
 
     except FileNotFoundError:
         raise TGToolsError(f"Arquivo de thumbnail não encontrado: {file_path}")
 
+    except TGToolsError:
+        raise
+
     except Exception as e:
         raise TGToolsError(f"Erro ao ler thumbnail! Erro: {e}, Arquivo: {file_path}")
 
 
-def file_thumbnail_base64_to_bytes(string: str) -> bytes:
-    return base64.b64decode(string)
+def save_thumbnail(file_path: str | Path, target: Path) -> Path:
+    """Normaliza a imagem e grava o resultado uma única vez em `target`."""
+    target.write_bytes(normalize_thumbnail(file_path))
+    return target
 
 
-def thumbnail_base64_show(base64_string: str) -> None:
+def load_thumbnail(value: str) -> bytes:
+    """
+    Lê a thumbnail configurada. Aceita o caminho do arquivo gravado por `save_thumbnail`
+    ou o formato antigo em base64.
+    """
+    path = Path(value)
     try:
-        img_bytes = BytesIO(base64.b64decode(base64_string))
-        img = Image.open(img_bytes)
+        if path.is_file():
+            return path.read_bytes()
+    except OSError:
+        pass
+    try:
+        return base64.b64decode(value, validate=True)
+    except Exception:
+        raise TGToolsError(f"Thumbnail configurada não encontrada: {value}")
+
+
+def generate_file_thumbnail(file: Path) -> bytes | None:
+    """
+    Gera a thumbnail de um arquivo a partir dele mesmo (imagens) ou de uma imagem com o mesmo
+    nome ao lado dele (ex.: video.mp4 -> video.jpg). Retorna None se não houver imagem utilizável.
+    """
+    if file.suffix.lower() in THUMBNAIL_SOURCE_SUFFIXES:
+        candidates = [file]
+    else:
+        candidates = [file.with_suffix(suffix) for suffix in THUMBNAIL_SOURCE_SUFFIXES]
+
+    for candidate in candidates:
+        if not candidate.is_file():
+            continue
+        try:
+            return normalize_thumbnail(candidate)
+        except TGToolsError:
+            continue
+    return None
+
+
+def recompress_photo(file_path: str | Path) -> bytes | None:
+    """
+    Recomprime a foto quando ela excede os limites do Telegram (tamanho ou soma das dimensões).
+    Retorna None quando a foto já pode ser enviada como está.
+    """
+    size = Path(file_path).stat().st_size
+    with Image.open(file_path) as img:
+        width, height = img.size
+        if size <= PHOTO_MAX_SIZE and width + height <= PHOTO_MAX_DIMENSIONS_SUM:
+            return None
+
+        if max(width, height) / max(min(width, height), 1) > PHOTO_MAX_RATIO:
+            raise TGToolsError(
+                f"Proporção da foto acima do limite ({width}x{height}), Arquivo: {file_path}"
+            )
+
+        img = img.convert("RGB")
+        if width + height > PHOTO_MAX_DIMENSIONS_SUM:
+            scale = PHOTO_MAX_DIMENSIONS_SUM / (width + height)
+            img = img.resize((int(width * scale), int(height * scale)))
+
+        for quality in (90, 80, 70, 60, 50):
+            buffer = BytesIO()
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= PHOTO_MAX_SIZE:
+                return buffer.getvalue()
+
+    raise TGToolsError(
+        f"Não foi possível comprimir a foto abaixo de {format_size(PHOTO_MAX_SIZE)}, Arquivo: {file_path}"
+    )
+
+
+def thumbnail_show(value: str) -> None:
+    try:
+        img = Image.open(BytesIO(load_thumbnail(value)))
         img.show()
     except Exception as e:
         raise TGToolsError(f"Erro ao exibir thumbnail: {e}")
@@ -107,29 +216,23 @@ def get_link_info(link: str) -> tuple[str | int, int | None, int]:
     Retorna o chat_id, msg_thread_id e msg_id a partir de um link.
     """
 
-    regex_canal = r"^https?:\/\/t.me(?:\/c)?\/(\w+)\/(\d+)\/?$"
-    search_canal = re.search(regex_canal, link)
-    regex_forum_topitc = r"^https?:\/\/t.me(?:\/c)?\/(\w+)\/(\d+)\/(\d+)\/?$"
-    search_forum_topitc = re.search(regex_forum_topitc, link)
-    regex_bot = r"^tg:\/\/openmessage\?user_id=(\w+)&message_id=(\d+)$"
-    search_bot = re.search(regex_bot, link)
-
+    link = link.strip()
     msg_thread_id = None
 
-    if search_canal:
+    if search_canal := REGEX_CANAL.match(link):
         chat_id = search_canal.group(1)
         if chat_id.isnumeric():
             chat_id = int("-100" + chat_id)
         msg_id = int(search_canal.group(2))
 
-    elif search_forum_topitc:
+    elif search_forum_topitc := REGEX_FORUM_TOPIC.match(link):
         chat_id = search_forum_topitc.group(1)
         if chat_id.isnumeric():
             chat_id = int("-100" + chat_id)
         msg_thread_id = int(search_forum_topitc.group(2))
         msg_id = int(search_forum_topitc.group(3))
 
-    elif search_bot:
+    elif search_bot := REGEX_BOT.match(link):
         chat_id = search_bot.group(1)
         msg_id = int(search_bot.group(2))
 
@@ -139,17 +242,70 @@ def get_link_info(link: str) -> tuple[str | int, int | None, int]:
     return chat_id, msg_thread_id, msg_id
 
 
+def read_links(source: str | Path) -> list[str]:
+    """
+    Lê os links de um arquivo (um por linha) ou da entrada padrão quando `source` for "-".
+    Linhas vazias e comentários (#) são ignorados.
+    """
+    try:
+        if str(source) == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            lines = Path(source).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        raise TGToolsError(f"Arquivo de links não encontrado: {source}")
+
+    return [
+        line.strip()
+        for line in lines
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+def group_links_by_chat(links: list[str]) -> dict[str | int, list[int]]:
+    """
+    Agrupa os links por chat, mantendo a ordem de chegada e removendo ids repetidos.
+    Links inválidos são registrados e ignorados.
+    """
+    groups: dict[str | int, list[int]] = {}
+    seen: set[tuple[str | int, int]] = set()
+
+    for link in links:
+        try:
+            chat_id, _, msg_id = get_link_info(link)
+        except TGToolsError as e:
+            log.error(e.message)
+            continue
+
+        if (chat_id, msg_id) in seen:
+            continue
+        seen.add((chat_id, msg_id))
+        groups.setdefault(chat_id, []).append(msg_id)
+
+    return groups
+
+
+def chunked(items: Sequence, size: int) -> list[Sequence]:
+    """Divide `items` em blocos de no máximo `size` elementos."""
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def mark_key(*parts) -> str:
+    """Monta uma chave estável para o progresso salvo de uma tarefa (origem, destino, filtros...)."""
+    return json.dumps(parts, ensure_ascii=False, default=str)
+
+
 def delete_file(file: Path | str) -> None:
     if isinstance(file, str):
         file = Path(file)
     if not file.is_file():
-        console.log(f"[red]Arquivo {file} não é um arquivo!![/red]")
+        log.error(f"Arquivo {file} não é um arquivo!!")
         return
     try:
         file.unlink()
-        console.log(f"[green]Arquivo deletado! Arquivo: {file}[/green]")
+        log.info(f"Arquivo deletado! Arquivo: {file}")
     except Exception as e:  # pragma: no cover - IO errors
-        console.log(f"[red]Erro ao deletar arquivo! Erro {e}[/red]")
+        log.error(f"Erro ao deletar arquivo! Erro {e}")
 
 
 def guess_extension_from_name_or_mime(file_name: str, mime_type: str | None) -> str:
@@ -166,6 +322,15 @@ def sanitize_filename(candidate: str) -> str:
     return pathvalidate.sanitize_filename(candidate, max_len=200)
 
 
+async def wait_floodwait(error: FloodWait) -> None:
+    """Aguarda o tempo do FloodWait e avisa o `floodwait_listener` da tarefa atual."""
+    wait = getattr(error, "value", None) or getattr(error, "seconds", None) or 1
+    if listener := floodwait_listener.get():
+        listener(float(wait))  # type: ignore
+    log.warning(f"FloodWait! Aguardando {wait} segundo(s)...")
+    await asyncio.sleep(wait)  # type: ignore
+
+
 async def handle_floodwait(func: Callable, *args, limit: int = 3, **kwargs):
     """Tenta executar `func(*args, **kwargs)` e trata FloodWait esperando o tempo indicado."""
     for _ in range(limit):
@@ -176,14 +341,12 @@ async def handle_floodwait(func: Callable, *args, limit: int = 3, **kwargs):
                 return await result
             return result
         except FloodWait as e:
-            wait = getattr(e, "value", None) or getattr(e, "seconds", None) or 1
-            console.log(f"[yellow]FloodWait! Aguardando {wait} segundo(s)...[/yellow]")
-            await asyncio.sleep(wait)
+            await wait_floodwait(e)
         except Exception:
             # re-raise outras exceções para o chamador tratar
             raise
 
-    raise TGToolsError("Limite de FloodWait atingido!")
+    raise FloodWaitLimitError("Limite de FloodWait atingido!")
 
 
 def caption_filters(msg: Message, filters: list[str] | None) -> bool:
@@ -196,3 +359,15 @@ def caption_filters(msg: Message, filters: list[str] | None) -> bool:
         if f.lower() in lower_caption:
             return True
     return False
+
+
+def group_albums(messages: list[Message]) -> list[list[Message]]:
+    """Agrupa as mensagens consecutivas de um mesmo álbum (media_group_id); as demais ficam sozinhas."""
+    units: list[list[Message]] = []
+    for msg in messages:
+        group_id = getattr(msg, "media_group_id", None)
+        if group_id and units and getattr(units[-1][0], "media_group_id", None) == group_id:
+            units[-1].append(msg)
+        else:
+            units.append([msg])
+    return units
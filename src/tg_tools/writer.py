@@ -0,0 +1,399 @@
+import asyncio
+import json
+import os
+import shutil
+import struct
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Callable, Literal
+
+FsyncPolicy = Literal["none", "file", "job"]
+ArchiveFormat = Literal["tar", "zip"]
+
+FSYNC_POLICIES = ("none", "file", "job")
+ARCHIVE_FORMATS: tuple[ArchiveFormat, ...] = ("tar", "zip")
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+DEFAULT_ARCHIVE_SIZE = 1024 * 1024 * 1024
+TEMP_SUFFIX = ".part"
+
+
+# -----------------------------
+# Escrita em disco fora do event loop
+# -----------------------------
+class FileWriter:
+    """
+    Camada de escrita assíncrona para os downloads.
+
+    Escritas, criação de pastas e renomeações rodam em um pool de threads dedicado, para que um
+    disco lento (NFS, NAS) não trave as outras transferências do event loop. Os blocos recebidos
+    são agrupados em buffers grandes antes de ir para o disco.
+
+    Com `check_existing=False` o nome final é usado sem verificar o disco, para quando os
+    caminhos já foram reservados por um PathAllocator.
+
+    Política de fsync:
+        - "none": deixa a cargo do sistema operacional;
+        - "file": fsync de cada arquivo antes de renomeá-lo;
+        - "job": fsync de todos os arquivos gravados ao final da tarefa.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        fsync: FsyncPolicy = "none",
+        check_existing: bool = True,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Política de fsync inválida: {fsync}")
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.check_existing = check_existing
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="writer")
+        self._known_dirs: set[Path] = set()
+        self._written: list[Path] = []
+        self._rename_lock = threading.Lock()
+
+    async def run(self, func: Callable, *args):
+        """Executa `func(*args)` no pool de escrita."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def mkdir(self, directory: Path) -> None:
+        """Cria a pasta (e as pais) uma única vez por tarefa."""
+        if directory in self._known_dirs:
+            return
+        await self.run(lambda: directory.mkdir(parents=True, exist_ok=True))
+        self._known_dirs.add(directory)
+
+    async def write_bytes(
+        self, target: Path, data: bytes, msg_id: int | None = None
+    ) -> Path:
+        """Grava um arquivo pequeno por completo."""
+        handle = self.open(target, msg_id)
+        await handle.write(data)
+        return await handle.commit()
+
+    def open(self, target: Path, msg_id: int | None = None) -> "WriteHandle":
+        """
+        Abre um arquivo para escrita em `target` (gravado em um .part até o commit).
+        `msg_id` identifica a mensagem de origem no índice do ArchiveWriter.
+        """
+        return WriteHandle(self, target)
+
+    def _finalize(self, temp: Path, target: Path) -> Path:
+        # não sobrescreve arquivos existentes: usa nome(1).ext, nome(2).ext...
+        # (dispensado quando os nomes já vêm únicos de um PathAllocator)
+        with self._rename_lock:
+            final = target
+            counter = 1
+            while self.check_existing and final.exists():
+                final = target.with_name(f"{target.stem}({counter}){target.suffix}")
+                counter += 1
+            os.replace(temp, final)
+        if self.fsync == "job":
+            self._written.append(final)
+        return final
+
+    @staticmethod
+    def _fsync_path(path: Path) -> None:
+        try:
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+        except OSError:
+            pass
+
+    async def close(self) -> None:
+        """Aplica o fsync de fim de tarefa (se configurado) e encerra o pool."""
+        try:
+            if self._written:
+                await asyncio.gather(
+                    *(self.run(self._fsync_path, path) for path in self._written)
+                )
+                self._written.clear()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> "FileWriter":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+
+class WriteHandle:
+    """
+    Arquivo em escrita. Os blocos são acumulados até `buffer_size` e gravados no pool enquanto
+    os próximos blocos continuam chegando (no máximo uma gravação em andamento por arquivo).
+    """
+
+    def __init__(self, writer: FileWriter, target: Path) -> None:
+        self.writer = writer
+        self.target = target
+        self.temp = target.with_name(target.name + TEMP_SUFFIX)
+        self.size = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._pending: asyncio.Future | None = None
+
+    def _write_sync(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.temp, "wb")
+        self._file.write(data)
+
+    def _close_sync(self, fsync: bool) -> None:
+        if self._file is None:
+            self._file = open(self.temp, "wb")
+        if fsync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def _abort_sync(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self.temp.unlink(missing_ok=True)
+
+    async def _wait_pending(self) -> None:
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            await pending
+
+    async def write(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        self.size += len(chunk)
+        if len(self._buffer) >= self.writer.buffer_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        await self._wait_pending()
+        if not self._buffer:
+            return
+        await self.writer.mkdir(self.target.parent)
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        loop = asyncio.get_running_loop()
+        self._pending = loop.run_in_executor(
+            self.writer.executor, self._write_sync, data
+        )
+
+    async def commit(self) -> Path:
+        """Grava o restante do buffer, fecha o arquivo e o move para o nome final."""
+        await self.writer.mkdir(self.target.parent)
+        await self._flush()
+        await self._wait_pending()
+        await self.writer.run(self._close_sync, self.writer.fsync == "file")
+        return await self.writer.run(self.writer._finalize, self.temp, self.target)
+
+    async def abort(self) -> None:
+        """Descarta o arquivo parcial."""
+        try:
+            await self._wait_pending()
+        except Exception:
+            pass
+        await self.writer.run(self._abort_sync)
+
+
+# -----------------------------
+# Escrita em pacotes (tar/zip) com rotação
+# -----------------------------
+@dataclass
+class ArchiveSpec:
+    """Destino dos downloads em pacotes: `<prefixo>-0001.tar`, `<prefixo>-0002.tar`..."""
+
+    prefix: str
+    format: ArchiveFormat = "tar"
+    max_size: int = DEFAULT_ARCHIVE_SIZE
+
+
+class ArchiveWriter(FileWriter):
+    """
+    Grava os downloads como membros de pacotes tar ou zip (sem compressão), em vez de um
+    arquivo por mensagem. Quando o pacote atual passaria de `max_size`, um novo é aberto.
+
+    Cada arquivo baixado fica em um buffer (em memória até `buffer_size`, depois em um arquivo
+    temporário) e só entra no pacote no commit, já com o tamanho final. O índice
+    `<prefixo>.index.jsonl` registra, por mensagem, o pacote, o membro, o deslocamento dos
+    dados e o tamanho, para ler um arquivo depois sem percorrer o pacote.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        spec: ArchiveSpec,
+        workers: int = 4,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        fsync: FsyncPolicy = "none",
+    ) -> None:
+        super().__init__(workers, buffer_size, fsync, check_existing=False)
+        if spec.format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de pacote inválido: {spec.format}")
+        self.directory = directory
+        self.spec = spec
+        self.index_path = Path(directory, f"{spec.prefix}.index.jsonl")
+        self.volumes: list[Path] = []
+        self._volume: tarfile.TarFile | zipfile.ZipFile | None = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    def open(self, target: Path, msg_id: int | None = None) -> "ArchiveHandle":  # type: ignore
+        return ArchiveHandle(self, target, msg_id)
+
+    def _next_volume(self) -> Path:
+        # continua a numeração de execuções anteriores sem sobrescrever pacotes
+        number = len(self.volumes) + 1
+        while True:
+            path = Path(
+                self.directory, f"{self.spec.prefix}-{number:04d}.{self.spec.format}"
+            )
+            if not path.exists():
+                return path
+            number += 1
+
+    def _volume_file(self) -> BinaryIO:
+        if isinstance(self._volume, tarfile.TarFile):
+            return self._volume.fileobj  # type: ignore
+        return self._volume.fp  # type: ignore
+
+    def _volume_size(self) -> int:
+        if isinstance(self._volume, tarfile.TarFile):
+            return self._volume.offset
+        if isinstance(self._volume, zipfile.ZipFile):
+            return self._volume.fp.tell()  # type: ignore
+        return 0
+
+    def _open_volume(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._next_volume()
+        if self.spec.format == "zip":
+            self._volume = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+        else:
+            self._volume = tarfile.open(path, "w")
+        self.volumes.append(path)
+        if self._index is None:
+            self._index = open(self.index_path, "a", encoding="utf-8")
+
+    def _close_volume(self) -> None:
+        if self._volume is None:
+            return
+        self._volume.close()
+        self._volume = None
+        if self.fsync != "none":
+            self._fsync_path(self.volumes[-1])
+
+    def _add(self, name: str, size: int, data: BinaryIO) -> int:
+        """Adiciona o membro ao pacote atual e retorna o deslocamento dos dados."""
+        if isinstance(self._volume, zipfile.ZipFile):
+            info = zipfile.ZipInfo(name)
+            info.compress_type = zipfile.ZIP_STORED
+            with self._volume.open(info, "w", force_zip64=size > zipfile.ZIP64_LIMIT) as dest:
+                shutil.copyfileobj(data, dest, self.buffer_size)
+            # os dados começam depois do cabeçalho local (30 bytes + nome + extra)
+            fp = self._volume.fp
+            position = fp.tell()  # type: ignore
+            fp.seek(info.header_offset + 26)  # type: ignore
+            name_size, extra_size = struct.unpack("<HH", fp.read(4))  # type: ignore
+            fp.seek(position)  # type: ignore
+            return info.header_offset + 30 + name_size + extra_size
+
+        volume = self._volume
+        assert isinstance(volume, tarfile.TarFile)
+        info = tarfile.TarInfo(name)
+        info.size = size
+        volume.addfile(info, data)
+        # os dados terminam no fim do último bloco de 512 bytes gravado
+        blocks, remainder = divmod(size, tarfile.BLOCKSIZE)
+        return volume.offset - (blocks + bool(remainder)) * tarfile.BLOCKSIZE
+
+    def _append(self, handle: "ArchiveHandle") -> Path:
+        with self._lock:
+            if self._volume is not None and self._volume_size() and (
+                self._volume_size() + handle.size > self.spec.max_size
+            ):
+                self._close_volume()
+            if self._volume is None:
+                self._open_volume()
+
+            try:
+                name = handle.target.relative_to(self.directory).as_posix()
+            except ValueError:
+                name = handle.target.name
+            handle.buffer.seek(0)
+            offset = self._add(name, handle.size, handle.buffer)
+            if self.fsync == "file":
+                file = self._volume_file()
+                file.flush()
+                os.fsync(file.fileno())
+
+            volume = self.volumes[-1]
+            entry = {
+                "msg_id": handle.msg_id,
+                "archive": volume.name,
+                "member": name,
+                "offset": offset,
+                "size": handle.size,
+            }
+            self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")  # type: ignore
+            self._index.flush()  # type: ignore
+            return Path(volume, name)
+
+    def _close_sync(self) -> None:
+        with self._lock:
+            self._close_volume()
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+    async def close(self) -> None:
+        """Fecha o pacote atual e o índice e encerra o pool."""
+        try:
+            await self.run(self._close_sync)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+class ArchiveHandle:
+    """Arquivo em escrita para um ArchiveWriter: acumulado em buffer até o commit."""
+
+    def __init__(self, writer: ArchiveWriter, target: Path, msg_id: int | None) -> None:
+        self.writer = writer
+        self.target = target
+        self.msg_id = msg_id
+        self.size = 0
+        self.buffer = SpooledTemporaryFile(max_size=writer.buffer_size)
+
+    async def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        # acima de buffer_size o buffer já está em disco: grava fora do event loop
+        if self.size > self.writer.buffer_size:
+            await self.writer.run(self.buffer.write, chunk)
+        else:
+            self.buffer.write(chunk)
+
+    async def commit(self) -> Path:
+        """Adiciona o arquivo ao pacote atual (ou a um novo, se ele estiver cheio)."""
+        try:
+            return await self.writer.run(self.writer._append, self)
+        finally:
+            self.buffer.close()
+
+    async def abort(self) -> None:
+        """Descarta o arquivo parcial."""
+        self.buffer.close()
+
+
+def open_writer(
+    directory: Path,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    fsync: FsyncPolicy = "none",
+    archive: ArchiveSpec | None = None,
+) -> FileWriter:
+    """Escritor dos downloads: arquivos avulsos na pasta ou, com `archive`, pacotes."""
+    if archive:
+        return ArchiveWriter(directory, archive, buffer_size=buffer_size, fsync=fsync)
+    return FileWriter(buffer_size=buffer_size, fsync=fsync, check_existing=False)
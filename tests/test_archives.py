@@ -0,0 +1,114 @@
+import asyncio
+import io
+import sys
+import tarfile
+import zipfile
+
+from tg_tools.archives import archive_files, is_archive, iter_archive, member_matches
+from tg_tools.user_bot import Userbot
+
+MEMBERS = {
+    "fotos/a.jpg": b"a" * 10,
+    "fotos/b.png": b"b" * 20,
+    "leia-me.txt": b"texto",
+}
+
+
+def make_tar(path) -> None:
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def make_zip() -> bytes:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as archive:
+        for name, content in MEMBERS.items():
+            archive.writestr(name, content)
+    return data.getvalue()
+
+
+def read_all(source, formats, buffer_size=4):
+    result = []
+    for name, size, buffer in iter_archive(source, formats, buffer_size):
+        result.append((name, size, buffer.name, buffer.read()))
+        buffer.close()
+    return result
+
+
+def test_detects_archives_and_filters_by_member_name():
+    assert is_archive("lote.tar.gz") and is_archive("LOTE.ZIP") and is_archive("-")
+    assert not is_archive("pasta") and not is_archive("video.mp4")
+    assert member_matches("fotos/a.jpg", ["jpg", "png"])
+    assert member_matches("leia-me.txt", ["*"])
+    assert not member_matches("leia-me.txt", ["jpg"])
+
+
+def test_reads_tar_and_zip_members_without_extracting(tmp_path):
+    tar_path = tmp_path / "lote.tar.gz"
+    make_tar(tar_path)
+    zip_path = tmp_path / "lote.zip"
+    zip_path.write_bytes(make_zip())
+
+    expected = [
+        ("fotos/a.jpg", 10, "a.jpg", b"a" * 10),
+        ("fotos/b.png", 20, "b.png", b"b" * 20),
+    ]
+    assert read_all(tar_path, ["jpg", "png"]) == expected
+    assert read_all(zip_path, ["jpg", "png"]) == expected
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["lote.tar.gz", "lote.zip"]
+
+
+class Unseekable(io.RawIOBase):
+    def __init__(self, data: bytes) -> None:
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self.data.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_reads_zip_from_stdin(monkeypatch):
+    stdin = io.TextIOWrapper(io.BufferedReader(Unseekable(make_zip())))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    assert [item[0] for item in read_all("-", ["txt"])] == ["leia-me.txt"]
+
+
+class FakeClient:
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def get_chat(self, chat_id):
+        return chat_id
+
+
+def test_archive_members_are_sent_and_their_buffers_closed(tmp_path):
+    tar_path = tmp_path / "lote.tar.gz"
+    make_tar(tar_path)
+    streams = []
+
+    async def run():
+        userbot = Userbot("")
+        userbot.client = FakeClient()  # type: ignore
+
+        async def files():
+            async for prepared in archive_files(tar_path, ["*"], 1024):
+                streams.append(prepared.stream)
+                yield prepared
+
+        return await userbot._upload_files(
+            1, "document", files(), "?", None, delete=False, album=False, test_mode=True
+        )
+
+    sent = asyncio.run(run())
+    assert sorted(path.as_posix() for path in sent) == sorted(MEMBERS)
+    assert all(stream.closed for stream in streams)
@@ -0,0 +1,68 @@
+import asyncio
+
+from hydrogram.errors import FloodWait
+
+from tg_tools.autotune import AutoTuner
+from tg_tools.planning import JobStats
+from tg_tools.utils import floodwait_listener, handle_floodwait
+
+
+async def ignore(limit: int) -> None:
+    pass
+
+
+def test_aimd_grows_additively_and_halves_on_floodwait():
+    tuner = AutoTuner(ignore, minimum=1, maximum=4, start=2)
+    limits = []
+    for rate, floodwaits in [(100, 0), (110, 0), (120, 0), (120, 0), (120, 2), (0, 0)]:
+        tuner.limit, _ = tuner.decide(rate, floodwaits)
+        limits.append(tuner.limit)
+    # cresce de 1 em 1 até o máximo, cai pela metade com FloodWait e fica parado sem tráfego
+    assert limits == [3, 4, 4, 4, 2, 2]
+
+
+def test_aimd_undoes_an_increase_that_lowered_throughput():
+    tuner = AutoTuner(ignore, minimum=1, maximum=8, start=3)
+    tuner.limit, _ = tuner.decide(100, 0)
+    assert tuner.limit == 4
+    tuner.limit, reason = tuner.decide(60, 0)
+    assert (tuner.limit, reason) == (3, "vazão caiu após o aumento")
+    # sem aumento no último intervalo, a queda não é atribuída ao limite
+    tuner.limit, _ = tuner.decide(30, 0)
+    assert tuner.limit == 4
+
+
+def test_tuner_applies_decisions_and_counts_handled_floodwaits(monkeypatch):
+    sleep = asyncio.sleep
+    # o FloodWait não precisa ser aguardado de verdade
+    monkeypatch.setattr(
+        "tg_tools.utils.asyncio.sleep",
+        lambda seconds: sleep(0 if seconds == 3 else seconds),
+    )
+    applied: list[int] = []
+
+    async def apply(limit: int) -> None:
+        applied.append(limit)
+
+    async def run():
+        stats = JobStats()
+        tuner = AutoTuner(apply, minimum=1, maximum=8, start=4, interval=0.01)
+        token = floodwait_listener.set(tuner.floodwait)
+        calls = iter([FloodWait(value=3), "ok"])  # type: ignore
+
+        def flaky():
+            result = next(calls)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        task = asyncio.create_task(tuner.run(stats))
+        await asyncio.sleep(0)
+        assert await handle_floodwait(flaky) == "ok"
+        stats.bytes += 1024
+        await asyncio.sleep(0.05)
+        task.cancel()
+        floodwait_listener.reset(token)
+
+    asyncio.run(run())
+    assert applied == [4, 2]
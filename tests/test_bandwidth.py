@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from tg_tools.bandwidth import (
+    BandwidthLimiter,
+    TokenBucket,
+    parse_rate,
+    parse_schedule,
+    rate_at,
+)
+from tg_tools.exceptions import TGToolsError
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("0", 0),
+        ("off", 0),
+        ("500KB", 500 * 1024),
+        ("2MB", 2 * 1024**2),
+        ("1.5M/s", int(1.5 * 1024**2)),
+        ("1024", 1024),
+    ],
+)
+def test_parse_rate(value, expected):
+    """
+    Testa se as taxas são convertidas corretamente para bytes por segundo.
+    """
+    assert parse_rate(value) == expected
+
+
+def test_parse_rate_invalid():
+    """
+    Testa se uma taxa inválida dispara um erro (TGToolsError).
+    """
+    with pytest.raises(TGToolsError):
+        parse_rate("rapido")
+
+
+def test_schedule_rate_at():
+    """
+    Testa se a taxa vigente respeita as janelas de horário, inclusive após a meia-noite.
+    """
+    schedule = parse_schedule("08:00-18:00=1MB, 22:00-06:00=5MB, *=0")
+    assert rate_at(schedule, datetime(2025, 1, 1, 9, 30)) == 1024**2
+    assert rate_at(schedule, datetime(2025, 1, 1, 23, 0)) == 5 * 1024**2
+    assert rate_at(schedule, datetime(2025, 1, 1, 3, 0)) == 5 * 1024**2
+    assert rate_at(schedule, datetime(2025, 1, 1, 19, 0)) == 0
+
+
+def test_token_bucket_limits_rate():
+    """
+    Testa se o balde de tokens segura as transferências acima da taxa configurada.
+    """
+    bucket = TokenBucket(rate=1024 * 1024, burst=64 * 1024)
+
+    async def run() -> float:
+        start = time.monotonic()
+        await bucket.consume(64 * 1024)  # rajada inicial, sem espera
+        await bucket.consume(512 * 1024)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.45
+
+
+def test_limiter_reads_live_config():
+    """
+    Testa se o limitador aplica as alterações de configuração feitas durante a tarefa.
+    """
+    config = {"limit-down": "1MB"}
+    limiter = BandwidthLimiter(config.get)
+    limiter.refresh()
+    assert limiter.down.rate == 1024**2
+    assert limiter.up.rate == 0
+
+    config["limit-down"] = "0"
+    limiter.refresh()
+    assert limiter.down.rate == 0
@@ -0,0 +1,253 @@
+import asyncio
+import time
+
+from hydrogram.errors import ChannelInvalid
+from hydrogram.storage import SQLiteStorage
+
+from tg_tools.base_tg import BaseTG, collect_burst
+from tg_tools.db import DBManager
+from tg_tools.planning import JobStats
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.starts = 0
+        self.stops = 0
+
+    async def start(self) -> None:
+        await asyncio.sleep(0)
+        self.starts += 1
+
+    async def stop(self) -> None:
+        self.stops += 1
+
+
+def test_session_is_shared_between_nested_and_concurrent_users():
+    client = FakeClient()
+    base = BaseTG(client)  # type: ignore
+
+    async def job():
+        async with base.session():
+            async with base.session():
+                await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(job(), job(), job())
+
+    asyncio.run(run())
+    assert (client.starts, client.stops) == (1, 1)
+
+
+def test_stats_are_isolated_per_task():
+    base = BaseTG(FakeClient())  # type: ignore
+
+    async def job(amount: int) -> int:
+        base.stats = JobStats()
+        await asyncio.sleep(0)
+        base.stats.bytes += amount
+        await asyncio.sleep(0)
+        return base.stats.bytes
+
+    async def run():
+        return await asyncio.gather(job(1), job(2))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+class FakeMessage:
+    def __init__(self, msg_id: int, empty: bool = False) -> None:
+        self.id = msg_id
+        self.empty = empty
+
+
+class FakeChatClient(FakeClient):
+    def __init__(self, existing: set[int]) -> None:
+        super().__init__()
+        self.existing = existing
+        self.handlers = []
+
+    async def get_messages(self, chat_id, message_ids):
+        return [FakeMessage(i, empty=i not in self.existing) for i in message_ids]
+
+    def add_handler(self, handler) -> None:
+        self.handlers.append(handler)
+
+    def remove_handler(self, handler) -> None:
+        self.handlers.remove(handler)
+
+
+def test_collect_burst_groups_messages_within_window():
+    async def run():
+        queue = asyncio.Queue()
+        for msg_id in (1, 2, 3):
+            queue.put_nowait(msg_id)
+        first = await collect_burst(queue, window=0.01, limit=2)
+        second = await collect_burst(queue, window=0.01, limit=2)
+        return first, second
+
+    assert asyncio.run(run()) == ([1, 2], [3])
+
+
+def test_latest_message_id_probes_until_an_empty_batch():
+    client = FakeChatClient({1, 5, 250, 399})
+    base = BaseTG(client)  # type: ignore
+    assert asyncio.run(base.latest_message_id(1, after=4)) == 399
+    assert asyncio.run(base.latest_message_id(1, after=399)) == 399
+
+
+def test_latest_message_id_probes_past_gaps_of_deleted_messages():
+    # mais de um lote inteiro apagado entre 10 e 1500
+    client = FakeChatClient({10, 1500, 1501})
+    base = BaseTG(client)  # type: ignore
+    assert asyncio.run(base.latest_message_id(1, after=5)) == 1501
+
+
+def test_mirror_catches_up_then_processes_new_messages():
+    client = FakeChatClient({3, 4, 6})
+    base = BaseTG(client)  # type: ignore
+    batches: list[list[int]] = []
+    marks: list[int] = []
+
+    async def handle_batch(messages):
+        batches.append([msg.id for msg in messages])
+
+    async def run():
+        task = asyncio.create_task(
+            base.mirror_messages(1, handle_batch, 2, marks.append, window=0.01)
+        )
+        while not marks:
+            await asyncio.sleep(0.01)
+        handler = client.handlers[0]
+        # repetidas e antigas são descartadas
+        for msg_id in (8, 7, 6, 8):
+            await handler.original_callback(client, FakeMessage(msg_id))
+        while len(batches) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert batches == [[3, 4, 6], [7, 8]]
+    assert marks == [6, 8]
+    assert client.handlers == []
+    assert (client.starts, client.stops) == (1, 1)
+
+
+def scan(existing: set[int], target: int, lookahead: bool):
+    base = BaseTG(FakeChatClient(existing))  # type: ignore
+    seen: list[int] = []
+
+    async def process(messages, remaining):
+        accepted = 0
+        for msg in messages:
+            if accepted == remaining:
+                return accepted, seen[-1]
+            if not msg.empty:
+                seen.append(msg.id)
+                accepted += 1
+        return accepted, None
+
+    async def run():
+        return await base.scan_messages(
+            1, start_id=1, target=target, process=process, lookahead=lookahead
+        )
+
+    return asyncio.run(run()), seen
+
+
+def test_scan_without_lookahead_reads_only_the_range():
+    progress, seen = scan({1, 50, 300}, target=3, lookahead=False)
+    assert seen == [1]
+    assert (progress.accepted, progress.scanned, progress.windows) == (1, 3, 1)
+
+
+def test_scan_with_lookahead_fills_the_target_in_fixed_windows():
+    progress, seen = scan({1, 50, 300, 310}, target=3, lookahead=True)
+    assert seen == [1, 50, 300]
+    assert (progress.accepted, progress.windows) == (3, 2)
+
+
+def test_scan_stops_at_the_end_of_the_chat():
+    progress, seen = scan({1, 50, 300, 310}, target=10, lookahead=True)
+    assert seen == [1, 50, 300, 310]
+    assert (progress.accepted, progress.scanned, progress.windows) == (4, 600, 3)
+
+
+def test_scan_without_lookahead_reads_large_ranges_in_bounded_windows():
+    base = BaseTG(FakeChatClient({1, 250, 450, 900}))  # type: ignore
+    windows: list[list[int]] = []
+
+    async def process(ids, remaining):
+        windows.append(ids)
+        return len(ids[:remaining]), None
+
+    async def run():
+        return await base.scan_messages(
+            1,
+            start_id=1,
+            target=500,
+            process=process,
+            # só os ids sobrevivem à janela, as mensagens são descartadas na leitura
+            select=lambda msg: None if msg.empty else msg.id,
+        )
+
+    progress = asyncio.run(run())
+    assert windows == [[1], [250], [450]]
+    assert (progress.scanned, progress.windows) == (500, 3)
+
+
+class FakeStorageClient(FakeClient):
+    """Cliente com a mesma storage em memória usada pelas sessions strings."""
+
+    def __init__(self, stale: set[int] | None = None) -> None:
+        super().__init__()
+        self.storage = SQLiteStorage("teste", use_memory=True)
+        self.stale = stale or set()
+
+    async def start(self) -> None:
+        await super().start()
+        await self.storage.open()
+        await self.storage.user_id(42)
+
+    async def stop(self) -> None:
+        await super().stop()
+        await self.storage.close()
+
+    async def get_chat(self, chat_id):
+        try:
+            peer = await self.storage.get_peer_by_id(chat_id)
+        except KeyError:
+            # resolvido pela API e guardado na sessão
+            await self.storage.update_peers([(chat_id, 2, "channel", None, None)])
+            return chat_id
+        if peer.access_hash in self.stale:  # type: ignore
+            raise ChannelInvalid()
+        return chat_id
+
+
+def test_peers_persist_between_sessions_and_stale_ones_are_forgotten(tmp_path):
+    db = DBManager(str(tmp_path / "db.json"))
+    now = int(time.time())
+    db.set_peers(
+        "42",
+        [
+            [-100111, 1, "channel", None, None, now],
+            [-100222, 3, "channel", "antigo", None, now - 100],
+        ],
+    )
+
+    async def run():
+        base = BaseTG(FakeStorageClient(stale={1}))  # type: ignore
+        base.peer_cache = db
+        await base.verify_chat_id(-100111)
+        await base.verify_chat_id(-100333)
+
+    asyncio.run(run())
+    peers = sorted(db.get_peers("42"), reverse=True)
+    assert [peer[:5] for peer in peers] == [
+        [-100111, 2, "channel", None, None],
+        [-100222, 3, "channel", "antigo", None],
+        [-100333, 2, "channel", None, None],
+    ]
+    # o peer só carregado mantém o horário original: o prazo do username não recomeça
+    assert peers[1][5] == now - 100
@@ -0,0 +1,208 @@
+import asyncio
+from types import SimpleNamespace
+
+from tg_tools.bot import Bot
+
+
+class FakeMessage:
+    def __init__(self, msg_id: int, text: str | None) -> None:
+        self.id = msg_id
+        self.empty = text is None
+        self.text = text
+        self.entities = None
+        self.caption = None
+        self.message_thread_id = None
+        for kind in Bot.COPY_ORDER:
+            if kind != "text":
+                setattr(self, kind, None)
+
+
+class FakeClient:
+    def __init__(self, texts: dict[int, str]) -> None:
+        self.texts = texts
+        self.requested: list[int] = []
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def get_chat(self, chat_id):
+        return chat_id
+
+    async def get_messages(self, chat_id, message_ids):
+        self.requested.extend(message_ids)
+        return [FakeMessage(i, self.texts.get(i)) for i in message_ids]
+
+
+def make_bot(texts: dict[int, str]) -> Bot:
+    bot = Bot("1", api_hash="hash", bot_token="1:token")
+    bot.client = FakeClient(texts)  # type: ignore
+    return bot
+
+
+def test_copy_sync_resumes_from_mark_up_to_latest_message():
+    marks: list[int] = []
+
+    async def run():
+        bot = make_bot({10: "a", 11: "b", 12: "c", 14: "d"})
+        await bot.copy_sync(
+            "https://t.me/c/1000/10",
+            to_chat_id=-100222,
+            delay=0,
+            media_type="all",
+            filter_caption_includes=None,
+            last_id=11,
+            on_mark=marks.append,
+            test_mode=True,
+        )
+        return bot.stats, bot.client.requested  # type: ignore
+
+    stats, requested = asyncio.run(run())
+
+    # só a sondagem e o intervalo 12..14 são buscados; mensagens excluídas não contam
+    assert stats.messages == 2
+    assert marks == [14]
+    assert min(requested) == 12
+
+
+def test_copy_batch_sends_each_album_as_one_group():
+    class AlbumClient(FakeClient):
+        def __init__(self) -> None:
+            super().__init__({})
+            self.calls: list[tuple[str, int]] = []
+
+        async def send_media_group(self, chat_id, media, reply_to_message_id):
+            self.calls.append(("group", len(media)))
+            return []
+
+        async def send_message(self, chat_id, text, entities, reply_to_message_id):
+            self.calls.append(("text", reply_to_message_id))
+            return True
+
+    def photo(msg_id: int, group: int | None) -> FakeMessage:
+        msg = FakeMessage(msg_id, None)
+        msg.empty = False
+        msg.photo = SimpleNamespace(file_id=f"f{msg_id}")  # type: ignore
+        msg.media_group_id = group  # type: ignore
+        msg.caption_entities = None  # type: ignore
+        return msg
+
+    async def run():
+        bot = make_bot({})
+        bot.client = AlbumClient()  # type: ignore
+        messages = [photo(1, 7), photo(2, 7), photo(3, 7), FakeMessage(4, "oi")]
+        messages[3].media_group_id = None  # type: ignore
+        messages[3].entities = None  # type: ignore
+        copied = await bot._copy_batch(
+            messages,  # type: ignore
+            to_chat_id=1,
+            delay=0,
+            media_type="all",
+            filter_caption_includes=None,
+            test_mode=False,
+            total=4,
+        )
+        return copied, bot.client.calls  # type: ignore
+
+    copied, calls = asyncio.run(run())
+    assert copied == (4, None)
+    assert calls == [("group", 3), ("text", 4)]
+
+
+def test_album_split_across_windows_is_sent_as_one_group():
+    class AlbumClient(FakeClient):
+        def __init__(self) -> None:
+            super().__init__({})
+            self.calls: list[tuple[str, list[int]]] = []
+
+        async def get_messages(self, chat_id, message_ids):
+            self.requested.extend(message_ids)
+            messages = []
+            for i in message_ids:
+                msg = FakeMessage(i, None)
+                msg.empty = False
+                msg.photo = SimpleNamespace(file_id=f"f{i}")  # type: ignore
+                msg.media_group_id = 7 if i >= 3 else None  # type: ignore
+                msg.caption_entities = None  # type: ignore
+                messages.append(msg)
+            return messages
+
+        async def send_media_group(self, chat_id, media, reply_to_message_id):
+            self.calls.append(("group", [m.media for m in media]))
+            return []
+
+        async def send_photo(self, chat_id, photo, caption, caption_entities, reply_to_message_id):
+            self.calls.append(("photo", [reply_to_message_id]))
+            return True
+
+    async def run(copy):
+        bot = make_bot({})
+        bot.LIMIT_GET_MESSAGES = 4
+        bot.client = AlbumClient()  # type: ignore
+        await copy(bot)
+        return bot.client.calls  # type: ignore
+
+    marks: list[int] = []
+
+    # 1..6 em janelas de 4 ids: o álbum 3..6 começa na primeira e termina na segunda
+    async def links(bot):
+        await bot._copy_groups(
+            {1: list(range(1, 7))},
+            to_chat_id=2,
+            delay=0,
+            media_type="all",
+            filter_caption_includes=None,
+            test_mode=False,
+            on_mark=marks.append,
+        )
+
+    async def scan(bot):
+        await bot.copy_messages(
+            "https://t.me/c/1000/1",
+            number_files=6,
+            to_chat_id=-100222,
+            delay=0,
+            media_type="all",
+            verify_messages=False,
+            filter_caption_includes=None,
+            test_mode=False,
+        )
+
+    expected = [("photo", [1]), ("photo", [2]), ("group", ["f3", "f4", "f5", "f6"])]
+    assert asyncio.run(run(links)) == expected
+    # o progresso não passa do álbum enquanto ele não é enviado
+    assert marks == [2, 6]
+    assert asyncio.run(run(scan)) == expected
+
+
+def test_copy_sync_mark_stops_before_a_failed_copy():
+    class FailingClient(FakeClient):
+        async def send_message(self, chat_id, text, entities, reply_to_message_id):
+            if reply_to_message_id == 12:
+                raise RuntimeError("falhou")
+            return True
+
+    marks: list[int] = []
+
+    async def run():
+        bot = make_bot({10: "a", 11: "b", 12: "c", 13: "d"})
+        bot.client = FailingClient(bot.client.texts)  # type: ignore
+        await bot.copy_sync(
+            "https://t.me/c/1000/10",
+            to_chat_id=-100222,
+            delay=0,
+            media_type="all",
+            filter_caption_includes=None,
+            last_id=None,
+            on_mark=marks.append,
+            test_mode=False,
+        )
+        return bot.stats
+
+    stats = asyncio.run(run())
+
+    # 13 foi copiada, mas a marca fica antes da 12 para que ela seja tentada de novo
+    assert stats.messages == 3
+    assert marks == [11]
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from hydrogram.types.messages_and_media.message import Str
+
+from tg_tools.base_tg import BaseTG
+from tg_tools.catalog import (
+    CATALOG_KINDS,
+    CatalogWriter,
+    JsonlCatalogWriter,
+    ParquetCatalogWriter,
+    message_record,
+)
+
+
+def fake_message(msg_id: int, empty: bool = False, **kinds) -> SimpleNamespace:
+    fields = {kind: None for kind in CATALOG_KINDS}
+    fields.update(kinds)
+    return SimpleNamespace(
+        id=msg_id,
+        empty=empty,
+        message_thread_id=None,
+        date=datetime(2024, 1, 2, 3, 4, 5),
+        media_group_id=None,
+        views=7,
+        caption=None,
+        **fields,
+    )
+
+
+class FakeClient:
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def get_messages(self, chat_id, message_ids):
+        return [
+            fake_message(i, empty=i % 2 == 0, text=f"mensagem {i}") for i in message_ids
+        ]
+
+
+def test_message_record_reads_media_metadata():
+    video = SimpleNamespace(
+        file_name="a.mp4", mime_type="video/mp4", file_size=10, duration=3, width=1, height=2
+    )
+    msg = fake_message(5, video=video)
+    msg.caption = Str("aula 5").init([])
+    record = message_record(msg, chat_id=-100)  # type: ignore
+    assert record["type"] == "video"
+    assert type(record["caption"]) is str and record["caption"] == "aula 5"
+    assert record["chat_id"] == "-100"
+    assert (record["file_name"], record["size"], record["duration"]) == ("a.mp4", 10, 3)
+
+
+def test_catalog_writer_requires_write(tmp_path):
+    with pytest.raises(TypeError):
+        CatalogWriter(tmp_path / "catalogo")  # type: ignore
+
+
+def test_export_catalog_streams_jsonl(tmp_path):
+    output = tmp_path / "catalog.jsonl"
+    base = BaseTG(FakeClient())  # type: ignore
+
+    async def run():
+        with JsonlCatalogWriter(output) as writer:
+            return await base.export_catalog(1, range(1, 451), writer)
+
+    assert asyncio.run(run()) == 225
+    lines = output.read_text(encoding="utf-8").splitlines()
+    first = json.loads(lines[0])
+    assert len(lines) == 225
+    assert first["id"] == 1 and first["type"] == "text"
+    assert first["caption"] == "mensagem 1"
+    assert first["date"] == "2024-01-02T03:04:05"
+
+
+def test_parquet_writer_flushes_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "catalog.parquet"
+    with ParquetCatalogWriter(output, batch_size=2) as writer:
+        for msg_id in range(5):
+            writer.write(message_record(fake_message(msg_id, text="x"), 1))  # type: ignore
+    table = pq.read_table(output)
+    assert table.num_rows == 5
+    assert pq.ParquetFile(output).num_row_groups == 3
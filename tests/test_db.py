@@ -1,9 +1,11 @@
 import tempfile
+import time
 from pathlib import Path
 
 import pytest
+from tinydb import TinyDB
 
-from tg_tools.db import DBManager
+from tg_tools.db import PEERS_FILE, DBManager
 
 
 @pytest.fixture
@@ -50,3 +52,71 @@ def test_clear_configs(temp_db_path):
     db.clear_configs()
     assert db.get_config("a") is None
     assert db.get_config("b") is None
+
+
+def test_record_and_get_throughput(temp_db_path):
+    """
+    Testa se a vazão média considera só as últimas medições de cada tipo.
+    """
+    db = DBManager(temp_db_path)
+    assert db.get_throughput("download") is None
+    db.record_throughput("download", 100, 10, keep=2)
+    db.record_throughput("download", 300, 10, keep=2)
+    db.record_throughput("download", 500, 10, keep=2)
+    db.record_throughput("copy", 5, 1)
+    assert db.get_throughput("download") == 40
+    assert db.get_throughput("copy") == 5
+
+
+def test_set_and_get_mark(temp_db_path):
+    """
+    Testa se o último id processado é salvo e atualizado por chave.
+    """
+    db = DBManager(temp_db_path)
+    assert db.get_mark("a") is None
+    db.set_mark("a", 10)
+    db.set_mark("a", 15)
+    db.set_mark("b", 3)
+    assert db.get_mark("a") == 15
+    assert db.get_mark("b") == 3
+
+
+def test_peers_are_saved_per_account(temp_db_path):
+    """
+    Testa se os peers ficam separados por conta, se podem ser removidos por id ou
+    username e se o username de cada peer expira pelo próprio horário.
+    """
+    db = DBManager(temp_db_path)
+    db.set_peers("1", [[-100123, 99, "channel", "canal", None, 10], [5, 7, "user", None, "55", 10]])
+    db.set_peers("2", [[8, 1, "user", None, None, 10]])
+
+    assert db.remove_peer("1", "canal")
+    assert not db.remove_peer("1", -100123)
+    assert db.get_peers("1") == [[5, 7, "user", None, "55", 10]]
+    assert db.get_peers("2") == [[8, 1, "user", None, None, 10]]
+
+    now = int(time.time())
+    db.set_peers("3", [[-100123, 99, "channel", "canal", None, now - 100], [6, 1, "user", "ana", None, now]])
+    assert db.get_peers("3", username_ttl=50) == [
+        [-100123, 99, "channel", None, None, now - 100],
+        [6, 1, "user", "ana", None, now],
+    ]
+
+
+def test_peers_move_out_of_the_config_file(temp_db_path):
+    """
+    Testa se os peers salvos no config.json por versões anteriores vão para o arquivo
+    próprio, usando o horário do último salvamento como horário de cada peer.
+    """
+    legacy = TinyDB(temp_db_path)
+    legacy.table("config").insert({"key": "api-id", "value": "1"})
+    legacy.table("peers").insert(
+        {"account": "1", "peers": [[5, 7, "user", "ana", None]], "saved_at": 10}
+    )
+    legacy.close()
+
+    db = DBManager(temp_db_path)
+    assert db.get_peers("1") == [[5, 7, "user", "ana", None, 10]]
+    assert "peers" not in db.db.tables()
+    assert db.get_config("api-id") == "1"
+    assert Path(temp_db_path).with_name(PEERS_FILE).is_file()
@@ -0,0 +1,81 @@
+import json
+from io import StringIO
+
+from rich.console import Console
+
+from tg_tools.config import current_console
+from tg_tools.logs import Logger
+
+
+class Counted:
+    """Conta quantas vezes foi formatado."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __str__(self) -> str:
+        self.calls += 1
+        return "valor"
+
+
+def capture(logger: Logger, calls) -> str:
+    output = StringIO()
+    token = current_console.set(Console(file=output))
+    try:
+        calls(logger)
+    finally:
+        current_console.reset(token)
+    return output.getvalue()
+
+
+def test_messages_below_the_level_are_never_formatted():
+    value = Counted()
+    logger = Logger()
+    logger.configure("summary", "plain")
+    text = capture(
+        logger,
+        lambda log: (
+            log.debug("Baixando %s", value),
+            log.info("Baixado %s", value),
+            log.summary("Tarefa concluída! %s", value),
+        ),
+    )
+    assert value.calls == 1
+    lines = text.splitlines()
+    assert len(lines) == 1 and lines[0].endswith("SUMMARY Tarefa concluída! valor")
+    assert not logger.progress
+
+
+def test_json_lines_sink_keeps_the_extra_fields():
+    logger = Logger()
+    logger.configure("info", "json")
+    text = capture(
+        logger,
+        lambda log: (
+            log.info("Arquivo baixado! Mensagem: %s", 7, msg_id=7, file="a [1].mp4"),
+            log.error("Falhou"),
+        ),
+    )
+    entries = [json.loads(line) for line in text.splitlines()]
+    assert [(entry["level"], entry["msg"]) for entry in entries] == [
+        ("info", "Arquivo baixado! Mensagem: 7"),
+        ("error", "Falhou"),
+    ]
+    assert entries[0]["msg_id"] == 7 and entries[0]["file"] == "a [1].mp4"
+    assert "ts" in entries[0]
+    assert not logger.progress
+
+
+def test_auto_format_uses_rich_only_on_terminals():
+    logger = Logger()
+    plain = capture(logger, lambda log: log.warning("FloodWait! [%s]", "x"))
+    assert plain.split(" ", 1)[1] == "WARNING FloodWait! [x]\n"
+
+    output = StringIO()
+    token = current_console.set(Console(file=output, force_terminal=True))
+    try:
+        assert logger.rich
+        logger.info("Arquivo [1].mp4")
+    finally:
+        current_console.reset(token)
+    assert "Arquivo [1].mp4" in output.getvalue()
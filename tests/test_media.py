@@ -0,0 +1,87 @@
+import asyncio
+
+from hydrogram import raw
+
+from tg_tools.media import CHUNK_SIZE, MediaSessionPool
+
+
+class FakeSession:
+    def __init__(self, dc_id: int, data: bytes) -> None:
+        self.dc_id = dc_id
+        self.data = data
+        self.stopped = False
+
+    async def invoke(self, query, sleep_threshold=None):
+        await asyncio.sleep(0)
+        return raw.types.upload.File(
+            type=raw.types.storage.FileUnknown(),
+            mtime=0,
+            bytes=self.data[query.offset : query.offset + query.limit],
+        )
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+
+class FakePool(MediaSessionPool):
+    def __init__(self, connections: int, data: bytes = b"") -> None:
+        super().__init__(None, connections)  # type: ignore
+        self.data = data
+        self.created: list[FakeSession] = []
+
+    async def _create(self, dc_id: int) -> FakeSession:  # type: ignore
+        session = FakeSession(dc_id, self.data)
+        self.created.append(session)
+        return session
+
+
+def test_pool_opens_connections_only_when_all_are_busy():
+    pool = FakePool(connections=2)
+
+    async def run():
+        async with pool.lease(4) as first:
+            async with pool.lease(4) as second:
+                async with pool.lease(4) as third:
+                    assert third in (first, second)
+            assert first is not second
+        # livre de novo, a primeira conexão é reaproveitada
+        async with pool.lease(4) as again:
+            assert again is first
+        async with pool.lease(2):
+            pass
+        await pool.close()
+
+    asyncio.run(run())
+    assert [session.dc_id for session in pool.created] == [4, 4, 2]
+    assert all(session.stopped for session in pool.created)
+
+
+def test_stream_reads_the_file_in_chunks():
+    data = bytes(range(256)) * (CHUNK_SIZE // 128 + 3)
+    pool = FakePool(connections=1, data=data)
+    # file_id de um documento no DC 4
+    file_id = "BQACAgQAAxkBAAIBHWZ0wZ8AAXU5AAHh9ggZwQABlU0Ym0VJAAKxEwACFIWpUxSzKyqMDJReHgQ"
+
+    async def run():
+        return b"".join([chunk async for chunk in pool.stream(file_id)])
+
+    assert asyncio.run(run()) == data
+    assert [session.dc_id for session in pool.created] == [4]
+
+
+def test_reconnect_replaces_sessions_after_they_are_released():
+    pool = FakePool(connections=1)
+
+    async def run():
+        async with pool.lease(4) as busy:
+            await pool.reconnect(4)
+            # a transferência em andamento continua na conexão antiga
+            assert not busy.stopped
+            async with pool.lease(4) as fresh:
+                assert fresh is not busy
+        assert busy.stopped
+        assert not fresh.stopped
+        await pool.close()
+
+    asyncio.run(run())
+    assert len(pool.created) == 2
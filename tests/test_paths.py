@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from tg_tools.paths import MAX_FILE_NAME_LENGTH, PathAllocator, build_file_name
+
+
+def test_allocate_unnamed_uses_message_id(tmp_path):
+    """
+    Testa se mídias sem nome recebem o id da mensagem como nome.
+    """
+    allocator = PathAllocator(tmp_path)
+    assert allocator.allocate(None, ".jpg", 42) == tmp_path / "42.jpg"
+
+
+def test_allocate_existing_and_repeated_names(tmp_path):
+    """
+    Testa se nomes já existentes na pasta ou já reservados recebem o id da mensagem como sufixo.
+    """
+    (tmp_path / "video.mp4").write_text("existente")
+    allocator = PathAllocator(tmp_path)
+    assert allocator.allocate("video", ".mp4", 10) == tmp_path / "video_10.mp4"
+    assert allocator.allocate("video", ".mp4", 10) == tmp_path / "video_10_1.mp4"
+    assert allocator.allocate("VIDEO", ".MP4", 11) == tmp_path / "VIDEO_11.MP4"
+
+
+def test_build_file_name_keeps_extension():
+    """
+    Testa se nomes longos são truncados sem perder a extensão e o sufixo.
+    """
+    name = build_file_name("a" * 500, ".mp4", "_123")
+    assert len(name) == MAX_FILE_NAME_LENGTH
+    assert name.endswith("_123.mp4")
+
+
+def test_allocate_parallel_workers_are_unique(tmp_path):
+    """
+    Testa se reservas simultâneas do mesmo nome nunca devolvem o mesmo caminho.
+    """
+    allocator = PathAllocator(tmp_path)
+    with ThreadPoolExecutor(8) as executor:
+        paths = list(
+            executor.map(lambda i: allocator.allocate("legenda", ".mp4", i % 4), range(64))
+        )
+    assert len(set(paths)) == len(paths)
+
+
+def test_release_frees_name(tmp_path):
+    """
+    Testa se um nome liberado volta a ficar disponível.
+    """
+    allocator = PathAllocator(tmp_path)
+    path = allocator.allocate("foto", ".jpg", 1)
+    allocator.release(path)
+    assert allocator.allocate("foto", ".jpg", 2) == path
@@ -0,0 +1,42 @@
+from tg_tools.planning import JobPlan, format_duration
+
+
+def test_job_plan_summary():
+    """
+    Testa se o plano conta mensagens por tipo, descartes e mantém só os maiores arquivos.
+    """
+    plan = JobPlan("download", top=2)
+    plan.accept(1, "video", 300, "a.mp4")
+    plan.accept(2, "photo", 100, "")
+    plan.accept(3, "video", 500, "b.mp4")
+    plan.reject("caption")
+    plan.reject("caption")
+    plan.reject("sem mídia")
+
+    summary = plan.summary(throughput=100)
+    assert summary["scanned"] == 6
+    assert summary["accepted"] == 3
+    assert summary["total_bytes"] == 900
+    assert summary["by_type"]["video"] == {"messages": 2, "bytes": 800}
+    assert summary["rejected"] == {"caption": 2, "sem mídia": 1}
+    assert summary["hit_rate"] == 0.5
+    assert [item["id"] for item in summary["largest"]] == [3, 1]
+    assert summary["eta_seconds"] == 9
+
+
+def test_job_plan_eta_copy_includes_delay():
+    """
+    Testa se a estimativa de cópia soma o --delay de cada mensagem.
+    """
+    plan = JobPlan("copy")
+    for msg_id in range(10):
+        plan.accept(msg_id, "text", 0, "")
+    assert plan.eta(throughput=2, delay=1) == 15
+    assert plan.eta(throughput=None) is None
+
+
+def test_format_duration():
+    """
+    Testa a formatação da duração estimada.
+    """
+    assert format_duration(3725) == "01:02:05"
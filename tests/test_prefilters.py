@@ -0,0 +1,116 @@
+from argparse import Namespace
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from tg_tools import CLI, build_parser, media_filter, sync_key
+from tg_tools.exceptions import TGToolsError
+from tg_tools.prefilters import MediaFilter, parse_datetime, parse_resolution
+
+
+def video_message(msg_id: int, date: str = "2024-05-10T12:00", **video) -> SimpleNamespace:
+    defaults = dict(
+        file_size=50 * 1024 * 1024,
+        duration=600,
+        width=1280,
+        height=720,
+        mime_type="video/mp4",
+        file_name="aula.mp4",
+    )
+    return SimpleNamespace(
+        id=msg_id,
+        date=datetime.fromisoformat(date),
+        video=SimpleNamespace(**{**defaults, **video}),
+    )
+
+
+def test_each_filter_reports_why_the_media_was_dropped():
+    msg = video_message(1)
+    cases = {
+        "tamanho mínimo": MediaFilter(min_size=100 * 1024 * 1024),
+        "tamanho máximo": MediaFilter(max_size=10 * 1024 * 1024),
+        "data inicial": MediaFilter(since=datetime(2024, 6, 1)),
+        "data final": MediaFilter(until=datetime(2024, 5, 1)),
+        "duração mínima": MediaFilter(min_duration=900),
+        "duração máxima": MediaFilter(max_duration=60),
+        "resolução mínima": MediaFilter(min_resolution=(1920, 1080)),
+        "resolução máxima": MediaFilter(max_resolution=(640, 480)),
+        "MIME": MediaFilter(mime_globs=["image/*"]),
+        "nome do arquivo": MediaFilter(name_globs=["*.mkv"]),
+    }
+    for reason, filters in cases.items():
+        assert filters.reason(msg, "video") == reason  # type: ignore
+
+    accepted = MediaFilter(
+        min_size=1,
+        since=datetime(2024, 5, 10),
+        until=parse_datetime("2024-05-10", end=True),
+        max_duration=600,
+        min_resolution=(1280, 720),
+        mime_globs=["VIDEO/*"],
+        name_globs=["*.MP4", "*.mkv"],
+    )
+    assert accepted.reason(msg, "video") is None  # type: ignore
+
+
+def test_media_without_the_filtered_metadata_is_dropped():
+    photo = SimpleNamespace(
+        id=1,
+        date=datetime(2024, 5, 10),
+        photo=SimpleNamespace(file_size=1024, width=800, height=600),
+    )
+    assert MediaFilter(min_duration=1).reason(photo, "photo") == "duração"  # type: ignore
+    assert MediaFilter(name_globs=["*.jpg"]).reason(photo, "photo") == "nome do arquivo"  # type: ignore
+    # fotos são gravadas como JPEG, mesmo sem o MIME na mensagem
+    assert MediaFilter(mime_globs=["image/jpeg"]).reason(photo, "photo") is None  # type: ignore
+
+
+def test_accept_counts_drops_per_filter():
+    filters = MediaFilter(max_size=60 * 1024 * 1024, name_globs=["*.mp4"])
+    messages = [
+        video_message(1),
+        video_message(2, file_size=80 * 1024 * 1024),
+        video_message(3, file_size=90 * 1024 * 1024),
+        video_message(4, file_name="aula.mkv"),
+    ]
+    accepted = [msg.id for msg in messages if filters.accept(msg, "video")]  # type: ignore
+    assert accepted == [1]
+    assert filters.dropped == {"tamanho máximo": 2, "nome do arquivo": 1}
+
+
+def test_parse_helpers():
+    assert parse_datetime("2024-05-10") == datetime(2024, 5, 10)
+    assert parse_datetime("2024-05-10", end=True) == datetime(2024, 5, 10, 23, 59, 59, 999999)
+    assert parse_datetime("2024-05-10T08:30", end=True) == datetime(2024, 5, 10, 8, 30)
+    assert parse_resolution("1920X1080") == (1920, 1080)
+    with pytest.raises(TGToolsError):
+        parse_datetime("10/05/2024")
+    with pytest.raises(TGToolsError):
+        parse_resolution("hd")
+
+
+def test_cli_builds_the_filter_only_when_options_are_used(tmp_path):
+    parser = build_parser(CLI)  # type: ignore
+    base = ["download-media", "https://t.me/c/123/10", "5", str(tmp_path)]
+
+    plain = parser.parse_args(base)
+    assert media_filter(plain) is None
+    assert media_filter(Namespace()) is None
+
+    args = parser.parse_args(
+        base + ["--max-size", "1.5", "--since", "2024-05-10", "--mime-glob", "video/*"]
+    )
+    filters = media_filter(args)
+    assert filters == MediaFilter(
+        max_size=int(1.5 * 1024 * 1024),
+        since=datetime(2024, 5, 10),
+        mime_globs=["video/*"],
+    )
+
+    # o progresso salvo do --sync só muda quando há filtros
+    assert sync_key(plain, "destino") != sync_key(args, "destino")
+    assert '"2024-05-10 00:00:00"' in sync_key(args, "destino")
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(base + ["--min-resolution", "hd"])
@@ -0,0 +1,58 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from tg_tools.preparation import PreparedFile, prepare_file, prepare_files
+
+
+def create_image(path, width=100, height=100):
+    Image.new("RGB", (width, height), color="red").save(path, format="JPEG")
+    return path
+
+
+def test_prepare_file_photo_within_limits(tmp_path):
+    """
+    Testa se uma foto dentro dos limites não é recomprimida.
+    """
+    photo = create_image(tmp_path / "foto.jpg")
+    prepared = prepare_file(photo, media_type="photo", thumbnail_per_file=False)
+    assert prepared.error is None
+    assert prepared.photo is None
+    assert prepared.size == photo.stat().st_size
+
+
+def test_prepare_file_photo_over_dimensions(tmp_path):
+    """
+    Testa se uma foto com a soma das dimensões acima do limite é recomprimida.
+    """
+    photo = create_image(tmp_path / "grande.jpg", width=9000, height=2000)
+    prepared = prepare_file(photo, media_type="photo", thumbnail_per_file=False)
+    assert prepared.photo is not None
+
+
+def test_prepare_file_error(tmp_path):
+    """
+    Testa se o erro da preparação é devolvido no resultado em vez de ser lançado.
+    """
+    prepared = prepare_file(tmp_path / "nada.jpg", "photo", thumbnail_per_file=False)
+    assert prepared.error
+
+
+def test_prepare_files_keeps_order(tmp_path):
+    """
+    Testa se os arquivos preparados chegam na ordem original.
+    """
+    files = [create_image(tmp_path / f"{i}.jpg") for i in range(5)]
+
+    async def collect() -> list[PreparedFile]:
+        with ThreadPoolExecutor(2) as executor:
+            return [
+                prepared
+                async for prepared in prepare_files(
+                    files, "photo", False, ahead=2, executor=executor
+                )
+            ]
+
+    result = asyncio.run(collect())
+    assert [prepared.file for prepared in result] == files
@@ -0,0 +1,51 @@
+import asyncio
+
+from rich.console import Console
+
+from tg_tools.profiling import Profiler, coroutine_stack
+from tg_tools.utils import chunked
+
+
+async def inner() -> None:
+    await asyncio.sleep(0.05)
+
+
+async def outer() -> None:
+    await inner()
+
+
+def test_coroutine_stack_follows_awaits():
+    async def run():
+        task = asyncio.create_task(outer())
+        await asyncio.sleep(0.01)
+        stack = coroutine_stack(task.get_coro())
+        await task
+        return stack
+
+    names = [name for name, _, _ in asyncio.run(run())]
+    assert names[0].startswith("outer (test_profiling.py:")
+    assert names[1].startswith("inner (test_profiling.py:")
+
+
+def test_profiler_writes_folded_stacks_and_summary(tmp_path):
+    async def run():
+        profiler = Profiler(tmp_path / "perfil", interval=0.002)
+        profiler.start()
+        await outer()
+        list(chunked(list(range(1000)), 10))
+        profiler.stop()
+        return profiler
+
+    profiler = asyncio.run(run())
+    folded, stats_file = profiler.write()
+
+    assert stats_file.exists()
+    lines = folded.read_text().splitlines()
+    assert any("outer (" in line and ";inner (" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    wall = profiler.wall_times()
+    assert any(name.startswith("inner (") and seconds > 0 for name, seconds in wall.items())
+
+    console = Console(record=True, width=200)
+    console.print(profiler.summary())
+    assert "chunked (utils.py:" in console.export_text()
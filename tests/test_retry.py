@@ -0,0 +1,54 @@
+import asyncio
+
+from hydrogram.errors import FileReferenceExpired
+
+from tg_tools.exceptions import FloodWaitLimitError, TGToolsError
+from tg_tools.retry import RetryPolicy, RetryQueue, retry_policy
+
+
+def test_retry_policy_by_error_class():
+    assert retry_policy(FileReferenceExpired()).action == "refresh"  # type: ignore
+    assert retry_policy(ConnectionResetError()).action == "reconnect"  # type: ignore
+    assert retry_policy(asyncio.TimeoutError()).action == "reconnect"  # type: ignore
+    assert retry_policy(FloodWaitLimitError("limite")).action == "backoff"  # type: ignore
+    assert retry_policy(TGToolsError("permanente")) is None
+    assert retry_policy(ValueError()) is None
+
+
+def test_backoff_grows_exponentially_up_to_the_limit(monkeypatch):
+    monkeypatch.setattr("tg_tools.retry.random.uniform", lambda low, high: high)
+    policy = RetryPolicy("backoff", base_delay=1.0, max_delay=5.0)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_retry_queue_requeues_until_attempts_run_out(monkeypatch):
+    monkeypatch.setattr("tg_tools.retry.random.uniform", lambda low, high: 0)
+    retries: RetryQueue[str] = RetryQueue()
+
+    async def run():
+        assert retries.fail("a", 1, "Mensagem: 1", ConnectionResetError()).action == "reconnect"  # type: ignore
+        assert retries.fail("b", 2, "Mensagem: 2", TGToolsError("Arquivo inválido")) is None
+        drained = [entry.item for entry in await retries.drain()]
+        # falhas seguidas do mesmo item até esgotar as tentativas da política
+        for _ in range(RetryPolicy("reconnect").attempts - 1):
+            retries.fail("a", 1, "Mensagem: 1", ConnectionResetError())
+        return drained, await retries.drain()
+
+    drained, remaining = asyncio.run(run())
+    assert drained == ["a"]
+    assert [entry.item for entry in remaining] == ["a"] * 3
+    assert [(f.description, f.error, f.attempts) for f in retries.failures] == [
+        ("Mensagem: 2", "Arquivo inválido", 1),
+        ("Mensagem: 1", "ConnectionResetError()", 5),
+    ]
+    assert retries.report() is not None
+
+
+def test_give_up_records_a_permanent_failure_without_an_item():
+    retries: RetryQueue[str] = RetryQueue()
+    assert retries.fail("a", 1, "Mensagem: 1", ConnectionResetError()) is not None
+    retries.give_up(1, "Mensagem: 1", TGToolsError("Mensagem não encontrada"))
+    assert retries.pending[0].item == "a"
+    assert [(f.description, f.error, f.attempts) for f in retries.failures] == [
+        ("Mensagem: 1", "Mensagem não encontrada", 2)
+    ]
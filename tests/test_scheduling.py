@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from tg_tools import CLI, build_parser
+from tg_tools.scheduling import TransferScheduler, schedule
+
+SIZES = [5, 100, 1, 200, 7]
+
+
+def test_schedule_policies():
+    size = int
+    assert schedule(SIZES, size, "order") == SIZES
+    assert schedule(SIZES, size, "small-first") == [1, 5, 7, 100, 200]
+    assert schedule(SIZES, size, "large-first") == [200, 100, 7, 5, 1]
+    assert schedule(SIZES, size, "lanes", small_size=50) == [5, 100, 1, 200, 7]
+    assert schedule([1, 2, 3, 100], size, "lanes", small_size=50) == [1, 100, 2, 3]
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        TransferScheduler(policy="random")  # type: ignore
+
+
+def run_transfers(scheduler: TransferScheduler, sizes: list[int]) -> list[set[int]]:
+    """Executa as transferências e registra quais estavam ativas ao mesmo tempo."""
+    active: set[int] = set()
+    snapshots: list[set[int]] = []
+
+    async def transfer(index: int, size: int) -> None:
+        async with scheduler.slot(size):
+            active.add(index)
+            snapshots.append(set(active))
+            await asyncio.sleep(0.01)
+            active.discard(index)
+
+    async def run():
+        await asyncio.gather(*(transfer(i, size) for i, size in enumerate(sizes)))
+
+    asyncio.run(run())
+    return snapshots
+
+
+def test_small_slots_keep_large_files_from_taking_every_worker():
+    scheduler = TransferScheduler(workers=2, small_slots=1, small_size=50)
+    snapshots = run_transfers(scheduler, [100, 200, 1])
+    # os dois grandes nunca rodam juntos, mas o pequeno passa na frente do segundo grande
+    assert all(not {0, 1} <= snapshot for snapshot in snapshots)
+    assert {0, 2} in snapshots
+    assert max(len(snapshot) for snapshot in snapshots) == 2
+
+
+def test_small_slots_leave_one_worker_for_large_files():
+    scheduler = TransferScheduler(workers=1, small_slots=5)
+    assert scheduler.small_slots == 0
+    assert len(run_transfers(scheduler, [10**9, 10**9])) == 2
+
+
+def test_resize_changes_the_slots_while_running():
+    scheduler = TransferScheduler(workers=1, small_slots=1)
+    active: list[int] = []
+
+    async def transfer() -> None:
+        async with scheduler.slot(1):
+            active.append(scheduler._active)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        tasks = [asyncio.create_task(transfer()) for _ in range(3)]
+        await asyncio.sleep(0)
+        await scheduler.resize(3)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    # a primeira começou sozinha; as outras duas entraram juntas depois do aumento
+    assert active == [1, 2, 3]
+    assert scheduler.small_slots == 1
+
+
+def test_cli_rejects_invalid_worker_counts(tmp_path):
+    parser = build_parser(CLI)  # type: ignore
+    base = ["download-media", "https://t.me/c/123/10", "5", str(tmp_path)]
+
+    assert parser.parse_args(base + ["--workers", "3"]).workers == 3
+    for option in (["--workers", "0"], ["--workers", "x"]):
+        with pytest.raises(SystemExit):
+            parser.parse_args(base + option)
+
+
+def test_cli_accepts_zero_small_slots(tmp_path):
+    parser = build_parser(CLI)  # type: ignore
+    base = ["download-media", "https://t.me/c/123/10", "5", str(tmp_path)]
+
+    assert parser.parse_args(base + ["--small-slots", "0"]).small_slots == 0
+    with pytest.raises(SystemExit):
+        parser.parse_args(base + ["--small-slots", "-1"])
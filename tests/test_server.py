@@ -0,0 +1,186 @@
+import asyncio
+import json
+from argparse import ArgumentParser
+
+from tg_tools.config import console
+from tg_tools.server import EventStream, JobArgumentParser, JobServer
+
+
+class FakeClients:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def userbot(self):
+        self.calls += 1
+        return "userbot"
+
+    async def bot(self):
+        return None
+
+
+def make_parser() -> ArgumentParser:
+    parser = JobArgumentParser(prog="tg-tools")
+    parser.add_argument("--create-session-string", action="store_true")
+    parser.add_argument("--reset", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    subparsers = parser.add_subparsers(dest="command")
+    job_parser = subparsers.add_parser("job")
+    job_parser.add_argument("value", type=int)
+    get_parser = subparsers.add_parser("get")
+    get_parser.add_argument("key")
+    return parser
+
+
+async def run_job(parsed, clients) -> None:
+    client = await clients.userbot()
+    console.log(f"{client} {parsed.value}")
+    console.print("50%", end="\r")
+    if parsed.value < 0:
+        raise ValueError("negativo")
+
+
+async def request(port: int, raw: bytes) -> tuple[str, list]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.decode().partition("\r\n\r\n")
+    return head, [json.loads(line) for line in body.splitlines() if line]
+
+
+TOKEN = "segredo"
+
+
+def post_job(args: list[str], headers: str | None = None) -> bytes:
+    body = json.dumps({"args": args}).encode()
+    if headers is None:
+        headers = f"Authorization: Bearer {TOKEN}\r\nContent-Type: application/json\r\n"
+    return (
+        f"POST /jobs HTTP/1.1\r\n{headers}Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+def run_server(scenario):
+    async def run():
+        clients = FakeClients()
+        server = JobServer(make_parser().parse_args, run_job, clients, TOKEN)
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await scenario(port), clients
+
+    return asyncio.run(run())
+
+
+def test_jobs_run_concurrently_and_stream_events():
+    async def scenario(port):
+        return await asyncio.gather(
+            request(port, post_job(["job", "1"])),
+            request(port, post_job(["job", "2"])),
+        )
+
+    results, clients = run_server(scenario)
+    assert clients.calls == 2
+    for value, (head, events) in zip((1, 2), results):
+        assert "application/x-ndjson" in head
+        kinds = [event["event"] for event in events]
+        assert kinds[0] == "start" and kinds[-1] == "end"
+        assert "progress" in kinds
+        # cada tarefa recebe apenas a própria saída
+        logs = [event["text"] for event in events if event["event"] == "log"]
+        assert any(f"userbot {value}" in text for text in logs)
+        assert not any(f"userbot {3 - value}" in text for text in logs)
+        assert events[-1]["status"] == "ok"
+
+
+def test_job_errors_do_not_stop_the_server():
+    async def scenario(port):
+        invalid = await request(port, post_job(["job", "x"]))
+        failed = await request(port, post_job(["job", "-1"]))
+        refused = await request(port, post_job(["--create-session-string"]))
+        health = await request(
+            port, f"GET /health HTTP/1.1\r\nAuthorization: Bearer {TOKEN}\r\n\r\n".encode()
+        )
+        return invalid, failed, refused, health
+
+    (invalid, failed, refused, health), _ = run_server(scenario)
+    assert invalid[1][-1]["status"] == "error"
+    assert failed[1][-1] == {"job": 2, "event": "end", "status": "error", "error": "negativo"}
+    assert refused[1][-1]["status"] == "error"
+    assert health[1] == [{"status": "ok", "jobs": 0}]
+
+
+def test_invalid_payload_returns_400():
+    async def scenario(port):
+        return await request(
+            port,
+            f"POST /jobs HTTP/1.1\r\nAuthorization: Bearer {TOKEN}\r\n"
+            "Content-Type: application/json\r\nContent-Length: 2\r\n\r\n{}".encode(),
+        )
+
+    (head, _), _ = run_server(scenario)
+    assert head.startswith("HTTP/1.1 400")
+
+
+def test_requests_without_token_or_from_browsers_are_refused():
+    auth = f"Authorization: Bearer {TOKEN}\r\n"
+    json_type = "Content-Type: application/json\r\n"
+
+    async def scenario(port):
+        return await asyncio.gather(
+            request(port, post_job(["job", "1"], json_type)),
+            request(port, post_job(["job", "1"], "Authorization: Bearer outro\r\n" + json_type)),
+            request(port, post_job(["job", "1"], auth + "Content-Type: text/plain\r\n")),
+            request(port, post_job(["job", "1"], auth + json_type + "Origin: https://site\r\n")),
+            request(port, b"GET /jobs HTTP/1.1\r\n\r\n"),
+        )
+
+    results, clients = run_server(scenario)
+    statuses = [head.split()[1] for head, _ in results]
+    assert statuses == ["401", "401", "415", "403", "401"]
+    assert clients.calls == 0
+
+
+def test_config_commands_are_refused():
+    async def scenario(port):
+        return await asyncio.gather(
+            request(port, post_job(["get", "session-string"])),
+            request(port, post_job(["--reset"])),
+        )
+
+    results, _ = run_server(scenario)
+    for _, events in results:
+        assert events[-1] == {
+            "job": events[-1]["job"],
+            "event": "end",
+            "status": "error",
+            "error": "Comando indisponível no serve.",
+        }
+
+
+def test_daemon_wide_options_are_refused_per_job():
+    async def scenario(port):
+        return await asyncio.gather(
+            request(port, post_job(["--log-level", "debug", "job", "1"])),
+            request(port, post_job(["--log-level", "info", "job", "1"])),
+        )
+
+    (changed, default), clients = run_server(scenario)
+    assert changed[1][-1]["status"] == "error"
+    assert "--log-level" in changed[1][-1]["error"]
+    assert default[1][-1]["status"] == "ok"
+    assert clients.calls == 1
+
+
+def test_event_stream_splits_lines_and_progress():
+    events = []
+    stream = EventStream(events.append)
+    stream.write("10%\r20")
+    stream.write("%\rfeito\n\n")
+    assert events == [
+        {"event": "progress", "text": "10%"},
+        {"event": "progress", "text": "20%"},
+        {"event": "log", "text": "feito"},
+    ]
@@ -0,0 +1,283 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from hydrogram.errors import FileReferenceExpired
+from hydrogram.types.messages_and_media.message import Str
+
+from tg_tools.exceptions import FloodWaitLimitError, TGToolsError
+from tg_tools.paths import PathAllocator
+from tg_tools.records import MediaRecord
+from tg_tools.retry import RetryQueue
+from tg_tools.scheduling import TransferScheduler
+from tg_tools.user_bot import Userbot
+from tg_tools.writer import ArchiveSpec, ArchiveWriter, FileWriter
+
+
+def media_message(msg_id: int, **media) -> SimpleNamespace:
+    msg = SimpleNamespace(id=msg_id, caption=Str(f"legenda {msg_id}").init([]))
+    for kind in Userbot.DOWNLOADABLE_MEDIA:
+        setattr(msg, kind, media.get(kind))
+    return msg
+
+
+def test_media_record_keeps_only_what_the_download_needs():
+    async def run():
+        userbot = Userbot("")
+        video = SimpleNamespace(
+            file_id="abc", file_size=10, file_name="aula.mp4", mime_type="video/mp4"
+        )
+        return (
+            userbot._media_record(media_message(1, video=video)),  # type: ignore
+            userbot._media_record(media_message(2)),  # type: ignore
+        )
+
+    record, poll = asyncio.run(run())
+    assert (record.id, record.kind, record.file_id, record.size) == (1, "video", "abc", 10)
+    assert (record.file_name, record.caption) == ("aula.mp4", "legenda 1")
+    assert type(record.caption) is str
+    assert not hasattr(record, "__dict__")
+    assert poll is None
+
+
+def test_download_batch_names_files_from_records(tmp_path):
+    records = [
+        MediaRecord(1, "document", "a", 5, "relatorio.pdf", "application/pdf", "Mensal"),
+        MediaRecord(2, "photo", "b", 3, "", "image/jpeg"),
+    ]
+
+    async def run():
+        userbot = Userbot("")
+        async with FileWriter() as writer:
+            return await userbot._download_batch(
+                records,
+                name="caption",
+                test_mode=True,
+                writer=writer,
+                allocator=PathAllocator(tmp_path),
+                scheduler=TransferScheduler(workers=2),
+                total=2,
+            )
+
+    assert asyncio.run(run()) == [1, 2]
+    names = sorted(path.name for path in (tmp_path / ".test_mode").iterdir())
+    assert names[0].startswith("2") and names[0].endswith(".jpg.test_mode")
+    assert names[1] == "Mensal.pdf.test_mode"
+
+
+def test_test_mode_does_not_write_into_archives(tmp_path):
+    records = [MediaRecord(1, "document", "a", 5, "relatorio.pdf", "application/pdf")]
+
+    async def run():
+        userbot = Userbot("")
+        async with ArchiveWriter(tmp_path, ArchiveSpec("backup")) as writer:
+            return await userbot._download_batch(
+                records,
+                name="file_name",
+                test_mode=True,
+                writer=writer,
+                allocator=PathAllocator(tmp_path),
+                scheduler=TransferScheduler(),
+                total=1,
+            )
+
+    assert asyncio.run(run()) == [1]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_is_closed_when_the_writer_fails(tmp_path):
+    closed = []
+
+    async def stream(file_id):
+        try:
+            yield b"a"
+            yield b"b"
+        finally:
+            closed.append(file_id)
+
+    class FailingHandle:
+        size = 0
+
+        async def write(self, chunk):
+            raise OSError("disco cheio")
+
+        async def abort(self):
+            pass
+
+    async def run():
+        userbot = Userbot("")
+        userbot.media = SimpleNamespace(stream=stream)  # type: ignore
+        writer = SimpleNamespace(open=lambda target, msg_id: FailingHandle())
+        record = MediaRecord(1, "document", "abc", 2, "a.bin", "")
+        try:
+            await userbot._stream_to_file(record, tmp_path / "a.bin", writer)  # type: ignore
+        except OSError:
+            pass
+        # liberado na hora, sem esperar o coletor de lixo
+        return list(closed)
+
+    assert asyncio.run(run()) == ["abc"]
+
+
+def test_failed_downloads_are_retried_at_the_end_of_the_job(tmp_path, monkeypatch):
+    """
+    Testa se um erro de conexão troca as conexões do DC e se um file reference expirado
+    busca a mensagem de novo antes da nova tentativa.
+    """
+    monkeypatch.setattr("tg_tools.retry.random.uniform", lambda low, high: 0)
+    # file_id de um documento no DC 4
+    file_id = "BQACAgQAAxkBAAIBHWZ0wZ8AAXU5AAHh9ggZwQABlU0Ym0VJAAKxEwACFIWpUxSzKyqMDJReHgQ"
+    records = [
+        MediaRecord(1, "document", file_id, 2, "a.txt"),
+        MediaRecord(2, "document", "expirado", 2, "b.txt"),
+        MediaRecord(3, "document", "quebrado", 2, "c.txt"),
+    ]
+    failures = {file_id: [ConnectionResetError()], "expirado": [FileReferenceExpired()]}
+    reconnected: list[int] = []
+    fetched: list[list[int]] = []
+
+    async def run():
+        userbot = Userbot("")
+
+        async def stream_to_file(record, target, writer):
+            if failures.get(record.file_id):
+                raise failures[record.file_id].pop()
+            if record.file_id == "quebrado":
+                raise TGToolsError("Arquivo inválido")
+            return await writer.write_bytes(target, b"ok", record.id)
+
+        async def reconnect(dc_id):
+            reconnected.append(dc_id)
+
+        async def iter_messages(chat_id, message_ids):
+            fetched.append(list(message_ids))
+            document = SimpleNamespace(
+                file_id="renovado", file_size=2, file_name="b.txt", mime_type="text/plain"
+            )
+            yield [media_message(2, document=document)]
+
+        userbot._stream_to_file = stream_to_file  # type: ignore
+        userbot.media = SimpleNamespace(reconnect=reconnect)  # type: ignore
+        userbot.iter_messages = iter_messages  # type: ignore
+        retries = RetryQueue()
+        async with FileWriter() as writer:
+            args = (
+                "file_name",
+                False,
+                writer,
+                PathAllocator(tmp_path),
+                TransferScheduler(workers=3),
+            )
+            first = await userbot._download_batch(
+                records, *args, total=3, chat_id=-100, retries=retries  # type: ignore
+            )
+            retried = await userbot._retry_downloads(retries, *args)  # type: ignore
+        return first, retried, retries
+
+    first, retried, retries = asyncio.run(run())
+    assert first == []
+    assert retried == 2
+    assert reconnected == [4]
+    assert fetched == [[2]]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.txt", "b.txt"]
+    assert [(f.description, f.error) for f in retries.failures] == [
+        ("Chat: -100, Mensagem: 3", "Arquivo inválido")
+    ]
+
+
+def test_requeued_downloads_count_toward_the_number_of_files(tmp_path, monkeypatch):
+    """
+    Testa se uma falha que volta para a fila conta no alvo: a varredura não busca mais
+    mensagens para compensá-la e a tarefa termina com `number_files` arquivos.
+    """
+    monkeypatch.setattr("tg_tools.retry.random.uniform", lambda low, high: 0)
+    failures = {10: [FloodWaitLimitError("limite")]}
+    streamed: list[int] = []
+
+    async def run():
+        userbot = Userbot("")
+
+        @asynccontextmanager
+        async def session():
+            yield
+
+        async def verify_chat_id(chat_id):
+            pass
+
+        async def iter_messages(chat_id, message_ids):
+            yield [SimpleNamespace(id=msg_id, empty=False) for msg_id in message_ids if msg_id <= 13]
+
+        async def stream_to_file(record, target, writer):
+            if failures.get(record.id):
+                raise failures[record.id].pop()
+            streamed.append(record.id)
+            return await writer.write_bytes(target, b"ok", record.id)
+
+        userbot.session = session  # type: ignore
+        userbot.verify_chat_id = verify_chat_id  # type: ignore
+        userbot.iter_messages = iter_messages  # type: ignore
+        userbot._stream_to_file = stream_to_file  # type: ignore
+        userbot._select_media = lambda *args: lambda msg: MediaRecord(  # type: ignore
+            msg.id, "document", f"f{msg.id}", 2, f"{msg.id}.txt"
+        )
+        await userbot.download_media(
+            "https://t.me/c/123/10",
+            number_files=2,
+            path=tmp_path,
+            name="file_name",
+            media_type="all",
+            verify_messages=True,
+            filter_caption_includes=None,
+            test_mode=False,
+        )
+
+    asyncio.run(run())
+    assert streamed == [11, 10]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["10.txt", "11.txt"]
+
+
+def test_sync_mark_waits_for_retries_and_stops_before_failures(tmp_path, monkeypatch):
+    """
+    Testa se a marca do --sync não passa de uma mídia reenfileirada antes da nova tentativa,
+    nem de uma falha definitiva no fim da tarefa.
+    """
+    monkeypatch.setattr("tg_tools.retry.random.uniform", lambda low, high: 0)
+    failures = {2: [FloodWaitLimitError("limite")], 3: [TGToolsError("Arquivo inválido")]}
+    marks: list[int] = []
+
+    async def run():
+        userbot = Userbot("")
+
+        @asynccontextmanager
+        async def session():
+            yield
+
+        async def iter_messages(chat_id, message_ids):
+            for batch in ([1, 2], [3, 4]):
+                yield [SimpleNamespace(id=msg_id, empty=False) for msg_id in batch]
+
+        async def stream_to_file(record, target, writer):
+            if failures.get(record.id):
+                raise failures[record.id].pop()
+            return await writer.write_bytes(target, b"ok", record.id)
+
+        userbot.session = session  # type: ignore
+        userbot.iter_messages = iter_messages  # type: ignore
+        userbot._stream_to_file = stream_to_file  # type: ignore
+        userbot._select_media = lambda *args: lambda msg: MediaRecord(  # type: ignore
+            msg.id, "document", f"f{msg.id}", 2, f"{msg.id}.txt"
+        )
+        await userbot._download_groups(
+            {-100: [1, 2, 3, 4]},
+            path=tmp_path,
+            name="file_name",
+            media_type="all",
+            filter_caption_includes=None,
+            test_mode=False,
+            on_mark=marks.append,
+        )
+
+    asyncio.run(run())
+    # 2 só é baixada na nova tentativa; 3 falha de vez e será tentada no próximo --sync
+    assert marks == [1, 1, 2]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["1.txt", "2.txt", "4.txt"]
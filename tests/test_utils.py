@@ -1,15 +1,27 @@
+import base64
 import os
 import tempfile
+from io import BytesIO
+from types import SimpleNamespace
 
 import pytest
 from PIL import Image
 
 from tg_tools.exceptions import TGToolsError
 from tg_tools.utils import (
+    THUMBNAIL_FORMAT,
     THUMBNAIL_MAX_HEIGHT,
+    THUMBNAIL_MAX_SIZE,
     THUMBNAIL_MAX_WIDTH,
-    file_thumbnail_to_base64,
     format_size,
+    generate_file_thumbnail,
+    get_link_info,
+    group_albums,
+    group_links_by_chat,
+    load_thumbnail,
+    normalize_thumbnail,
+    read_links,
+    save_thumbnail,
 )
 
 
@@ -30,7 +42,7 @@ def test_format_size(size, expected):
     assert format_size(size) == expected
 
 
-# Teste para file_thumbnail_to_base64 exige arquivos de imagem reais e manipulação de arquivos,
+# Teste para normalize_thumbnail exige arquivos de imagem reais e manipulação de arquivos,
 def create_temp_image(width=100, height=100):
     with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as tmp:
         img = Image.new("RGB", (width, height), color="red")
@@ -38,24 +50,124 @@ def create_temp_image(width=100, height=100):
         return tmp.name
 
 
-def test_file_thumbnail_to_base64_valid():
+def test_normalize_thumbnail_valid():
     """
-    Testa se uma imagem válida é convertida para base64 corretamente.
+    Testa se uma imagem válida é convertida para JPEG dentro dos limites.
     """
     img_path = create_temp_image()
-    result = file_thumbnail_to_base64(img_path)
-    assert isinstance(result, str)
-    assert len(result) > 0
+    result = normalize_thumbnail(img_path)
+    assert isinstance(result, bytes)
+    assert 0 < len(result) <= THUMBNAIL_MAX_SIZE
+    os.remove(img_path)
 
 
-# Teste de imagem com dimensões inválidas
-def test_file_thumbnail_to_base64_invalid_dimensions():
+# Imagens grandes deixam de ser rejeitadas e passam a ser redimensionadas
+def test_normalize_thumbnail_resize():
     """
-    Testa se uma imagem com dimensões inválidas dispara um erro (TGToolsError), conforme esperado pela função.
+    Testa se uma imagem com dimensões acima do limite é redimensionada mantendo a proporção.
     """
     img_path = create_temp_image(
-        width=THUMBNAIL_MAX_WIDTH + 1, height=THUMBNAIL_MAX_HEIGHT + 1
+        width=THUMBNAIL_MAX_WIDTH * 4, height=THUMBNAIL_MAX_HEIGHT * 2
     )
+    with Image.open(BytesIO(normalize_thumbnail(img_path))) as img:
+        assert img.format == THUMBNAIL_FORMAT
+        assert img.size == (THUMBNAIL_MAX_WIDTH, THUMBNAIL_MAX_HEIGHT // 2)
+    os.remove(img_path)
+
+
+def test_normalize_thumbnail_png_with_alpha(tmp_path):
+    """
+    Testa se uma imagem PNG com transparência é convertida para JPEG.
+    """
+    img_path = tmp_path / "thumb.png"
+    Image.new("RGBA", (500, 500), color=(0, 0, 255, 128)).save(img_path)
+    with Image.open(BytesIO(normalize_thumbnail(img_path))) as img:
+        assert img.format == THUMBNAIL_FORMAT
+        assert img.mode == "RGB"
+
+
+def test_normalize_thumbnail_not_found():
+    """
+    Testa se um arquivo inexistente dispara um erro (TGToolsError).
+    """
     with pytest.raises(TGToolsError):
-        file_thumbnail_to_base64(img_path)
+        normalize_thumbnail("inexistente.jpg")
+
+
+def test_load_thumbnail_path_and_legacy_base64(tmp_path):
+    """
+    Testa se a thumbnail é lida do arquivo gravado e do formato antigo em base64.
+    """
+    img_path = create_temp_image()
+    target = save_thumbnail(img_path, tmp_path / "thumbnail.jpg")
+    data = target.read_bytes()
+    assert load_thumbnail(target.as_posix()) == data
+    assert load_thumbnail(base64.b64encode(data).decode("utf-8")) == data
     os.remove(img_path)
+
+
+def test_generate_file_thumbnail_sidecar(tmp_path):
+    """
+    Testa se a thumbnail de um vídeo é gerada a partir da imagem com o mesmo nome.
+    """
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"video")
+    assert generate_file_thumbnail(video) is None
+    Image.new("RGB", (640, 360), color="green").save(tmp_path / "video.png")
+    assert generate_file_thumbnail(video) is not None
+
+
+@pytest.mark.parametrize(
+    "link,expected",
+    [
+        ("https://t.me/c/1000000/10", (-1001000000, None, 10)),
+        ("https://t.me/canal/25/", ("canal", None, 25)),
+        ("https://t.me/c/1000000/3/40", (-1001000000, 3, 40)),
+        ("tg://openmessage?user_id=12345&message_id=7", ("12345", None, 7)),
+    ],
+)
+def test_get_link_info(link, expected):
+    """
+    Testa se os links de canal, tópico e bot são interpretados corretamente.
+    """
+    assert get_link_info(link) == expected
+
+
+def test_get_link_info_invalid():
+    """
+    Testa se um link inválido dispara um erro (TGToolsError).
+    """
+    with pytest.raises(TGToolsError):
+        get_link_info("https://exemplo.com/c/1/2")
+
+
+def test_group_links_by_chat():
+    """
+    Testa se os links são agrupados por chat, sem ids repetidos e ignorando links inválidos.
+    """
+    links = [
+        "https://t.me/c/1000000/10",
+        "https://t.me/canal/5",
+        "https://t.me/c/1000000/12",
+        "link invalido",
+        "https://t.me/c/1000000/10",
+    ]
+    assert group_links_by_chat(links) == {-1001000000: [10, 12], "canal": [5]}
+
+
+def test_read_links(tmp_path):
+    """
+    Testa se linhas vazias e comentários são ignorados ao ler o arquivo de links.
+    """
+    links_file = tmp_path / "links.txt"
+    links_file.write_text("# comentario\nhttps://t.me/c/1/2\n\n  https://t.me/c/1/3  \n")
+    assert read_links(links_file) == ["https://t.me/c/1/2", "https://t.me/c/1/3"]
+
+
+def test_group_albums_keeps_consecutive_media_groups_together():
+    messages = [
+        SimpleNamespace(id=i, media_group_id=group)
+        for i, group in enumerate([None, 5, 5, 6, None, 5])
+    ]
+    units = [[msg.id for msg in unit] for unit in group_albums(messages)]  # type: ignore
+    assert units == [[0], [1, 2], [3], [4], [5]]
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from tg_tools.writer import TEMP_SUFFIX, ArchiveSpec, ArchiveWriter, FileWriter
+
+
+def test_write_in_chunks_and_commit(tmp_path):
+    """
+    Testa se os blocos são agrupados, gravados e o arquivo é movido para o nome final.
+    """
+    target = tmp_path / "sub" / "arquivo.bin"
+
+    async def run():
+        async with FileWriter(buffer_size=4, fsync="file") as writer:
+            handle = writer.open(target)
+            for chunk in (b"ab", b"cd", b"ef", b"g"):
+                await handle.write(chunk)
+            return await handle.commit()
+
+    final = asyncio.run(run())
+    assert final == target
+    assert target.read_bytes() == b"abcdefg"
+    assert not target.with_name(target.name + TEMP_SUFFIX).exists()
+
+
+def test_commit_does_not_overwrite(tmp_path):
+    """
+    Testa se um arquivo existente não é sobrescrito.
+    """
+    target = tmp_path / "arquivo.txt"
+    target.write_text("original")
+
+    async def run():
+        async with FileWriter(fsync="job") as writer:
+            return await writer.write_bytes(target, b"novo")
+
+    final = asyncio.run(run())
+    assert final == tmp_path / "arquivo(1).txt"
+    assert target.read_text() == "original"
+    assert final.read_bytes() == b"novo"
+
+
+def test_abort_removes_partial_file(tmp_path):
+    """
+    Testa se o arquivo parcial é removido ao abortar a escrita.
+    """
+    target = tmp_path / "arquivo.bin"
+
+    async def run():
+        async with FileWriter(buffer_size=1) as writer:
+            handle = writer.open(target)
+            await handle.write(b"abc")
+            await handle.abort()
+
+    asyncio.run(run())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_invalid_fsync_policy():
+    """
+    Testa se uma política de fsync inválida dispara um erro.
+    """
+    with pytest.raises(ValueError):
+        FileWriter(fsync="sempre")  # type: ignore
+
+
+@pytest.mark.parametrize("format", ["tar", "zip"])
+def test_archive_writer_rotates_and_indexes_offsets(tmp_path, format):
+    """
+    Testa se os arquivos vão para pacotes com rotação por tamanho e se o índice permite
+    ler cada arquivo direto pelo deslocamento.
+    """
+    files = {
+        1: (tmp_path / "a.jpg", b"a" * 700),
+        2: (tmp_path / "sub" / "b.ogg", b"b" * 3000),
+        3: (tmp_path / "c.jpg", b"c" * 10),
+    }
+
+    async def run():
+        spec = ArchiveSpec("backup", format, max_size=2048)
+        async with ArchiveWriter(tmp_path, spec, buffer_size=1024, fsync="file") as writer:
+            paths = []
+            for msg_id, (target, data) in files.items():
+                handle = writer.open(target, msg_id)
+                for start in range(0, len(data), 512):
+                    await handle.write(data[start : start + 512])
+                paths.append(await handle.commit())
+            aborted = writer.open(tmp_path / "d.jpg", 4)
+            await aborted.write(b"d")
+            await aborted.abort()
+            return paths
+
+    paths = asyncio.run(run())
+    assert [path.relative_to(tmp_path).parts[0] for path in paths] == [
+        f"backup-0001.{format}",
+        f"backup-0002.{format}",
+        f"backup-0003.{format}",
+    ]
+    assert paths[1] == tmp_path / f"backup-0002.{format}" / "sub" / "b.ogg"
+
+    index = [
+        json.loads(line)
+        for line in (tmp_path / "backup.index.jsonl").read_text().splitlines()
+    ]
+    assert [entry["msg_id"] for entry in index] == [1, 2, 3]
+    assert index[1]["member"] == "sub/b.ogg"
+    for entry in index:
+        with open(tmp_path / entry["archive"], "rb") as archive:
+            archive.seek(entry["offset"])
+            assert archive.read(entry["size"]) == files[entry["msg_id"]][1]
+
+    # os pacotes continuam legíveis pelas ferramentas comuns
+    if format == "tar":
+        with tarfile.open(tmp_path / "backup-0002.tar") as archive:
+            assert archive.getnames() == ["sub/b.ogg"]
+    else:
+        with zipfile.ZipFile(tmp_path / "backup-0002.zip") as archive:
+            assert archive.read("sub/b.ogg") == b"b" * 3000